@@ -0,0 +1,375 @@
+"""
+Analiz hesapları (Streamlit'ten bağımsız).
+
+- summarize_exam: deneme × kademe × sınıf özet satırları (lgs_exam_summary)
+- nets_matrix: payload'lardan öğrenci × ders net matrisi (tek geçişte)
+- rank_all_exams: TÜM DENEMELER (ORTALAMA) ilk 40 listesi
+- student_key: kalıcı öğrenci anahtarı (kayıtta hesaplanıp ogr_key kolonunda saklanır)
+- cohort_trends: kademedeki tüm öğrenciler için eğilim ölçüleri (tek geçişte)
+- class_subject_nets / subject_matrix: sınıf × ders × deneme net ortalamaları
+"""
+import numpy as np
+import pandas as pd
+
+SUMMARY_TOP_N = 40
+ALL_CLASSES = "*"  # kademenin tüm sınıfları için özet satırı
+PERCENTILES = (25, 50, 75, 90)
+
+
+def _num(v):
+    return None if v is None or pd.isna(v) else float(v)
+
+
+def _summary_row(exam_name, kademe, sinif, g: pd.DataFrame, top_n: int) -> dict:
+    puan = g["puan"].dropna()
+    top = g.dropna(subset=["puan"]).nlargest(top_n, "puan")
+    row = {
+        "exam_name": exam_name,
+        "kademe": int(kademe),
+        "sinif": sinif,
+        "n": int(g["ad_soyad"].nunique()),
+        "n_puan": int(len(puan)),
+        "mean": _num(puan.mean()) if len(puan) else None,
+        "max": _num(puan.max()) if len(puan) else None,
+        "top": [
+            {
+                "ogr_no": None if pd.isna(r.ogr_no) else int(r.ogr_no),
+                "ad_soyad": r.ad_soyad,
+                "sinif": r.sinif,
+                "lgs_puan": float(r.puan),
+            }
+            for r in top.itertuples(index=False)
+        ],
+    }
+    qs = np.percentile(puan.to_numpy(), PERCENTILES) if len(puan) else [None] * len(PERCENTILES)
+    for p, q in zip(PERCENTILES, qs):
+        row[f"p{p}"] = _num(q)
+    return row
+
+
+def summarize_exam(df_exam: pd.DataFrame, exam_name: str, top_n: int = SUMMARY_TOP_N) -> list:
+    """
+    parse_school_report çıktısından özet satırları: her (kademe, sınıf) ve her
+    kademenin tamamı (sinif = ALL_CLASSES) için öğrenci sayısı, ortalama, en yüksek,
+    yüzdelikler ve puana göre sıralı ilk top_n öğrenci.
+    """
+    if df_exam.empty:
+        return []
+    sinif = df_exam["Sinif"]
+    d = pd.DataFrame({
+        "kademe": pd.to_numeric(df_exam["Kademe"], errors="coerce"),
+        "sinif": sinif.astype(str).str.strip().where(sinif.notna(), None),
+        "ogr_no": pd.to_numeric(df_exam["OgrNo"], errors="coerce"),
+        "ad_soyad": df_exam["AdSoyad"].astype(str).str.strip(),
+        "puan": pd.to_numeric(df_exam.get("LGS_Puan", pd.Series(np.nan, index=df_exam.index)), errors="coerce"),
+    }).dropna(subset=["kademe", "sinif"])
+
+    out = []
+    for kademe, kg in d.groupby("kademe"):
+        out.append(_summary_row(exam_name, kademe, ALL_CLASSES, kg, top_n))
+        for s, sg in kg.groupby("sinif"):
+            out.append(_summary_row(exam_name, kademe, s, sg, top_n))
+    return out
+
+
+def combine_summaries(summary: pd.DataFrame, siniflar, top_n: int = SUMMARY_TOP_N):
+    """
+    Seçili sınıfların özet satırlarını birleştirir.
+    Dönüş: (öğrenci sayısı, ortalama, en yüksek, ilk top_n DataFrame'i).
+    """
+    rows = summary[summary["sinif"].isin(list(siniflar))]
+    n_puan = rows["n_puan"].sum()
+    avg = float((rows["mean"].fillna(0) * rows["n_puan"]).sum() / n_puan) if n_puan else None
+    mx = float(rows["max"].max()) if n_puan else None
+    top = pd.DataFrame(
+        [t for lst in rows["top"] for t in (lst or [])],
+        columns=["ogr_no", "ad_soyad", "sinif", "lgs_puan"],
+    )
+    top = top.sort_values("lgs_puan", ascending=False, kind="stable").head(top_n).reset_index(drop=True)
+    return int(rows["n"].sum()), avg, mx, top
+
+
+# --------------------
+# NETLER
+# --------------------
+SCORE_SUFFIXES = ("_D", "_Y", "_N")
+NET_INDEX = ["ogr_no", "ad_soyad", "sinif"]
+
+
+def subject_names(columns) -> list:
+    """_D/_Y/_N kolonlarından ders adları (sıralı)."""
+    cols = pd.Index([c for c in columns if isinstance(c, str)])
+    hits = cols[cols.str.endswith(SCORE_SUFFIXES)]
+    return sorted(set(hits.str.rsplit("_", n=1).str[0].str.strip()))
+
+
+def nets_matrix(payloads, index=None) -> pd.DataFrame:
+    """
+    payload sözlükleri -> öğrenci × ders net matrisi (float64, net = D - Y/3).
+    Eksik / boş D-Y değerleri 0 sayılır (payload_to_nets ile aynı).
+    """
+    raw = pd.DataFrame.from_records(list(payloads), index=index)
+    subjects = subject_names(raw.columns)
+    if not subjects:
+        return pd.DataFrame(index=raw.index, dtype="float64")
+
+    cols = [f"{s}_D" for s in subjects] + [f"{s}_Y" for s in subjects]
+    block = raw.reindex(columns=cols).to_numpy(dtype=object)
+    vals = pd.to_numeric(pd.Series(block.ravel()), errors="coerce").to_numpy(dtype="float64")
+    vals = np.nan_to_num(vals.reshape(block.shape), nan=0.0)
+    k = len(subjects)
+    nets = vals[:, :k] - vals[:, k:] / 3.0
+    return pd.DataFrame(nets, index=raw.index, columns=subjects)
+
+
+def _score(v) -> float:
+    # nets_matrix ile aynı: sayıya çevrilemeyen / boş değer 0
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if f != f else f
+
+
+def payload_to_nets(payload: dict) -> dict:
+    """Tek öğrencinin netleri (skaler döngü; toplu hesap için nets_matrix)."""
+    if not isinstance(payload, dict) or not payload:
+        return {}
+    dersler = set()
+    for k in payload:
+        if isinstance(k, str) and k.endswith(SCORE_SUFFIXES):
+            dersler.add(k.rsplit("_", 1)[0].strip())
+    return {
+        ders: _score(payload.get(f"{ders}_D")) - _score(payload.get(f"{ders}_Y")) / 3.0
+        for ders in sorted(dersler)
+    }
+
+
+SUBJECT_COLUMNS = ["exam_name", "sinif", "ders", "net", "n"]
+
+
+def class_subject_nets(nets: pd.DataFrame, exam_name: str) -> pd.DataFrame:
+    """
+    Bir denemenin sınıf × ders ortalama netleri, uzun biçimde (SUBJECT_COLUMNS).
+    n: o sınıfta o dersin netine sahip öğrenci sayısı. Deneme başına bir kez hesaplanır.
+    """
+    if nets.empty or not len(nets.columns):
+        return pd.DataFrame(columns=SUBJECT_COLUMNS)
+    g = nets.groupby(level="sinif")
+    out = pd.concat({"net": g.mean().stack(), "n": g.count().stack()}, axis=1).reset_index()
+    out.columns = ["sinif", "ders", "net", "n"]
+    out.insert(0, "exam_name", exam_name)
+    return out[SUBJECT_COLUMNS]
+
+
+def subject_matrix(long: pd.DataFrame, columns: str, exam_order=()) -> pd.DataFrame:
+    """
+    class_subject_nets tablolarından ısı haritası matrisi (satır: sınıf).
+    columns="ders": sınıf × ders, denemeler öğrenci sayısıyla ağırlıklı ortalanır.
+    columns="exam_name": sınıf × deneme (tek ders süzülmüş tabloda), exam_order sırasıyla.
+    """
+    if long.empty:
+        return pd.DataFrame()
+    d = long.assign(w=long["net"] * long["n"])
+    g = d.groupby(["sinif", columns], sort=True)[["w", "n"]].sum()
+    m = (g["w"] / g["n"].where(g["n"] > 0)).unstack(columns)
+    if columns == "exam_name":
+        m = m[[e for e in exam_order if e in m.columns] + sorted(c for c in m.columns if c not in exam_order)]
+    m.index.name, m.columns.name = "Sınıf", None
+    return m
+
+
+# --------------------
+# TÜM DENEMELER SIRALAMASI
+# --------------------
+# str.upper "i"yi "I" yapar; Türkçede i -> İ, ı -> I
+_TR_UPPER = str.maketrans({"i": "İ", "ı": "I"})
+
+
+def text_or_empty(s: pd.Series) -> pd.Series:
+    """Metin kolonu; boş değerler "". Maske dönüşümden önce: pandas 2.x'te astype(str) None'ı "None" yapar."""
+    return s.astype(object).where(s.notna(), "").astype(str)
+
+
+def normalize_names(names: pd.Series) -> pd.Series:
+    """Türkçe büyük harf, NFC, tek boşluk: "ayşe  yılmaz" ve "AYŞE YILMAZ" aynı olur."""
+    s = text_or_empty(names).str.normalize("NFC").str.translate(_TR_UPPER).str.upper()
+    return s.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def student_key(ogr_no: pd.Series, ad_soyad: pd.Series, sinif: pd.Series) -> pd.Series:
+    """
+    Kalıcı öğrenci anahtarı: okul no ("1015"); yoksa (nadiren) "AD SOYAD | sınıf".
+    İsim denemeden denemeye farklı yazılsa da (büyük/küçük harf, boşluk) aynı kalır.
+    """
+    no = pd.to_numeric(ogr_no, errors="coerce")
+    by_no = text_or_empty(no.round().astype("Int64"))
+    by_name = normalize_names(ad_soyad) + " | " + text_or_empty(sinif).str.strip()
+    return by_no.where(no.notna(), by_name)
+
+
+def student_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Dönüş: ogr_key, ad_norm kolonları (df ile aynı index). Kayıtta hesaplanmış
+    ogr_key kolonu varsa o kullanılır; eski (anahtarsız) satırlar için burada hesaplanır.
+    """
+    ad_norm = normalize_names(df["ad_soyad"])
+    key = student_key(df["ogr_no"], df["ad_soyad"], df["sinif"])
+    if "ogr_key" in df.columns:
+        key = text_or_empty(df["ogr_key"]).where(df["ogr_key"].notna(), key)
+    return pd.DataFrame({"ogr_key": key, "ad_norm": ad_norm}, index=df.index)
+
+
+def group_mode(keys: pd.Series, values: pd.Series) -> pd.Series:
+    """
+    Her anahtar için en sık değer (metin olarak). Eşitlikte ilk görülen değer;
+    value_counts'lu eski hesapla aynı sonuç, ama tek groupby ile.
+    """
+    d = pd.DataFrame({"k": keys.to_numpy(), "v": values.to_numpy()}).dropna(subset=["v"])
+    d["v"] = d["v"].astype(str)
+    d["pos"] = np.arange(len(d))
+    g = d.groupby(["k", "v"], sort=False).agg(n=("pos", "size"), first=("pos", "min")).reset_index()
+    g = g.sort_values(["k", "n", "first"], ascending=[True, False, True], kind="stable")
+    return g.drop_duplicates("k").set_index("k")["v"]
+
+
+def rank_all_exams(df: pd.DataFrame, exam_order, top_n: int = 40) -> pd.DataFrame:
+    """
+    Tüm denemelerin ortalamasına göre ilk top_n öğrenci (ekrandaki / PDF'teki tablo);
+    top_n=None: tüm kademe (Excel çıktısı). df: exam_name, ogr_no, ad_soyad, sinif,
+    lgs_puan kolonları. attrs["exams"]: "1. Sınav" … kolonlarının deneme adları.
+    """
+    tmp = df.dropna(subset=["lgs_puan"])
+    keys = student_keys(tmp)
+    k = keys["ogr_key"]
+
+    base = pd.DataFrame({
+        "ogr_no": group_mode(k, tmp["ogr_no"]),
+        "ad_soyad": group_mode(k, keys["ad_norm"]),
+        "sinif": group_mode(k, tmp["sinif"]),
+        "deneme_sayisi": tmp.groupby(k.to_numpy())["exam_name"].nunique(),
+    }).sort_index()
+    base[["ogr_no", "ad_soyad", "sinif"]] = base[["ogr_no", "ad_soyad", "sinif"]].fillna("")
+
+    # Deneme başına ortalama puan (pivot_table yerine tek groupby)
+    # float32 saklanan puanlar ortalamada float64'e çıkar (yuvarlama farkı olmasın)
+    puan = tmp["lgs_puan"].astype("float64")
+    pivot = puan.groupby([k.to_numpy(), tmp["exam_name"].to_numpy()]).mean().unstack()
+    present = [e for e in exam_order if e in pivot.columns]
+    exam_cols = [f"{i + 1}. Sınav" for i in range(len(present))]
+    scores = pivot.reindex(index=base.index, columns=present)
+    scores.columns = exam_cols
+
+    g = pd.concat([base, scores], axis=1)
+    g["Ortalama"] = g[exam_cols].mean(axis=1, skipna=True).round(2)
+
+    # Tam sıralama yerine: adayları nlargest ile seç, sadece onları sırala
+    cand = g
+    if top_n is not None:
+        cand = g.nlargest(top_n, ["Ortalama", "deneme_sayisi"], keep="all")
+        cand = g[g.index.isin(cand.index)] if len(cand) >= top_n else g
+    top = cand.sort_values(["Ortalama", "deneme_sayisi"], ascending=[False, False], kind="stable")
+    top = (top.head(top_n) if top_n is not None else top).reset_index(drop=True)
+    top.insert(0, "Sıra", range(1, len(top) + 1))
+
+    show = top[["Sıra", "ogr_no", "ad_soyad", "sinif"] + exam_cols + ["Ortalama"]].rename(columns={
+        "ogr_no": "Okul No",
+        "ad_soyad": "Ad Soyad",
+        "sinif": "Sınıf",
+    })
+    for c in exam_cols + ["Ortalama"]:
+        show[c] = pd.to_numeric(show[c], errors="coerce").round(2)
+    show.attrs["exams"] = [str(e) for e in present]
+    return show
+
+
+# --------------------
+# KOHORT EĞİLİMLERİ
+# --------------------
+TREND_COLUMNS = [
+    "ad_soyad", "sinif", "n_exams", "first", "last", "change", "slope", "volatility",
+    "pct_first", "pct_last", "rank_first", "rank_last", "rank_change",
+]
+PCT_PREFIX = "pct:"  # deneme başına yüzdelik kolonları: "pct:<deneme>"
+
+
+def _first_last(values: np.ndarray, mask: np.ndarray):
+    """Her satırın ilk ve son dolu değeri (dolu yoksa NaN)."""
+    m = values.shape[1]
+    first_i = mask.argmax(axis=1)
+    last_i = m - 1 - mask[:, ::-1].argmax(axis=1)
+    rows = np.arange(len(values))
+    has = mask.any(axis=1)
+    return np.where(has, values[rows, first_i], np.nan), np.where(has, values[rows, last_i], np.nan)
+
+
+def cohort_trends(df: pd.DataFrame, exam_order) -> pd.DataFrame:
+    """
+    Kademedeki her öğrenci için (index: ogr_key), denemeler exam_order sırasıyla:
+    - slope: deneme başına puan değişimi (en küçük kareler; en az 2 deneme)
+    - volatility: puanların bu doğrudan sapmasının standart sapması
+    - pct_first / pct_last: ilk / son girdiği denemede kademe içi yüzdelik (100 = en iyi)
+    - "pct:<deneme>": her denemedeki yüzdelik (girmediği denemede NaN), exam_order sırasıyla
+    - rank_first / rank_last / rank_change: aynı denemelerdeki kademe sırası;
+      rank_change > 0 sıralamada yükseldi demektir.
+    Tüm öğrenciler öğrenci × deneme matrisi üzerinde birlikte hesaplanır.
+    """
+    tmp = df.dropna(subset=["lgs_puan"])
+    if tmp.empty:
+        return pd.DataFrame(columns=TREND_COLUMNS, index=pd.Index([], name="ogr_key"))
+    k = student_keys(tmp)["ogr_key"]
+    puan = tmp["lgs_puan"].astype("float64")
+    scores = puan.groupby([k.to_numpy(), tmp["exam_name"].astype("str").to_numpy()]).mean().unstack()
+    order = [e for e in exam_order if e in scores.columns]
+    order += sorted(c for c in scores.columns if c not in order)
+    scores = scores[order]
+
+    y = scores.to_numpy()
+    mask = ~np.isnan(y)
+    n = mask.sum(axis=1)
+    x = np.broadcast_to(np.arange(y.shape[1], dtype="float64"), y.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(mask, x, 0).sum(axis=1) / n
+        y_mean = np.where(mask, y, 0).sum(axis=1) / n
+        dx = np.where(mask, x - x_mean[:, None], 0)
+        dy = np.where(mask, y - y_mean[:, None], 0)
+        slope = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+        slope = np.where(n >= 2, slope, np.nan)
+        resid = np.where(mask, dy - np.nan_to_num(slope)[:, None] * dx, 0)
+        volatility = np.where(n >= 2, np.sqrt((resid * resid).sum(axis=1) / n), np.nan)
+
+    pct = scores.rank(axis=0, pct=True, method="average").to_numpy() * 100
+    rank = scores.rank(axis=0, ascending=False, method="min").to_numpy()
+    first, last = _first_last(y, mask)
+    pct_first, pct_last = _first_last(pct, mask)
+    rank_first, rank_last = _first_last(rank, mask)
+
+    last_rows = tmp.assign(_k=k.to_numpy()).sort_values("created_at", kind="stable").drop_duplicates("_k", keep="last")
+    last_rows = last_rows.set_index("_k").reindex(scores.index)
+    out = pd.DataFrame({
+        "ad_soyad": last_rows["ad_soyad"].astype("str").to_numpy(),
+        "sinif": last_rows["sinif"].astype("str").to_numpy(),
+        "n_exams": n,
+        "first": first,
+        "last": last,
+        "change": last - first,
+        "slope": slope,
+        "volatility": volatility,
+        "pct_first": pct_first,
+        "pct_last": pct_last,
+        "rank_first": rank_first,
+        "rank_last": rank_last,
+        "rank_change": rank_first - rank_last,
+    }, index=pd.Index(scores.index, name="ogr_key"))
+    per_exam = pd.DataFrame(pct, index=out.index, columns=[f"{PCT_PREFIX}{e}" for e in order])
+    return pd.concat([out, per_exam], axis=1)
+
+
+def risers_fallers(trends: pd.DataFrame, top_n: int = 10, siniflar=None):
+    """En çok yükselen ve düşen top_n öğrenci (sıra değişimine, eşitlikte eğime göre)."""
+    t = trends[trends["n_exams"] >= 2]
+    if siniflar is not None:
+        t = t[t["sinif"].isin(list(siniflar))]
+    up = t[t["rank_change"] > 0].sort_values(["rank_change", "slope"], ascending=False, kind="stable")
+    down = t[t["rank_change"] < 0].sort_values(["rank_change", "slope"], ascending=True, kind="stable")
+    return up.head(top_n), down.head(top_n)
@@ -1,38 +1,124 @@
-import re
+import time
+_RUN_T0 = time.perf_counter()  # kurulum süresi ölçümü (her rerun)
+
 import os
+import contextvars
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import partial, wraps
+import hashlib
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-from supabase import create_client
 
-# Network errors
-try:
-    import httpx
-except Exception:  # pragma: no cover
-    httpx = None
-
-# PDF (ReportLab)
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_RIGHT
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from analytics import (
+    ALL_CLASSES,
+    NET_INDEX,
+    PERCENTILES,
+    SUBJECT_COLUMNS,
+    class_subject_nets,
+    cohort_trends,
+    combine_summaries,
+    nets_matrix,
+    payload_to_nets,
+    rank_all_exams,
+    risers_fallers,
+    subject_matrix,
+    text_or_empty,
+)
+from exports import ranking_xlsx, subject_nets_xlsx
+from ingest import expand_uploads, parse_many, read_school_report
+from snapshot import CATEGORY_COLUMNS, compact, read_snapshot, write_snapshot
+from storage import open_storage
+from pipeline import (
+    RESULT_COLUMNS,
+    SUMMARY_TABLE,
+    TABLE,
+    TOMBSTONE_TABLE,
+    BackendUnavailable,
+    CircuitBreaker,
+    SaveError,
+    is_transient_error,
+    save_exams,
+    select_all,
+    top40_table,
+    trend_for,
+)
+from perf import begin_run, perf_logger, size_of, span
+from reports import (
+    LOGO_PATH,
+    auto_comment,
+    build_merged_student_pdf,
+    build_reports_zip,
+    build_student_pdf,
+    build_subject_heatmap_pdf,
+    build_top40_pdf,
+)
 
 # --------------------
 # AYARLAR
 # --------------------
 st.set_page_config(page_title="Akademik Takip (5-8)", layout="wide")
 
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_ANON_KEY = st.secrets["SUPABASE_ANON_KEY"]
-supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
 
-TABLE = "lgs_results"
-LOGO_PATH = "assets/images/logo.jpg"  # varsa kullanılır
-FONT_PATH = "assets/fonts/DejaVuSans.ttf"  # Türkçe için
+
+def _setting(name: str, default=None):
+    # Ortam değişkeni > .streamlit/secrets.toml > varsayılan
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        return default
+
+
+# "supabase" (varsayılan) ya da "sqlite": yerel dosya, çevrimdışı çalışma / testler
+STORAGE_BACKEND = _setting("STORAGE_BACKEND", "supabase")
+LOCAL_DB_PATH = _setting("LOCAL_DB_PATH", "data/akademik.sqlite")
+
+logger = logging.getLogger("akademik_takip")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+# Zaman ölçümleri: satır başına bir JSON nesnesi (boş: stderr)
+PERF_LOG_PATH = _setting("PERF_LOG_PATH", "")
+if not perf_logger.handlers:
+    _perf_handler = logging.FileHandler(PERF_LOG_PATH, encoding="utf-8") if PERF_LOG_PATH else logging.StreamHandler()
+    _perf_handler.setFormatter(logging.Formatter("%(message)s"))
+    perf_logger.addHandler(_perf_handler)
+    perf_logger.setLevel(logging.INFO)
+    perf_logger.propagate = False
+
+try:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    _ctx = get_script_run_ctx()
+except Exception:
+    _ctx = None
+RUN_SPANS = begin_run(session=_ctx.session_id[:8] if _ctx else None)
+
+
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    # Sunucu süreci başına tek istemci: HTTP bağlantıları / SQLite dosyası rerun'lar arasında yeniden kullanılır.
+    if STORAGE_BACKEND == "supabase":
+        return open_storage("supabase", url=st.secrets["SUPABASE_URL"], key=st.secrets["SUPABASE_ANON_KEY"])
+    return open_storage(STORAGE_BACKEND, path=LOCAL_DB_PATH)
+
+
+db = get_storage()
+
+
+@st.cache_resource(show_spinner=False)
+def get_breaker() -> CircuitBreaker:
+    # Süreç başına tek devre: arka plan tazelemesi ve ön plan sorguları aynı durumu görür
+    return CircuitBreaker()
+
 
 # --------------------
 # SUPABASE HATA YÖNETİMİ
@@ -43,17 +129,10 @@ def _supabase_err_msg(e: Exception) -> str:
     return "Supabase bağlantısı kurulamadı. Proje paused olabilir veya ağ/URL/KEY sorunu olabilir." 
 
 
-def _is_connect_error(e: Exception) -> bool:
-    if httpx is not None and isinstance(e, Exception):
-        try:
-            return isinstance(e, httpx.ConnectError)
-        except Exception:
-            return False
-    # httpx yoksa da 'ConnectError' string kontrolü
-    return "ConnectError" in type(e).__name__ or "ConnectError" in str(e)
-
-
 def show_supabase_error(e: Exception, where: str):
+    if isinstance(e, BackendUnavailable):
+        # Sunucuya gidilmedi; durum panel başlığında (bayat veri uyarısı) gösterilir
+        return
     st.error(f"❌ {where}: {_supabase_err_msg(e)}")
     with st.expander("Kontrol listesi"):
         st.markdown(
@@ -64,10 +143,42 @@ def show_supabase_error(e: Exception, where: str):
         )
 
 
+STALE_CACHE_ROWS = 500_000  # son başarılı yanıtlar için toplam satır sınırı
+
+
+@st.cache_resource(show_spinner=False)
+def get_last_good() -> "LRUCache":
+    # (sorgu, argümanlar) -> son başarılı sunucu yanıtı; kesintide boş tablo yerine sunulur
+    return LRUCache(STALE_CACHE_ROWS, sizeof=len)
+
+
+def served(key, df: pd.DataFrame) -> pd.DataFrame:
+    """Başarılı sunucu yanıtı: devreye işlenir ve bayat kopya olarak saklanır."""
+    get_breaker().success()
+    get_last_good().put(key, df)
+    return df
+
+
+def stale_or(key, e: Exception, where, empty: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sunucu hatası devreye işlenir. Geçici hatada (ya da devre açıkken) aynı sorgunun
+    son başarılı yanıtı varsa o döner; panel başlığı bayat veri uyarısını gösterir.
+    Yoksa hata gösterilir (where None ise sessiz) ve empty döner.
+    """
+    get_breaker().failure(e)
+    if isinstance(e, BackendUnavailable) or is_transient_error(e):
+        last = get_last_good().get(key)
+        if last is not None:
+            return last
+    if where is not None:
+        show_supabase_error(e, where)
+    return empty
+
+
 # --------------------
 # STİL
 # --------------------
-st.markdown("""
+APP_CSS = """
 <style>
 /* Layout */
 .main .block-container {max-width: 1280px; padding-top: 1.2rem; padding-bottom: 2.2rem;}
@@ -126,178 +237,802 @@ st.markdown("""
 /* Dataframe nicer */
 [data-testid="stDataFrame"] {border-radius: 14px; overflow:hidden; border: 1px solid rgba(255,255,255,0.10);}
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(APP_CSS, unsafe_allow_html=True)
+
+# --------------------
+# SÜRÜMLÜ ÖNBELLEK
+# --------------------
+# Kayıttan sonra st.cache_data.clear() yerine sadece etkilenen kapsamların sürümü
+# artırılır: ("exam", ad), ("kademe", k), ("index",). Önbellekli fonksiyonun anahtarı
+# bağlı olduğu kapsamların sürümlerini içerir; diğer girdiler (ör. başka kademeler,
+# yüklenen dosyaların ayrıştırması) korunur.
+class CacheRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = {}
+        self.calls = {}
+        self.misses = {}
+
+    def version(self, scopes) -> tuple:
+        with self.lock:
+            return tuple(self.versions.get(s, 0) for s in scopes)
+
+    def bump(self, scopes):
+        with self.lock:
+            for s in scopes:
+                self.versions[s] = self.versions.get(s, 0) + 1
+
+    def count(self, name: str, miss: bool = False):
+        with self.lock:
+            d = self.misses if miss else self.calls
+            d[name] = d.get(name, 0) + 1
+
+    def stats(self) -> pd.DataFrame:
+        with self.lock:
+            rows = [
+                {"Önbellek": n, "Çağrı": c, "İsabet": c - self.misses.get(n, 0), "Iska": self.misses.get(n, 0)}
+                for n, c in sorted(self.calls.items())
+            ]
+        return pd.DataFrame(rows, columns=["Önbellek", "Çağrı", "İsabet", "Iska"])
+
+
+@st.cache_resource(show_spinner=False)
+def get_cache_registry() -> CacheRegistry:
+    return CacheRegistry()
+
+
+# Bu çağrıda önbellekli fonksiyon gerçekten çalıştı mı (span'e "hit"/"miss" yazılır)
+_cache_miss = contextvars.ContextVar("cache_miss", default=False)
+
+
+def versioned_cache(scopes, ttl=None):
+    """
+    st.cache_data + kapsam sürümleri. scopes(*args, **kwargs) çağrının bağlı olduğu
+    kapsamları döndürür; bunlardan biri invalidate ile artırılınca anahtar değişir.
+    """
+    def deco(fn):
+        name = fn.__name__
+
+        def cached(cache_name, version, *args, **kwargs):
+            get_cache_registry().count(cache_name, miss=True)
+            _cache_miss.set(True)
+            return fn(*args, **kwargs)
+
+        # st.cache_data fonksiyonu adından tanır: her sarmalanan fonksiyon ayrı önbellek
+        cached.__qualname__ = f"{fn.__qualname__}.cached"
+        cached = st.cache_data(show_spinner=False, ttl=ttl)(cached)
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            reg = get_cache_registry()
+            reg.count(name)
+            token = _cache_miss.set(False)
+            try:
+                with span(name) as rec:
+                    # Devre toparlanınca (epoch) kesinti sırasında önbelleğe giren boş sonuçlar kullanılmaz
+                    version = (reg.version(scopes(*args, **kwargs)), get_breaker().epoch)
+                    out = cached(name, version, *args, **kwargs)
+                    rec["cache"] = "miss" if _cache_miss.get() else "hit"
+                    rec["rows"] = size_of(out)
+            finally:
+                _cache_miss.reset(token)
+            return out
+
+        wrapper.clear = cached.clear
+        return wrapper
+    return deco
+
+
+def _results_scopes(kademe, exam_name=None, *args, **kwargs):
+    return [("exam", exam_name)] if exam_name is not None else [("kademe", kademe)]
+
+
+def invalidate_exams(exams, old_kademeler=()) -> None:
+    """
+    Kaydedilen denemelere bağlı önbellekleri geçersiz kılar: denemenin kendisi,
+    eski ve yeni kademeleri (tüm denemeler sıralaması), deneme listesi ve payload'lar.
+    old_kademeler: kayıttan önce sunucudan okunan kademeler (save_exams dönüşü);
+    önbellekteki deneme listesi bayat olabilir.
+    """
+    names = {name for _, name in exams}
+    kademeler = {int(k) for k in old_kademeler}
+    for df_exam, _ in exams:
+        kademeler.update(int(k) for k in pd.to_numeric(df_exam["Kademe"], errors="coerce").dropna().unique())
+
+    get_cache_registry().bump(
+        [("exam", n) for n in names] + [("kademe", k) for k in kademeler] + [("index",)]
+    )
+    get_payload_cache().discard(lambda key: key[0] in names)
+
 
 # --------------------
 # YARDIMCI
 # --------------------
-def make_unique_columns(col_list):
-    seen = {}
-    out = []
-    for c in col_list:
-        name = str(c).strip()
-        if name == "" or name.lower() in ["none", "nan"]:
-            name = "Kolon"
-        if name in seen:
-            seen[name] += 1
-            name = f"{name}_{seen[name]}"
-        else:
-            seen[name] = 0
-        out.append(name)
+@versioned_cache(lambda uploaded_file: [])
+def parse_school_report(uploaded_file):
+    return read_school_report(uploaded_file)
+
+def save_exams_to_supabase(exams) -> bool:
+    """
+    exams: (df_exam, exam_name) listesi. (exam_name, ogr_no) anahtarıyla upsert:
+    sadece içerik özeti değişen satırlar gönderilir, dosyada artık olmayan öğrenciler
+    en son silinir. Böylece yarıda kalan bir kayıt denemeyi eksik bırakmaz.
+    """
+    with span("save_exams", exams=len(exams)) as rec:
+        try:
+            stats = save_exams(db, exams, breaker=get_breaker())
+            rec.update(stats)
+            get_breaker().success()
+        except SaveError as e:
+            get_breaker().failure(e.cause)
+            if isinstance(e.cause, BackendUnavailable):
+                # Kayıt sunucuya gidilmeden / ilk bağlantı hatasında durdu: kullanıcı bilmeli
+                st.error(f"❌ {e.stage}: Supabase’e ulaşılamıyor, {e.cause.retry_in:.0f} sn sonra tekrar deneyin.")
+            else:
+                show_supabase_error(e.cause, e.stage)
+            return False
+
+        # Yerel kopya kayıttan hemen sonra tazelenir (sadece değişen satırlar iner)
+        try:
+            with span("snapshot_refresh"):
+                get_results_snapshot().refresh(db)
+        except Exception as e:
+            logger.warning("sonuç kopyası yenilenemedi: %s", _supabase_err_msg(e))
+        invalidate_exams(exams, stats["kademeler"])
+        return True
+
+
+def save_exam_to_supabase(df_exam: pd.DataFrame, exam_name: str) -> bool:
+    """Supabase'e kaydet. Bağlantı hatasında uygulama çökmesin."""
+    return save_exams_to_supabase([(df_exam, exam_name)])
+
+
+# --------------------
+# SENKRONİZASYON (delta)
+# --------------------
+# payload (JSONB) panel sorgularına dahil edilmez; gerektiğinde fetch_payloads ile gelir
+# (RESULT_COLUMNS, TOMBSTONE_TABLE: pipeline.py).
+
+
+SYNC_COLUMNS = RESULT_COLUMNS + ",id,updated_at"
+ROW_KEY = ["exam_name", "ogr_no"]
+# Delta sorgusu watermark'tan bu kadar geriden başlar: Postgres'te updated_at işlemin
+# başlama zamanıdır, eşzamanlı kayıt parçaları watermark'tan eski damgayla sonradan commit olabilir
+SYNC_LAG_SECONDS = 30
+SNAPSHOT_PATH = _setting("SNAPSHOT_PATH", "data/lgs_results.arrow")  # boş: diske yazma
+SNAPSHOT_REFRESH_SECONDS = 10
+
+
+class ResultsSnapshot:
+    """
+    lgs_results tablosunun yerel kopyası.
+    - İlk çağrıda tablo bir kez (sayfalı) indirilir.
+    - Sonraki çağrılarda sadece updated_at > watermark - SYNC_LAG_SECONDS olan satırlar
+      istenir ve id (ve (exam_name, ogr_no)) ile yerel kopyadaki eski hâllerinin yerine
+      geçer; pencerede yeniden gelen satır zararsızdır.
+    - Silinen satırlar lgs_tombstones'tan gelir: ogr_no dolu ise tek satır, boş ise
+      denemenin tamamı (deleted_at'tan eski olanlar) yerelden düşülür.
+    - Sunucudaki satır sayısı (HEAD isteği) tutmazsa tam yükleme yapılır.
+    - payload senkronizasyona girmez (her delta'da JSONB taşınmasın); ders netleri
+      gerektiğinde deneme başına fetch_exam_nets ile iner.
+    - Kopya diske (Arrow, memory-map) yazılır; yeniden başlatmada oradan açılır ve
+      arka planda delta ile tazelenir.
+    - Sunucu yavaş / kapalıyken eldeki kopya (bayat olsa da) sunulur; arka plan
+      tazelemesi devre kesicinin (CircuitBreaker) üstel beklemesine uyar. synced_at:
+      son başarılı eşitleme (UTC).
+    """
+
+    def __init__(self, path: str = None, source: str = None):
+        self.lock = threading.Lock()
+        self.df = None
+        self.watermark = None
+        self.tomb_watermark = None
+        self.path = path
+        self.source = source  # başka bir depoya ait disk kopyası kullanılmaz
+        self.dirty = False
+        self.refreshing = threading.Lock()
+        self.last_refresh = 0.0
+        self.synced_at = None
+        self._key_index = (None, {})
+
+    def key_index(self, df: pd.DataFrame) -> dict:
+        """ogr_key -> satır konumları. df (kopyanın o anki hâli) değişince yeniden kurulur."""
+        built_for, index = self._key_index
+        if built_for is not df:
+            index = df.groupby("ogr_key", sort=False).indices if not df.empty else {}
+            self._key_index = (df, index)
+        return index
+
+    def _frame(self, rows) -> pd.DataFrame:
+        return compact(pd.DataFrame(rows, columns=SYNC_COLUMNS.split(",")))
+
+    def _full_load(self, client):
+        rows = select_all(lambda: client.table(TABLE).select(SYNC_COLUMNS).order("updated_at"))
+        self.df = self._frame(rows)
+        self.dirty = True
+        self.watermark = self._max_ts(self.df["updated_at"])
+        try:
+            res = client.table(TOMBSTONE_TABLE).select("deleted_at").order("deleted_at", desc=True).limit(1).execute()
+            self.tomb_watermark = (res.data or [{}])[0].get("deleted_at")
+        except Exception:
+            self.tomb_watermark = None
+
+    @staticmethod
+    def _max_ts(s: pd.Series):
+        s = s.dropna()
+        if s.empty:
+            return None
+        ts = pd.to_datetime(s, utc=True, errors="coerce")
+        if ts.isna().all():
+            return None
+        return s.iloc[int(ts.values.argmax())]
+
+    def _apply_tombstones(self, client):
+        q = client.table(TOMBSTONE_TABLE).select("exam_name,ogr_no,deleted_at").order("deleted_at")
+        if self.tomb_watermark is not None:
+            # Yeniden uygulanan tombstone zararsız (sadece deleted_at'ten eski satırları düşer)
+            q = q.gt("deleted_at", self._lagged(self.tomb_watermark))
+        tombs = q.execute().data or []
+        if not tombs:
+            return
+        updated = pd.to_datetime(self.df["updated_at"], utc=True, errors="coerce")
+        drop = pd.Series(False, index=self.df.index)
+        for t in tombs:
+            hit = (self.df["exam_name"] == t["exam_name"]) & (updated <= pd.to_datetime(t["deleted_at"], utc=True))
+            if t.get("ogr_no") is not None:
+                hit &= (self.df["ogr_no"] == t["ogr_no"]).fillna(False)
+            drop |= hit
+        self.df = self.df[~drop].reset_index(drop=True)
+        self.tomb_watermark = tombs[-1]["deleted_at"]
+        self.dirty = True
+
+    @staticmethod
+    def _lagged(ts) -> str:
+        """ts - SYNC_LAG_SECONDS, sunucudaki damga biçiminde."""
+        t = pd.Timestamp(ts)
+        t = t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+        return (t - pd.Timedelta(seconds=SYNC_LAG_SECONDS)).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+    def _merge(self, ddf: pd.DataFrame):
+        # Güncellenen (ya da gecikme penceresinde yeniden gelen) satırların eski hâlleri
+        # id ile atılır; okul no'lu satırlar ayrıca (exam_name, ogr_no) ile
+        keyed = ddf.dropna(subset=["ogr_no"])
+        old = pd.MultiIndex.from_frame(self.df[ROW_KEY])
+        new = pd.MultiIndex.from_frame(keyed[ROW_KEY])
+        drop = old.isin(new) | self.df["id"].isin(ddf["id"].dropna()).to_numpy()
+        self.df = compact(pd.concat([self.df[~drop], ddf], ignore_index=True))
+        self.dirty = True
+
+    def _server_count(self, client) -> int:
+        res = client.table(TABLE).select("exam_name", count="exact", head=True).execute()
+        return res.count
+
+    def sync(self, client) -> pd.DataFrame:
+        with self.lock:
+            if self.df is None or self.watermark is None:
+                self._full_load(client)
+                self.synced_at = datetime.now(timezone.utc)
+                return self.df
+
+            try:
+                self._apply_tombstones(client)
+            except Exception:
+                # Tombstone tablosu yoksa sayım kontrolü tutarsızlığı yakalar.
+                pass
+
+            delta = select_all(
+                lambda: client.table(TABLE).select(SYNC_COLUMNS)
+                .gt("updated_at", self._lagged(self.watermark)).order("updated_at")
+            )
+            if delta:
+                ddf = self._frame(delta)
+                self._merge(ddf)
+                # Pencere geriye baktığı için watermark geri gitmez
+                self.watermark = self._max_ts(pd.Series([self.watermark, self._max_ts(ddf["updated_at"])]))
+
+            if self._server_count(client) != len(self.df):
+                self._full_load(client)
+            self.synced_at = datetime.now(timezone.utc)
+            return self.df
+
+    # --- disk kopyası ---
+    def load(self) -> bool:
+        got = read_snapshot(self.path) if self.path else None
+        if got is None or got[1].get("source") != self.source:
+            return False
+        df, meta = got
+        with self.lock:
+            self.df = df
+            self.watermark = meta.get("watermark")
+            self.tomb_watermark = meta.get("tomb_watermark")
+            synced = meta.get("synced_at")
+            self.synced_at = datetime.fromisoformat(synced) if synced else None
+            self.dirty = False
+        return True
+
+    def persist(self):
+        with self.lock:
+            if not self.path or self.df is None or not self.dirty:
+                return
+            write_snapshot(self.path, self.df, {
+                "source": self.source,
+                "watermark": self.watermark,
+                "tomb_watermark": self.tomb_watermark,
+                "synced_at": self.synced_at,
+            })
+            self.dirty = False
+
+    def refresh(self, client):
+        self.sync(client)
+        self.persist()
+
+    def refresh_in_background(self, client, breaker: CircuitBreaker = None, min_interval: float = SNAPSHOT_REFRESH_SECONDS):
+        """
+        Kopya okunurken çağrılır; tek thread, en fazla min_interval saniyede bir.
+        Hata sonrası bekleme breaker'dan gelir (üstel); devre açıkken denenmez.
+        """
+        wait = max(min_interval, breaker.backoff() if breaker else 0.0)
+        if time.monotonic() - self.last_refresh < wait:
+            return
+        if breaker is not None and not breaker.allow():
+            return
+        if not self.refreshing.acquire(blocking=False):
+            return
+        self.last_refresh = time.monotonic()
+
+        def run():
+            try:
+                self.refresh(client)
+                if breaker is not None:
+                    breaker.success()
+            except Exception as e:
+                if breaker is not None:
+                    breaker.failure(e)
+                logger.warning("sonuç kopyası yenilenemedi: %s", _supabase_err_msg(e))
+            finally:
+                self.refreshing.release()
+
+        threading.Thread(target=run, name="lgs-snapshot-refresh", daemon=True).start()
+
+
+def _storage_id() -> str:
+    where = st.secrets.get("SUPABASE_URL", "") if STORAGE_BACKEND == "supabase" else LOCAL_DB_PATH
+    return f"{STORAGE_BACKEND}:{where}"
+
+
+@st.cache_resource(show_spinner=False)
+def get_results_snapshot() -> ResultsSnapshot:
+    # Yeniden başlatmada son kopya diskten hemen açılır; tazeleme arka planda
+    snap = ResultsSnapshot(SNAPSHOT_PATH or None, source=_storage_id())
+    t0 = time.perf_counter()
+    if snap.load():
+        logger.info("sonuç kopyası diskten açıldı: %d satır, %.1f ms", len(snap.df), (time.perf_counter() - t0) * 1000)
+    return snap
+
+
+def local_results():
+    """
+    Yerel kopya hazırsa onu döndürür (ve gerekirse arka planda tazeler); değilse None:
+    çağıran sunucuya sorar. İlk açılışta tam yükleme de arka planda başlar.
+    """
+    snap = get_results_snapshot()
+    snap.refresh_in_background(db, get_breaker())
+    return snap.df
+
+
+def _plain(df: pd.DataFrame) -> pd.DataFrame:
+    # Açılır listeler için: kategorik kolonlar metne döner
+    out = df.reset_index(drop=True)
+    for c in CATEGORY_COLUMNS:
+        if c in out.columns:
+            out[c] = out[c].astype("str")
     return out
 
-def extract_kademe(sinif: str):
-    if not sinif:
-        return None
-    m = re.match(r"^\s*(\d+)\s*[-/ ]", str(sinif))
-    if m:
-        return int(m.group(1))
-    m2 = re.match(r"^\s*(\d+)", str(sinif))
-    if m2:
-        return int(m2.group(1))
-    return None
-
-@st.cache_data(show_spinner=False)
-def parse_school_report(uploaded_file):
-    raw = pd.read_excel(uploaded_file, header=None)
-    raw = raw.dropna(axis=1, how="all")
 
-    exam_name = "Deneme"
+# --------------------
+# SORGU KATMANI (filtreler Supabase tarafında)
+# --------------------
+INDEX_VIEW = "lgs_exam_index"  # kademe × deneme × sınıf özet görünümü
+INDEX_COLUMNS = ["kademe", "exam_name", "sinif", "n", "created_at"]
+
+
+def _index_from_rows(raw: pd.DataFrame) -> pd.DataFrame:
+    if raw.empty:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    return (
+        raw.groupby(["kademe", "exam_name", "sinif"], dropna=False, observed=True)
+           .agg(n=("exam_name", "size"), created_at=("created_at", "min"))
+           .reset_index()[INDEX_COLUMNS]
+    )
+
+
+@versioned_cache(lambda: [("index",)], ttl=30)
+def fetch_exam_index() -> pd.DataFrame:
+    """
+    Açılır listeler için küçük özet: her (kademe, deneme, sınıf) için satır sayısı
+    ve ilk kayıt zamanı. Yerel kopya varsa ondan; görünüm yoksa sadece bu kolonlar
+    çekilip burada toplanır.
+    """
+    local = local_results()
+    if local is not None:
+        return _plain(_index_from_rows(local[["kademe", "exam_name", "sinif", "created_at"]]))
+    key = ("fetch_exam_index",)
     try:
-        v = raw.iloc[1, 0]
-        if pd.notna(v):
-            exam_name = str(v).strip()
-    except Exception:
-        pass
-
-    header_idx = None
-    for i in range(len(raw)):
-        if str(raw.iloc[i, 0]).strip() == "Öğr.No":
-            header_idx = i
-            break
-    if header_idx is None:
-        raise ValueError("Başlık satırı bulunamadı: 'Öğr.No' yok.")
-
-    grp = raw.iloc[header_idx - 2].copy().ffill()
-    top = raw.iloc[header_idx - 1].copy().ffill()
-    sub = raw.iloc[header_idx].copy()
-
-    cols = []
-    for j in range(len(sub)):
-        g = str(grp.iloc[j]).strip() if pd.notna(grp.iloc[j]) else ""
-        t = str(top.iloc[j]).strip() if pd.notna(top.iloc[j]) else ""
-        s = str(sub.iloc[j]).strip() if pd.notna(sub.iloc[j]) else ""
-
-        if j == 0:
-            cols.append("OgrNo")
-        elif j == 1:
-            cols.append("AdSoyad")
-        elif j == 2:
-            cols.append("Sinif")
-        else:
-            if g.lower() == "lgs" and t.lower() == "puan":
-                cols.append("LGS_Puan")
-            elif t.lower() == "dereceler" and s in ["Sınıf", "Kurum", "İlçe", "İl", "Genel"]:
-                cols.append(f"Derece_{s}")
-            elif s in ["D", "Y", "N"]:
-                cols.append(f"{t}_{s}")
-            else:
-                base = t if t else g if g else f"Kolon_{j}"
-                suffix = f"_{s}" if s else ""
-                cols.append(f"{base}{suffix}")
+        get_breaker().check()
+        try:
+            rows = select_all(
+                lambda: db.table(INDEX_VIEW).select(",".join(INDEX_COLUMNS))
+                .order("kademe").order("exam_name").order("sinif")
+            )
+            return served(key, pd.DataFrame(rows, columns=INDEX_COLUMNS))
+        except Exception as e:
+            if is_transient_error(e):
+                raise
+        # Görünüm henüz oluşturulmamış: sadece dar kolonlar çekilir
+        rows = select_all(lambda: db.table(TABLE).select("kademe,exam_name,sinif,created_at"))
+        return served(key, _index_from_rows(pd.DataFrame(rows, columns=["kademe", "exam_name", "sinif", "created_at"])))
+    except Exception as e:
+        return stale_or(key, e, "Veri çekme başarısız", pd.DataFrame(columns=INDEX_COLUMNS))
+
+
+def _local_mask(df: pd.DataFrame, kademe, exam_name=None, siniflar=None, ad_soyad=None) -> pd.Series:
+    m = df["kademe"] == kademe
+    if exam_name is not None:
+        m &= df["exam_name"] == exam_name
+    if siniflar is not None:
+        m &= df["sinif"].isin(list(siniflar))
+    if ad_soyad is not None:
+        m &= df["ad_soyad"] == ad_soyad
+    return m
+
+
+@versioned_cache(_results_scopes, ttl=30)
+def fetch_results(kademe: int, exam_name=None, siniflar=None, ad_soyad=None) -> pd.DataFrame:
+    """
+    Seçili dilimi getirir; filtreler PostgREST'e eq/in_ olarak gider.
+    siniflar: None => tüm sınıflar (in_ filtresi eklenmez). Önbellek anahtarı
+    parametrelerin kendisidir, bu yüzden tuple verilmeli. Yerel kopya hazırsa
+    aynı filtreler onun üzerinde maskelerle uygulanır.
+    """
+    local = local_results()
+    if local is not None:
+        m = _local_mask(local, kademe, exam_name, siniflar, ad_soyad)
+        # Dar tipler korunur (kategorik exam_name/sinif, int8 kademe, float32 puan)
+        return compact(local.loc[m, RESULT_COLUMNS.split(",")].sort_values("created_at", kind="stable").reset_index(drop=True))
+
+    def make_query():
+        q = db.table(TABLE).select(RESULT_COLUMNS).eq("kademe", kademe)
+        if exam_name is not None:
+            q = q.eq("exam_name", exam_name)
+        if siniflar is not None:
+            q = q.in_("sinif", list(siniflar))
+        if ad_soyad is not None:
+            q = q.eq("ad_soyad", ad_soyad)
+        return q.order("created_at")
+
+    if siniflar is not None and len(siniflar) == 0:
+        return compact(pd.DataFrame(columns=RESULT_COLUMNS.split(",")))
+    key = ("fetch_results", kademe, exam_name, None if siniflar is None else tuple(siniflar), ad_soyad)
+    try:
+        get_breaker().check()
+        return served(key, compact(pd.DataFrame(select_all(make_query), columns=RESULT_COLUMNS.split(","))))
+    except Exception as e:
+        return stale_or(key, e, "Veri çekme başarısız", pd.DataFrame(columns=RESULT_COLUMNS.split(",")))
 
-    cols = make_unique_columns(cols)
 
-    df = raw.iloc[header_idx + 1:].copy()
-    df.columns = cols
-    df = df.dropna(how="all")
+SUMMARY_COLUMNS = ["exam_name", "kademe", "sinif", "n", "n_puan", "mean", "max"] + [f"p{p}" for p in PERCENTILES] + ["top"]
 
-    first = df["OgrNo"].astype(str)
-    df = df[~first.str.contains("Genel Ortalama|Kurum Ortalaması", na=False, regex=True)].copy()
 
-    df.columns = make_unique_columns(df.columns)
+@versioned_cache(lambda kademe, exam_name: [("exam", exam_name)], ttl=30)
+def fetch_exam_summary(kademe: int, exam_name: str) -> pd.DataFrame:
+    """
+    Kayıt sırasında yazılan özet. Yoksa (eski kayıt / tablo yok) boş döner; panel
+    satırlara düşer, bu yüzden hata gösterilmez (devreye yine işlenir).
+    """
+    key = ("fetch_exam_summary", kademe, exam_name)
+    try:
+        get_breaker().check()
+        res = (
+            db.table(SUMMARY_TABLE).select(",".join(SUMMARY_COLUMNS))
+            .eq("kademe", kademe).eq("exam_name", exam_name).execute()
+        )
+        return served(key, pd.DataFrame(res.data or [], columns=SUMMARY_COLUMNS))
+    except Exception as e:
+        return stale_or(key, e, None, pd.DataFrame(columns=SUMMARY_COLUMNS))
 
-    df["OgrNo"] = pd.to_numeric(df["OgrNo"], errors="coerce")
-    if "LGS_Puan" in df.columns:
-        df["LGS_Puan"] = pd.to_numeric(df["LGS_Puan"], errors="coerce")
 
-    df["Deneme"] = exam_name
-    df["Kademe"] = df["Sinif"].apply(extract_kademe)
+STUDENT_COLUMNS = ["ogr_key", "ad_soyad"]
 
-    for c in df.columns:
-        if c.endswith("_D") or c.endswith("_Y") or c.endswith("_N"):
-            df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    return df.reset_index(drop=True), exam_name
+def student_options(df: pd.DataFrame) -> pd.DataFrame:
+    """Öğrenci başına bir satır (ogr_key, son kullanılan ad), ada göre sıralı."""
+    d = df.loc[df["ad_soyad"].fillna("") != "", STUDENT_COLUMNS + (["created_at"] if "created_at" in df else [])]
+    if "created_at" in d:
+        d = d.sort_values("created_at", kind="stable")
+    return d.drop_duplicates("ogr_key", keep="last")[STUDENT_COLUMNS].sort_values("ad_soyad").reset_index(drop=True)
 
-def _to_payload(row: pd.Series) -> dict:
-    d = row.to_dict()
-    for k, v in list(d.items()):
-        if pd.isna(v):
-            d[k] = None
-    return d
 
-def save_exam_to_supabase(df_exam: pd.DataFrame, exam_name: str) -> bool:
-    """Supabase'e kaydet. Bağlantı hatasında uygulama çökmesin."""
+@versioned_cache(_results_scopes, ttl=30)
+def fetch_students(kademe: int, exam_name=None, siniflar=None) -> pd.DataFrame:
+    """Öğrenci listesi (ogr_key, ad_soyad): dar kolonlu sorgu, yerel kopya varsa ondan."""
+    local = local_results()
+    if local is not None:
+        return student_options(local[_local_mask(local, kademe, exam_name, siniflar)])
+
+    def make_query():
+        q = db.table(TABLE).select("ogr_no,ad_soyad,sinif,ogr_key,created_at").eq("kademe", kademe)
+        if exam_name is not None:
+            q = q.eq("exam_name", exam_name)
+        if siniflar is not None:
+            q = q.in_("sinif", list(siniflar))
+        return q.order("created_at")
+
+    if siniflar is not None and len(siniflar) == 0:
+        return pd.DataFrame(columns=STUDENT_COLUMNS)
+    key = ("fetch_students", kademe, exam_name, None if siniflar is None else tuple(siniflar))
     try:
-        supabase.table(TABLE).delete().eq("exam_name", exam_name).execute()
+        get_breaker().check()
+        rows = select_all(make_query)
+        cols = ["ogr_no", "ad_soyad", "sinif", "ogr_key", "created_at"]
+        return served(key, student_options(compact(pd.DataFrame(rows, columns=cols))))
     except Exception as e:
-        show_supabase_error(e, "Kayıt silme işlemi başarısız")
-        return False
-
-    rows = []
-    for _, r in df_exam.iterrows():
-        rows.append({
-            "exam_name": exam_name,
-            "exam_date": None,
-            "kademe": int(r["Kademe"]) if pd.notna(r.get("Kademe")) else None,
-            "ogr_no": int(r["OgrNo"]) if pd.notna(r.get("OgrNo")) else None,
-            "ad_soyad": str(r.get("AdSoyad", "")).strip(),
-            "sinif": str(r.get("Sinif", "")).strip() if pd.notna(r.get("Sinif")) else None,
-            "lgs_puan": float(r.get("LGS_Puan")) if pd.notna(r.get("LGS_Puan")) else None,
-            "payload": _to_payload(r),
-        })
+        return stale_or(key, e, "Veri çekme başarısız", pd.DataFrame(columns=STUDENT_COLUMNS))
+
 
-    chunk = 300
+@versioned_cache(lambda kademe, *args, **kwargs: [("kademe", kademe)], ttl=30)
+def fetch_student_history(kademe: int, ogr_key: str) -> pd.DataFrame:
+    """
+    Bir öğrencinin kademedeki tüm denemeleri. Yerel kopyada ogr_key indeksinden
+    doğrudan okunur (kolon taraması yok); sunucuda okul no / ogr_key indeksli sorgu.
+    """
+    local = local_results()
+    if local is not None:
+        pos = get_results_snapshot().key_index(local).get(ogr_key, [])
+        rows = local.iloc[pos]
+        rows = rows.loc[rows["kademe"] == kademe, RESULT_COLUMNS.split(",")]
+        return compact(rows.sort_values("created_at", kind="stable").reset_index(drop=True))
+
+    def make_query():
+        q = db.table(TABLE).select(RESULT_COLUMNS).eq("kademe", kademe)
+        q = q.eq("ogr_no", int(ogr_key)) if ogr_key.isdigit() else q.eq("ogr_key", ogr_key)
+        return q.order("created_at")
+
+    key = ("fetch_student_history", kademe, ogr_key)
     try:
-        for i in range(0, len(rows), chunk):
-            supabase.table(TABLE).insert(rows[i:i+chunk]).execute()
+        get_breaker().check()
+        return served(key, compact(pd.DataFrame(select_all(make_query), columns=RESULT_COLUMNS.split(","))))
     except Exception as e:
-        show_supabase_error(e, "Kayıt ekleme işlemi başarısız")
-        return False
+        return stale_or(key, e, "Veri çekme başarısız", compact(pd.DataFrame(columns=RESULT_COLUMNS.split(","))))
 
-    return True
+
+# --------------------
+# PAYLOAD (talep üzerine)
+# --------------------
+PAYLOAD_CACHE_SIZE = 2000
+PAYLOAD_BATCH_SIZE = 200  # tek istekteki ogr_no sayısı (URL uzunluğu)
+
+
+class LRUCache:
+    """
+    Küçük, thread-safe LRU önbellek. sizeof verilirse maxsize toplam boyuttur
+    (ör. PDF baytları), verilmezse kayıt sayısı.
+    """
+
+    def __init__(self, maxsize: int, sizeof=None):
+        self.maxsize = maxsize
+        self.sizeof = sizeof or (lambda v: 1)
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.data:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def discard(self, pred):
+        with self.lock:
+            for key in [k for k in self.data if pred(k)]:
+                self.total -= self.sizeof(self.data.pop(key))
+
+    def put(self, key, value):
+        with self.lock:
+            if key in self.data:
+                self.total -= self.sizeof(self.data.pop(key))
+            self.data[key] = value
+            self.total += self.sizeof(value)
+            while self.total > self.maxsize and len(self.data) > 1:
+                _, old = self.data.popitem(last=False)
+                self.total -= self.sizeof(old)
+
+
+@st.cache_resource(show_spinner=False)
+def get_payload_cache() -> LRUCache:
+    # (exam_name, ogr_no) -> payload
+    return LRUCache(PAYLOAD_CACHE_SIZE)
+
+
+def _payload_key(exam_name, ogr_no):
+    if exam_name is None or ogr_no is None or pd.isna(ogr_no):
+        return None
+    return (str(exam_name), int(ogr_no))
 
 
-@st.cache_data(show_spinner=False, ttl=30)
-@st.cache_data(show_spinner=False, ttl=30)
-def fetch_all_results():
+def fetch_payloads(keys) -> dict:
+    """
+    keys: (exam_name, ogr_no) çiftleri. Önbellekte olmayanlar deneme bazında
+    PAYLOAD_BATCH_SIZE'lık in_ sorgularıyla çekilir. Toplu istek önbellek
+    boyutunu aşamaz.
+    """
+    keys = [k for k in dict.fromkeys(_payload_key(e, n) for e, n in keys) if k is not None]
+    if len(keys) > PAYLOAD_CACHE_SIZE:
+        raise ValueError(f"Tek seferde en fazla {PAYLOAD_CACHE_SIZE} öğrenci payload'ı istenebilir.")
+
+    cache = get_payload_cache()
+    out, missing = {}, {}
+    for k in keys:
+        v = cache.get(k)
+        if v is None:
+            missing.setdefault(k[0], []).append(k[1])
+        else:
+            out[k] = v
+
+    for exam_name, nos in missing.items():
+        for i in range(0, len(nos), PAYLOAD_BATCH_SIZE):
+            res = (
+                db.table(TABLE).select("exam_name,ogr_no,payload")
+                .eq("exam_name", exam_name)
+                .in_("ogr_no", nos[i:i + PAYLOAD_BATCH_SIZE])
+                .execute()
+            )
+            for r in res.data or []:
+                k = _payload_key(r["exam_name"], r["ogr_no"])
+                payload = r.get("payload") or {}
+                cache.put(k, payload)
+                out[k] = payload
+    return out
+
+
+def fetch_last_nets(keys) -> dict:
+    """
+    Toplu raporlar için (exam_name, ogr_no) -> ders netleri. payload'lar fetch_payloads
+    ile en fazla PAYLOAD_CACHE_SIZE'lık gruplar hâlinde iner; hata olursa eldekiler döner.
+    """
+    keys = [k for k in dict.fromkeys(_payload_key(e, n) for e, n in keys) if k is not None]
+    out = {}
+    try:
+        for i in range(0, len(keys), PAYLOAD_CACHE_SIZE):
+            get_breaker().check()
+            payloads = fetch_payloads(keys[i:i + PAYLOAD_CACHE_SIZE])
+            out.update((k, payload_to_nets(p)) for k, p in payloads.items())
+    except Exception as e:
+        get_breaker().failure(e)
+        show_supabase_error(e, "Ders netleri çekilemedi")
+    return out
+
+
+def fetch_payload(exam_name, ogr_no) -> dict:
+    key = _payload_key(exam_name, ogr_no)
+    if key is None:
+        return {}
     try:
-        res = supabase.table(TABLE).select(
-            "exam_name,kademe,ogr_no,ad_soyad,sinif,lgs_puan,created_at,payload"
-        ).execute()
-        return pd.DataFrame(res.data or [])
+        get_breaker().check()
+        return fetch_payloads([key]).get(key, {})
     except Exception as e:
-        show_supabase_error(e, "Veri çekme başarısız")
-        return pd.DataFrame()
-
-
-def auto_comment(student_df: pd.DataFrame) -> str:
-    if student_df.empty or student_df["lgs_puan"].dropna().empty:
-        return "Bu öğrenci için yeterli puan verisi bulunamadı."
-    s = student_df.sort_values("created_at")
-    last = s["lgs_puan"].dropna().iloc[-1]
-    first = s["lgs_puan"].dropna().iloc[0]
-    diff = last - first
-    if diff >= 20:
-        return "Belirgin yükseliş var. Düzenli çalışmanın karşılığı alınmış görünüyor."
-    if diff >= 5:
-        return "Olumlu gelişim var. İstikrarı korumak önemli."
-    if diff <= -20:
-        return "Belirgin düşüş var. Çalışma düzeni ve sınav kaygısı birlikte değerlendirilmeli."
-    if diff <= -5:
-        return "Son denemelerde küçük bir gerileme var. Eksik kazanımlar ve tekrar planı gözden geçirilebilir."
-    return "Puanlar stabil. İlerleme için hedef derslere odaklı plan faydalı olur."
+        get_breaker().failure(e)
+        show_supabase_error(e, "Ders netleri çekilemedi")
+        return {}
+
+
+@versioned_cache(lambda exam_name: [("exam", exam_name)], ttl=300)
+def fetch_exam_nets(exam_name: str) -> pd.DataFrame:
+    """
+    Bir denemenin tüm öğrencileri için net matrisi (index: ogr_no, ad_soyad, sinif).
+    Deneme başına bir kez indirilir ve hesaplanır; ders analizi ve toplu raporlar paylaşır.
+    payload yerel kopyada tutulmaz: netler sadece ders analizi / rapor istenince iner.
+    """
+    key = ("fetch_exam_nets", exam_name)
+    try:
+        get_breaker().check()
+        rows = select_all(
+            lambda: db.table(TABLE).select("ogr_no,ad_soyad,sinif,payload")
+            .eq("exam_name", exam_name).order("ogr_no")
+        )
+    except Exception as e:
+        empty = nets_matrix([], index=pd.MultiIndex.from_tuples([], names=NET_INDEX))
+        return stale_or(key, e, "Ders netleri çekilemedi", empty)
+    index = pd.MultiIndex.from_tuples(
+        [(r.get("ogr_no"), r.get("ad_soyad"), r.get("sinif")) for r in rows], names=NET_INDEX
+    )
+    return served(key, nets_matrix([r.get("payload") or {} for r in rows], index=index))
+
+
+@versioned_cache(lambda exam_name: [("exam", exam_name)], ttl=300)
+def fetch_class_subject_nets(exam_name: str) -> pd.DataFrame:
+    """Denemenin sınıf × ders ortalama netleri (uzun biçim); deneme başına bir kez hesaplanır."""
+    return class_subject_nets(fetch_exam_nets(exam_name), exam_name)
+
+
+def subject_nets_for(exams, siniflar) -> pd.DataFrame:
+    """Seçili denemelerin sınıf × ders tabloları (sadece verilen sınıflar)."""
+    parts = [fetch_class_subject_nets(e) for e in exams]
+    long = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=SUBJECT_COLUMNS)
+    return long[long["sinif"].isin(list(siniflar))].reset_index(drop=True)
+
+
+@versioned_cache(lambda kademe, *args, **kwargs: [("kademe", kademe)], ttl=300)
+def fetch_all_exams_top40(kademe: int, siniflar=None, exam_order=()) -> pd.DataFrame:
+    """TÜM DENEMELER (ORTALAMA) ilk 40; (kademe, sınıf seti) başına önbellekli, kayıtta temizlenir."""
+    return rank_all_exams(fetch_results(kademe, siniflar=siniflar), list(exam_order))
+
+
+def ranking_xlsx_bytes(kademe: int, exam_order=()) -> bytes:
+    """Tüm kademe sıralaması + deneme pivotu, sınıf başına sayfa (indirme anında üretilir)."""
+    with span("ranking_xlsx", kademe=kademe) as rec:
+        data = ranking_xlsx(rank_all_exams(fetch_results(kademe), list(exam_order), top_n=None))
+        rec["bytes"] = len(data)
+    return data
+
+
+@versioned_cache(lambda kademe, *args, **kwargs: [("kademe", kademe)], ttl=300)
+def fetch_cohort_trends(kademe: int, exam_order=()) -> pd.DataFrame:
+    """Kademedeki tüm öğrencilerin eğilim ölçüleri (analytics.cohort_trends), kademe başına bir kez."""
+    return cohort_trends(fetch_results(kademe), list(exam_order))
+
+
+TREND_TABLE = {
+    "ad_soyad": "Ad Soyad", "sinif": "Sınıf", "rank_first": "İlk Sıra", "rank_last": "Son Sıra",
+    "rank_change": "Sıra Değişimi", "slope": "Puan/Deneme", "volatility": "Oynaklık", "pct_last": "Son Yüzdelik",
+}
+
+
+def trend_table(trends: pd.DataFrame) -> pd.DataFrame:
+    out = trends[list(TREND_TABLE)].rename(columns=TREND_TABLE).reset_index(drop=True)
+    for c in ["İlk Sıra", "Son Sıra", "Sıra Değişimi"]:
+        out[c] = out[c].astype("Int64")
+    return out.round({"Puan/Deneme": 1, "Oynaklık": 1, "Son Yüzdelik": 0})
+
+
+def student_report_jobs(kademe: int, exam_name=None, siniflar=None, exam_order=()) -> list:
+    """
+    Filtredeki her öğrenci için toplu rapor işi (reports.build_reports_zip girdisi).
+    Öğrenciler ogr_key ile gruplanır (isim denemeler arasında farklı yazılsa da tek
+    rapor). Geçmiş kademe için tek sorguyla, son deneme netleri sadece filtredeki
+    öğrencilerin payload'larından (fetch_last_nets, sınırlı gruplar), eğilimler kademe
+    başına bir kez (fetch_cohort_trends) alınır; işçi süreçler payload indirmez.
+    """
+    students = fetch_students(kademe, exam_name=exam_name, siniflar=siniflar)
+    hist = fetch_results(kademe)
+    hist = hist[hist["ogr_key"].isin(students["ogr_key"])].sort_values("created_at", kind="stable")
+    if hist.empty:
+        return []
+
+    last = hist.groupby("ogr_key", sort=False).tail(1).set_index("ogr_key")
+    nets_by_key = fetch_last_nets(zip(last["exam_name"], last["ogr_no"]))
+
+    trends = fetch_cohort_trends(kademe, tuple(exam_order))
+    groups = hist.groupby("ogr_key", sort=False)
+    jobs = []
+    for key in students["ogr_key"]:
+        if key not in last.index:
+            continue
+        g = groups.get_group(key)
+        l = last.loc[key]
+        name = l["ad_soyad"]
+        nets = nets_by_key.get(_payload_key(l["exam_name"], l["ogr_no"]), {})
+        jobs.append({
+            "name": name, "kademe": kademe, "sinif": l["sinif"], "ogr_key": key, "df": g, "nets": nets,
+            "trend": trend_for(trends, key),
+        })
+    return jobs
+
 
 def get_exam_order(kdf: pd.DataFrame):
     if kdf.empty:
@@ -310,305 +1045,55 @@ def get_exam_order(kdf: pd.DataFrame):
         .tolist()
     )
 
-def payload_to_nets(payload: dict) -> dict:
-    if not isinstance(payload, dict):
-        return {}
-    dersler = set()
-    for k in payload.keys():
-        if isinstance(k, str) and (k.endswith("_D") or k.endswith("_Y") or k.endswith("_N")):
-            dersler.add(k.rsplit("_", 1)[0].strip())
-    nets = {}
-    for ders in sorted(dersler):
-        d = float(payload.get(f"{ders}_D") or 0)
-        y = float(payload.get(f"{ders}_Y") or 0)
-        nets[ders] = d - (y / 3.0)
-    return nets
-
 # --------------------
-# PDF HELPERS
+# PDF ÖNBELLEĞİ (talep üzerine üretim)
 # --------------------
-def ensure_pdf_font():
-    try:
-        pdfmetrics.registerFont(TTFont("TRFont", FONT_PATH))
-        return "TRFont"
-    except Exception:
-        return None
+PDF_TEMPLATE_VERSION = "3"  # PDF düzeni değişince artırın: eski baytlar kullanılmaz
+PDF_CACHE_BYTES = 64 * 1024 * 1024
 
-def fig_to_rl_image(fig, width=520, height=220):
-    buf = BytesIO()
-    fig.savefig(buf, format="png", dpi=160, bbox_inches="tight")
-    plt.close(fig)
-    buf.seek(0)
-    return RLImage(buf, width=width, height=height)
-
-def build_student_pdf(student_name: str, kademe: int, student_df: pd.DataFrame) -> BytesIO:
-    font_name = ensure_pdf_font()
-    styles = getSampleStyleSheet()
-    if font_name:
-        for k in styles.byName:
-            styles[k].fontName = font_name
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=6, leftMargin=6, topMargin=6, bottomMargin=6)
-
-    elems = []
-    # logo + başlık
-    if os.path.exists(LOGO_PATH):
-        header = Table(
-            [[RLImage(LOGO_PATH, width=55, height=55),
-              Paragraph("<b>Cemil Meriç Ortaokulu</b><br/>Öğrenci Akademik Performans Raporu", styles["Title"])]],
-            colWidths=[65, 430]
-        )
-        header.setStyle(TableStyle([("VALIGN", (0,0), (-1,-1), "MIDDLE")]))
-        elems.append(header)
-    else:
-        elems.append(Paragraph("Öğrenci Akademik Performans Raporu", styles["Title"]))
-
-    elems.append(Spacer(1, 8))
-    elems.append(Paragraph(f"<b>Öğrenci:</b> {student_name}", styles["Normal"]))
-    elems.append(Paragraph(f"<b>Kademe:</b> {kademe}", styles["Normal"]))
-    elems.append(Spacer(1, 24))  # leave room for signature
-
-    elems.append(Paragraph("Kısa Değerlendirme", styles["Heading2"]))
-    elems.append(Paragraph(auto_comment(student_df), styles["Normal"]))
-    elems.append(Spacer(1, 24))  # leave room for signature
-
-    tdf = student_df[["exam_name", "sinif", "lgs_puan", "created_at"]].copy().sort_values("created_at")
-    tdf["created_at"] = pd.to_datetime(tdf["created_at"], errors="coerce").dt.strftime("%d.%m.%Y %H:%M")
-    tdf["created_at"] = tdf["created_at"].fillna("-")
-    tdf["lgs_puan"] = tdf["lgs_puan"].apply(lambda x: "-" if pd.isna(x) else f"{x:.2f}")
-
-    table_data = [["Deneme", "Sınıf", "Puan", "Tarih"]] + tdf.values.tolist()
-    tbl = Table(table_data, hAlign="LEFT")
-    tbl.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#0F2D52")),
-        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
-        ("GRID", (0,0), (-1,-1), 0.25, colors.HexColor("#9aa7b2")),
-        ("FONTNAME", (0,0), (-1,-1), font_name or "Helvetica"),
-        ("FONTSIZE", (0,0), (-1,0), 10),
-        ("FONTSIZE", (0,1), (-1,-1), body_font),
-        ("TOPPADDING", (0,0), (-1,-1), 2),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 2),
-    ]))
-    elems.append(tbl)
-    elems.append(Spacer(1, 24))  # leave room for signature
-
-    # puan trend grafiği
-    score_series = student_df.sort_values("created_at")[["exam_name", "lgs_puan"]].dropna()
-    if not score_series.empty:
-        fig, ax = plt.subplots(figsize=(7.2, 2.8))
-        ax.plot(score_series["exam_name"], score_series["lgs_puan"], marker="o")
-        ax.set_title("Denemelere Göre Puan Gelişimi")
-        ax.set_xlabel("Deneme")
-        ax.set_ylabel("Puan")
-        plt.xticks(rotation=25, ha="right")
-        plt.tight_layout()
-        elems.append(fig_to_rl_image(fig, width=520, height=210))
-        elems.append(Spacer(1, 24))  # leave room for signature
-
-    # son deneme net grafiği
-    try:
-        last_row = student_df.sort_values("created_at").iloc[-1]
-        nets = payload_to_nets(last_row.get("payload", {}))
-    except Exception:
-        nets = {}
-
-    if nets:
-        net_df = pd.DataFrame({"Ders": list(nets.keys()), "Net": list(nets.values())}).sort_values("Net", ascending=False)
-        fig2, ax2 = plt.subplots(figsize=(7.2, 2.8))
-        ax2.bar(net_df["Ders"], net_df["Net"])
-        ax2.set_title("Son Deneme Ders Bazlı Netler")
-        ax2.set_xlabel("Ders")
-        ax2.set_ylabel("Net")
-        plt.xticks(rotation=35, ha="right")
-        plt.tight_layout()
-        elems.append(fig_to_rl_image(fig2, width=520, height=210))
-
-    doc.build(elems)
-    buffer.seek(0)
-    return buffer
-
-
-def build_top40_pdf(kademe: int, exam_name: str, top40_df: pd.DataFrame) -> BytesIO:
-    """
-    TEK SAYFA PDF (A4 yatay):
-    - Logo + başlık
-    - Sıkı kolon genişlikleri / küçük font
-    - Zebra satır
-    Not: Emoji/madalya kullanılmaz (yazıcı/PDF font uyumluluğu için).
-    """
-    font_name = ensure_pdf_font()
-    styles = getSampleStyleSheet()
-    if font_name:
-        for k in styles.byName:
-            styles[k].fontName = font_name
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=6, leftMargin=6, topMargin=6, bottomMargin=6
-    )
 
-    elems = []
-    # Header (logo + başlık ortada, tek sayfayı koruyacak şekilde kompakt)
-    title_html = (
-        "<para align='center'>"
-        "<b>DENEME SINAVLARI</b><br/>"
-        "<b>İLK 40 SONUÇ LİSTESİ</b><br/>"
-        f"<font size='8'>{kademe}. SINIF • {exam_name}</font>"
-        "</para>"
-    )
-    title = Paragraph(title_html, styles["Normal"])
-
-    if os.path.exists(LOGO_PATH):
-        # Logo büyük ama tek sayfayı bozmayacak ölçü
-        logo = RLImage(LOGO_PATH, width=68, height=68)
-
-        # 2 kolon: [logo][başlık] — tablo sayfada ortalanır
-        h = Table([[logo, title]], colWidths=[75, 360], hAlign="CENTER")
-        h.setStyle(TableStyle([
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("LEFTPADDING", (0, 0), (-1, -1), 0),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 0),
-            ("TOPPADDING", (0, 0), (-1, -1), 0),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
-        ]))
-        elems.append(h)
-    else:
-        elems.append(title)
-
-    elems.append(Spacer(1, 2))
-
-    tdf = top40_df.copy()
-
-    # Puan formatı
-    if "Puan" in tdf.columns:
-        tdf["Puan"] = tdf["Puan"].apply(lambda x: "" if pd.isna(x) else f"{float(x):.2f}")
-
-    # Ad Soyad temizliği (ekranda emoji varsa PDF'de at)
-    if "Ad Soyad" in tdf.columns:
-        tdf["Ad Soyad"] = tdf["Ad Soyad"].astype(str)
-        for bad in ["🥇", "🥈", "🥉", "🏅", "★"]:
-            tdf["Ad Soyad"] = tdf["Ad Soyad"].str.replace(bad, "", regex=False)
-        tdf["Ad Soyad"] = tdf["Ad Soyad"].str.strip()
-
-    table_data = [list(tdf.columns)] + tdf.values.tolist()
-
-    # Kolon genişlikleri (tek sayfa - sıkı)
-    # Dinamik kolon genişlikleri (tek sayfa A4 yatay)
-    content_width = A4[0] - (doc.leftMargin + doc.rightMargin)
-
-    fixed_map = {
-        "Sıra": 22,
-        "Okul No": 48,
-        "Ad Soyad": 160,   # daha dar
-        "Sınıf": 40,
-                "Ortalama": 50,
-        "Puan": 55,
-    }
-
-    # Sınav puan kolonlarını yakala (örn: "1. Sınav", "2. Sınav" ...)
-    exam_cols = [c for c in tdf.columns if re.match(r"^\d+\.\s*Sınav", str(c))]
-
-    fixed_map["Denemeler"] = 180  # (varsa)
-
-    fixed_sum = 0
-    col_widths = []
-    for col in tdf.columns:
-        if col in fixed_map:
-            w = fixed_map[col]
-        elif col in exam_cols:
-            w = None  # sonra dağıtacağız
-        else:
-            w = 55
-        col_widths.append(w)
-        if w is not None:
-            fixed_sum += w
-
-    # Sınav kolonlarına kalan alanı paylaştır
-    n_exam = sum(1 for w in col_widths if w is None)
-    remaining = max(0, content_width - fixed_sum)
-
-    if n_exam > 0:
-        # Sınav sütunları dar olsun: 20–32 aralığında tut
-        per_raw = remaining / n_exam if n_exam else 0
-        per = min(32, max(20, per_raw))
-        col_widths = [per if w is None else w for w in col_widths]
-
-    # Sütun çoksa fontu küçült
-    body_font = 6.6
-    if n_exam >= 8:
-        body_font = 6.0
-    if n_exam >= 10:
-        body_font = 5.6
-
-    # Satır yükseklikleri sabit (tek sayfa için)
-    row_heights = [15] + [13] * (len(table_data) - 1)
-
-    tbl = Table(table_data, colWidths=col_widths, rowHeights=row_heights, hAlign="CENTER")
-
-    style_cmds = [
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0F2D52")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-        ("FONTNAME", (0, 0), (-1, -1), font_name or "Helvetica"),
-        ("FONTSIZE", (0, 0), (-1, 0), 7.5),       # başlık
-        ("FONTSIZE", (0, 1), (-1, -1), body_font),    # içerik
-        ("LEADING", (0, 0), (-1, 0), 9.5),
-        ("LEADING", (0, 1), (-1, -1), body_font + 1.2),
-        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#9aa7b2")),
-        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-        ("ALIGN", (0, 1), (1, -1), "CENTER"),
-        ("ALIGN", (-1, 1), (-1, -1), "CENTER"),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("TOPPADDING", (0, 0), (-1, -1), 1),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
-        ("LEFTPADDING", (0, 0), (-1, -1), 2),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 2),
-    ]
-
-    # Zebra satır
-    for r in range(1, len(table_data)):
-        bg = colors.HexColor("#F3F6FB") if r % 2 == 0 else colors.white
-        style_cmds.append(("BACKGROUND", (0, r), (-1, r), bg))
-
-    tbl.setStyle(TableStyle(style_cmds))
-    elems.append(tbl)
-
-    # --- Signature under table (right-aligned, with a little right margin) ---
-    sig1 = ParagraphStyle(
-        "sig1",
-        parent=styles["Normal"],
-        alignment=TA_RIGHT,
-        fontName=font_name or "Helvetica",
-        fontSize=9,
-        leading=9,
-        spaceBefore=0,
-        spaceAfter=0,
-        rightIndent=40,  # right edge gap (moves text left)
-    )
-    sig2 = ParagraphStyle(
-        "sig2",
-        parent=styles["Normal"],
-        alignment=TA_RIGHT,
-        fontName=font_name or "Helvetica",
-        fontSize=8.5,
-        leading=8.5,
-        spaceBefore=0,
-        spaceAfter=0,
-        rightIndent=40,  # right edge gap (moves text left),
-    )
+@st.cache_resource(show_spinner=False)
+def get_pdf_cache() -> LRUCache:
+    return LRUCache(PDF_CACHE_BYTES, sizeof=len)
 
-    elems.append(Spacer(1, 24))  # leave room for signature
-    elems.append(Paragraph("<b>Mehmet ARICIOĞLU</b>", sig1))
-    elems.append(Paragraph("Psikolojik Danışman / Rehber Öğretmen", sig2))
 
-    doc.build(elems)
+def _hash_arg(h, a):
+    if isinstance(a, pd.DataFrame):
+        h.update(json.dumps([str(c) for c in a.columns]).encode())
+        try:
+            h.update(pd.util.hash_pandas_object(a, index=False).to_numpy().tobytes())
+        except TypeError:
+            h.update(a.to_json(date_format="iso").encode())
+    else:
+        h.update(json.dumps(a, sort_keys=True, default=str).encode())
 
-    buffer.seek(0)
-    return buffer
 
+def pdf_bytes(builder, *args, **kwargs) -> bytes:
+    """
+    builder(*args, **kwargs) çıktısını girdi tablosu + parametreler + şablon sürümü
+    özetiyle önbellekler. download_button'a functools.partial ile verilir; PDF sadece
+    tıklanınca (ayrı thread'de) üretilir.
+    """
+    h = hashlib.sha1(f"{builder.__name__}|{PDF_TEMPLATE_VERSION}".encode())
+    for a in list(args) + [kwargs[k] for k in sorted(kwargs)]:
+        _hash_arg(h, a)
+    key = h.hexdigest()
+
+    cache = get_pdf_cache()
+    with span(builder.__name__) as rec:
+        data = cache.get(key)
+        rec["cache"] = "miss" if data is None else "hit"
+        if data is None:
+            data = builder(*args, **kwargs).getvalue()
+            cache.put(key, data)
+        rec["bytes"] = len(data)
+    return data
+
+
+def student_pdf_bytes(student_name: str, kademe: int, student_df: pd.DataFrame, trend: dict = None) -> bytes:
+    last = student_df.sort_values("created_at").iloc[-1]
+    payload = fetch_payload(last["exam_name"], last["ogr_no"])
+    return pdf_bytes(build_student_pdf, student_name, kademe, student_df, last_payload=payload, trend=trend)
 
 # --------------------
 # UI HEADER (logo)
@@ -623,37 +1108,95 @@ with h2:
 
 tab_add, tab_dash = st.tabs(["➕ Deneme Ekle", "📊 Analiz Paneli"])
 
+logger.info("kurulum süresi: %.1f ms", (time.perf_counter() - _RUN_T0) * 1000)
+DEBUG_PERF = str(_setting("DEBUG_PERF", "")).lower() in ("1", "true", "evet")
+
 # --------------------
 # TAB 1: Deneme ekle
 # --------------------
 with tab_add:
     st.markdown('<div class="section-title">Deneme Excel Yükle ve Kaydet</div>', unsafe_allow_html=True)
-    uploaded_file = st.file_uploader("Excel (.xlsx) yükle", type=["xlsx"], key="excel_upload")
-    if uploaded_file:
-        df, exam_name = parse_school_report(uploaded_file)
-        st.dataframe(df.head(30), use_container_width=True)
-
-        if st.button("✅ Supabase’e Kaydet", type="primary"):
-            with st.spinner("Kaydediliyor..."):
-                ok = save_exam_to_supabase(df, exam_name)
+    upload_mode = st.radio("Yükleme", ["Tek dosya", "Toplu (çok dosya / zip)"], horizontal=True)
+
+    if upload_mode == "Tek dosya":
+        uploaded_file = st.file_uploader("Excel (.xlsx) yükle", type=["xlsx"], key="excel_upload")
+        if uploaded_file:
+            df, exam_name = parse_school_report(uploaded_file)
+            st.dataframe(df.head(30), use_container_width=True)
+
+            if st.button("✅ Supabase’e Kaydet", type="primary"):
+                with st.spinner("Kaydediliyor..."):
+                    ok = save_exam_to_supabase(df, exam_name)
                 if ok:
-                    st.cache_data.clear()
-            if ok:
-                st.success("Kaydedildi ✅ Analiz Paneli sekmesine geçebilirsin.")
-            else:
-                st.warning("Kaydedilemedi. Supabase bağlantısını kontrol edip tekrar deneyin.")
+                    st.success("Kaydedildi ✅ Analiz Paneli sekmesine geçebilirsin.")
+                else:
+                    st.warning("Kaydedilemedi. Supabase bağlantısını kontrol edip tekrar deneyin.")
+
+    else:
+        bulk_files = st.file_uploader(
+            "Excel (.xlsx) dosyaları veya .zip yükle",
+            type=["xlsx", "zip"],
+            accept_multiple_files=True,
+            key="bulk_upload",
+        )
+        if bulk_files and st.button("📥 Dosyaları Oku"):
+            jobs = expand_uploads([(f.name, f.getvalue()) for f in bulk_files])
+            bar = st.progress(0.0, text="Okunuyor...")
+
+            def _on_done(done, total, result):
+                bar.progress(done / total, text=f"{done}/{total} • {result[0]}")
+
+            st.session_state["bulk_results"] = parse_many(jobs, on_done=_on_done)
+
+        results = st.session_state.get("bulk_results") or []
+        if results:
+            # Aynı deneme adı birden fazla dosyada ise ilki kaydedilir
+            seen, ready, report = set(), [], []
+            for name, df_b, exam_b, err in results:
+                if err is None and exam_b in seen:
+                    err = "Aynı deneme adı başka bir dosyada da var"
+                if err is None:
+                    seen.add(exam_b)
+                    ready.append((df_b, exam_b))
+                report.append({
+                    "Dosya": name,
+                    "Deneme": exam_b or "-",
+                    "Öğrenci": len(df_b) if df_b is not None else 0,
+                    "Durum": "✅ Hazır" if err is None else f"❌ {err}",
+                })
+            st.dataframe(pd.DataFrame(report), use_container_width=True, hide_index=True)
+
+            if ready and st.button(f"✅ {len(ready)} Denemeyi Supabase’e Kaydet", type="primary"):
+                with st.spinner("Kaydediliyor..."):
+                    ok = save_exams_to_supabase(ready)
+                    if ok:
+                        st.session_state.pop("bulk_results", None)
+                if ok:
+                    st.success(f"{len(ready)} deneme kaydedildi ✅")
+                else:
+                    st.warning("Kaydedilemedi. Supabase bağlantısını kontrol edip tekrar deneyin.")
 
 # --------------------
 # TAB 2: Analiz Paneli
 # --------------------
 with tab_dash:
-    all_df = fetch_all_results()
-    if all_df.empty:
+    idx = fetch_exam_index()
+    breaker = get_breaker()
+    if breaker.failures:
+        # Bayat ama kullanılabilir veri: panel durmaz, tazeleme arka planda sürer
+        retry = f"{breaker.retry_in():.0f} sn sonra yeniden denenecek"
+        if idx.empty:
+            st.warning(f"⏳ Supabase’e şu an ulaşılamıyor (proje uyanıyor olabilir); {retry}.")
+            st.stop()
+        synced = get_results_snapshot().synced_at
+        age = f"{(datetime.now(timezone.utc) - synced).total_seconds() / 60:.0f} dk önceki" if synced else "son"
+        st.warning(f"⚠️ Supabase’e ulaşılamıyor; {age} eşitlemedeki veriler gösteriliyor, {retry}.")
+    if idx.empty:
         st.warning("Supabase’te kayıt yok.")
         st.stop()
 
     colA, colB, colC = st.columns([1, 1.6, 1.8])
-    kademeler = sorted([int(x) for x in all_df["kademe"].dropna().unique()])
+    kademeler = sorted([int(x) for x in idx["kademe"].dropna().unique()])
 
     with colA:
         sec_kademe = st.selectbox("Kademe", kademeler)
@@ -661,173 +1204,241 @@ with tab_dash:
     # --- Deneme seçimi (Tüm denemeler ortalaması opsiyonlu) ---
     ALL_LABEL = "📌 TÜM DENEMELER (ORTALAMA)"
 
-    kdf = all_df[all_df["kademe"] == sec_kademe].copy()
-    exams = get_exam_order(kdf) or sorted([e for e in kdf["exam_name"].dropna().unique()])
+    kidx = idx[idx["kademe"] == sec_kademe]
+    exams = get_exam_order(kidx) or sorted([e for e in kidx["exam_name"].dropna().unique()])
     exam_options = [ALL_LABEL] + list(exams)
 
     with colB:
         sec_exam = st.selectbox("Deneme", exam_options)
 
-    # Seçime göre veri
-    if sec_exam == ALL_LABEL:
-        df_exam = kdf.copy()
-    else:
-        df_exam = kdf[kdf["exam_name"] == sec_exam].copy()
-
-    siniflar = sorted([s for s in df_exam["sinif"].dropna().unique()])
+    # Seçime göre sınıf listesi (özetten)
+    eidx = kidx if sec_exam == ALL_LABEL else kidx[kidx["exam_name"] == sec_exam]
+    siniflar = sorted([s for s in eidx["sinif"].dropna().unique()])
 
     with colC:
         sec_siniflar = st.multiselect("Sınıf", siniflar, default=siniflar)
 
-    df_f = df_exam[df_exam["sinif"].isin(sec_siniflar)].copy()
+    # Tek deneme: KPI ve İlk 40 kayıt sırasında yazılan özetten okunur (satır indirilmez).
+    summary = fetch_exam_summary(sec_kademe, sec_exam) if sec_exam != ALL_LABEL else None
+    use_summary = summary is not None and not summary.empty and set(sec_siniflar) <= set(summary["sinif"])
 
-    avg_score = df_f["lgs_puan"].mean() if df_f["lgs_puan"].notna().any() else None
-    max_score = df_f["lgs_puan"].max() if df_f["lgs_puan"].notna().any() else None
+    if use_summary:
+        df_f = None
+        n_students, avg_score, max_score, summary_top = combine_summaries(summary, sec_siniflar)
+    else:
+        # Sadece görüntülenen dilim indirilir (tüm sınıflar seçiliyse sınıf filtresi gönderilmez)
+        sinif_filter = None if set(sec_siniflar) == set(siniflar) else tuple(sorted(sec_siniflar))
+        df_f = fetch_results(
+            sec_kademe,
+            exam_name=None if sec_exam == ALL_LABEL else sec_exam,
+            siniflar=sinif_filter,
+        )
+        n_students = df_f["ad_soyad"].nunique()
+        avg_score = df_f["lgs_puan"].mean() if df_f["lgs_puan"].notna().any() else None
+        max_score = df_f["lgs_puan"].max() if df_f["lgs_puan"].notna().any() else None
 
     k1, k2, k3 = st.columns(3)
-    k1.markdown(f'<div class="kpi-card"><div class="kpi-title">Öğrenci</div><div class="kpi-value">{df_f["ad_soyad"].nunique()}</div><div class="kpi-sub">Filtreli</div></div>', unsafe_allow_html=True)
+    k1.markdown(f'<div class="kpi-card"><div class="kpi-title">Öğrenci</div><div class="kpi-value">{n_students}</div><div class="kpi-sub">Filtreli</div></div>', unsafe_allow_html=True)
     k2.markdown(f'<div class="kpi-card"><div class="kpi-title">Ortalama</div><div class="kpi-value">{avg_score:.2f}</div><div class="kpi-sub">Puan</div></div>' if avg_score is not None else
                 '<div class="kpi-card"><div class="kpi-title">Ortalama</div><div class="kpi-value">—</div><div class="kpi-sub">Puan</div></div>', unsafe_allow_html=True)
     k3.markdown(f'<div class="kpi-card"><div class="kpi-title">En Yüksek</div><div class="kpi-value">{max_score:.2f}</div><div class="kpi-sub">Puan</div></div>' if max_score is not None else
                 '<div class="kpi-card"><div class="kpi-title">En Yüksek</div><div class="kpi-value">—</div><div class="kpi-sub">Puan</div></div>', unsafe_allow_html=True)
 
-    t1, t2 = st.tabs(["🏅 İlk 40", "🧑‍🎓 Öğrenci"])
+    if use_summary:
+        # Yüzdelikler: tüm sınıflar ya da tek sınıf seçiliyse tam değer vardır
+        key = ALL_CLASSES if set(sec_siniflar) == set(siniflar) else (sec_siniflar[0] if len(sec_siniflar) == 1 else None)
+        prow = summary[summary["sinif"] == key]
+        if not prow.empty and prow.iloc[0]["n_puan"]:
+            p = prow.iloc[0]
+            st.caption(" • ".join(f"P{q}: {p[f'p{q}']:.2f}" for q in PERCENTILES))
+
+    t1, t2, t3, t4, t5 = st.tabs(["🏅 İlk 40", "🧑‍🎓 Öğrenci", "📦 Toplu Rapor", "📈 Gelişim", "📚 Ders Analizi"])
 
     with t1:
         if sec_exam == ALL_LABEL:
             # TÜM denemeler: aynı öğrenciyi (ogr_no) üzerinden birleştir (isim farklı yazılsa da).
-            tmp = df_f.dropna(subset=["lgs_puan"]).copy()
-
-            # Okul no yoksa (nadiren) ad+sinif ile anahtar üret (fallback)
-            tmp["ogr_no_str"] = tmp["ogr_no"].astype(str).str.strip()
-            tmp["ad_norm"] = (
-                tmp["ad_soyad"].astype(str)
-                   .str.strip()
-                   .str.replace(r"\s+", " ", regex=True)
-                   .str.upper()
-            )
-            tmp["sinif_str"] = tmp["sinif"].astype(str).str.strip()
-
-            tmp["ogr_key"] = tmp["ogr_no_str"].where(
-                tmp["ogr_no_str"].ne("") & tmp["ogr_no_str"].ne("nan"),
-                tmp["ad_norm"] + " | " + tmp["sinif_str"]
-            )
-
-            def mode_or_last(s):
-                s = s.dropna().astype(str)
-                if s.empty:
-                    return ""
-                vc = s.value_counts()
-                return vc.index[0] if len(vc) else s.iloc[-1]
-
-            # Öğrenci temel bilgileri
-            base = (
-                tmp.groupby("ogr_key", as_index=False)
-                   .agg(
-                       ogr_no=("ogr_no", mode_or_last),
-                       ad_soyad=("ad_norm", mode_or_last),
-                       sinif=("sinif", mode_or_last),
-                       deneme_sayisi=("exam_name", "nunique"),
-                   )
-            )
-
-            # Sınav puanları (her deneme ayrı sütun)
-            exam_order = get_exam_order(kdf) or sorted([e for e in kdf["exam_name"].dropna().unique()])
-
-            pivot = tmp.pivot_table(index="ogr_key", columns="exam_name", values="lgs_puan", aggfunc="mean")
-
-            present = [e for e in exam_order if e in pivot.columns]
-            pivot = pivot[present]
-
-            rename_exam_cols = {exam: f"{i+1}. Sınav" for i, exam in enumerate(present)}
-            pivot = pivot.rename(columns=rename_exam_cols).reset_index()
-
-            g = base.merge(pivot, on="ogr_key", how="left")
-
-            exam_cols = [c for c in g.columns if re.match(r"^\d+\.\s*Sınav", str(c))]
-
-            g["Ortalama"] = g[exam_cols].mean(axis=1, skipna=True).round(2)
-
-            top40 = (
-                g.sort_values(["Ortalama", "deneme_sayisi"], ascending=[False, False])
-                 .head(40)
-                 .reset_index(drop=True)
-            )
-            top40.insert(0, "Sıra", range(1, len(top40) + 1))
-
-            show_cols = ["Sıra", "ogr_no", "ad_soyad", "sinif"] + exam_cols + ["Ortalama"]
-            show = top40[show_cols].copy()
-
-            show = show.rename(columns={
-                "ogr_no": "Okul No",
-                "ad_soyad": "Ad Soyad",
-                "sinif": "Sınıf",
-                            })
-
-            for c in exam_cols + ["Ortalama"]:
-                if c in show.columns:
-                    show[c] = pd.to_numeric(show[c], errors="coerce").round(2)
+            show = fetch_all_exams_top40(sec_kademe, sinif_filter, tuple(exams))
 
             st.dataframe(show, use_container_width=True, hide_index=True)
 
             pdf_exam_name = "TÜM DENEMELER ORTALAMASI"
-            top40_pdf = build_top40_pdf(sec_kademe, pdf_exam_name, show)
             st.download_button(
                 "📄 İlk 40 PDF (Tek Sayfa)",
-                data=top40_pdf,
+                data=partial(pdf_bytes, build_top40_pdf, sec_kademe, pdf_exam_name, show),
                 file_name=f"ilk40_{sec_kademe}_{pdf_exam_name}.pdf",
                 mime="application/pdf"
             )
 
         else:
-            top40 = (
-                df_f.dropna(subset=["lgs_puan"])
-                   .sort_values("lgs_puan", ascending=False)
-                   .head(40)
-                   .reset_index(drop=True)
-            )
-            top40.insert(0, "Sıra", range(1, len(top40) + 1))
-
-            show = top40[["Sıra", "ogr_no", "ad_soyad", "sinif", "lgs_puan"]].copy()
-            show = show.rename(columns={
-                "ogr_no": "Okul No",
-                "ad_soyad": "Ad Soyad",
-                "sinif": "Sınıf",
-                "lgs_puan": "Puan",
-            })
-            show["Puan"] = pd.to_numeric(show["Puan"], errors="coerce").round(2)
+            with span("top40", source="summary" if use_summary else "rows") as rec:
+                if use_summary:
+                    top40 = summary_top
+                else:
+                    # Tam sıralama / kopya yerine sadece ilk 40 satır seçilir (NaN puanlar dışarıda)
+                    top40 = df_f.nlargest(40, "lgs_puan").reset_index(drop=True)
+                rec["rows"] = len(top40)
+            show = top40_table(top40)
 
             st.dataframe(show, use_container_width=True, hide_index=True)
 
             pdf_exam_name = sec_exam
-            top40_pdf = build_top40_pdf(sec_kademe, pdf_exam_name, show)
             st.download_button(
                 "📄 İlk 40 PDF (Tek Sayfa)",
-                data=top40_pdf,
+                data=partial(pdf_bytes, build_top40_pdf, sec_kademe, pdf_exam_name, show),
                 file_name=f"ilk40_{sec_kademe}_{pdf_exam_name}.pdf",
                 mime="application/pdf"
             )
+
+        # Tam liste: tüm kademe, tüm denemeler (sınıf filtresinden bağımsız)
+        st.download_button(
+            "📊 Tüm Sıralama (Excel, sınıf başına sayfa)",
+            data=partial(ranking_xlsx_bytes, sec_kademe, tuple(exams)),
+            file_name=f"siralama_{sec_kademe}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 with t2:
-        ogr_list = sorted([s for s in df_f["ad_soyad"].dropna().unique()])
-        sec_ogr = st.selectbox("Öğrenci seç", ["(Seçme)"] + ogr_list)
+        if df_f is not None:
+            students = student_options(df_f)
+        else:
+            students = fetch_students(
+                sec_kademe, exam_name=sec_exam,
+                siniflar=None if set(sec_siniflar) == set(siniflar) else tuple(sorted(sec_siniflar)),
+            )
+        # Aynı ad iki öğrencideyse anahtar da gösterilir
+        # İki kolon aynı metin tipine çevrilir: boş dilimde pandas 3 "str" + object toplamaz
+        names, keys = text_or_empty(students["ad_soyad"]), text_or_empty(students["ogr_key"])
+        dup = names.duplicated(keep=False)
+        labels = dict(zip(students["ogr_key"], names.where(~dup, names + " (" + keys + ")")))
+        sec_key = st.selectbox(
+            "Öğrenci seç", [None] + list(labels), format_func=lambda k: "(Seçme)" if k is None else labels[k]
+        )
 
-        if sec_ogr != "(Seçme)":
-            s = kdf[kdf["ad_soyad"] == sec_ogr].copy().sort_values("created_at")
+        if sec_key is not None:
+            sec_ogr = students.set_index("ogr_key").at[sec_key, "ad_soyad"]
+            s = fetch_student_history(sec_kademe, sec_key)
 
             if s["lgs_puan"].notna().any():
                 fig, ax = plt.subplots()
-                ax.plot(s["exam_name"], s["lgs_puan"], marker="o")
+                ax.plot(s["exam_name"].astype("str"), s["lgs_puan"], marker="o")
                 ax.set_xlabel("Deneme")
                 ax.set_ylabel("Puan")
                 plt.xticks(rotation=25, ha="right")
                 st.pyplot(fig)
 
-            st.info(auto_comment(s))
+            trend = trend_for(fetch_cohort_trends(sec_kademe, tuple(exams)), sec_key)
+            st.info(auto_comment(s, trend))
 
-            pdf_buf = build_student_pdf(sec_ogr, sec_kademe, s)
             st.download_button(
                 "📄 Öğrenci PDF Raporu",
-                data=pdf_buf,
+                data=partial(student_pdf_bytes, sec_ogr, sec_kademe, s, trend),
                 file_name=f"{sec_ogr}_rapor.pdf",
                 mime="application/pdf"
-            )
\ No newline at end of file
+            )
+
+with t3:
+        st.caption("Seçili kademe / deneme / sınıflardaki tüm öğrenciler için rapor.")
+        bulk_mode = st.radio("Çıktı", ["Öğrenci başına PDF (zip)", "Tek birleşik PDF"], horizontal=True)
+
+        if st.button("📦 Raporları Oluştur"):
+            jobs = student_report_jobs(
+                sec_kademe,
+                exam_name=None if sec_exam == ALL_LABEL else sec_exam,
+                siniflar=None if set(sec_siniflar) == set(siniflar) else tuple(sorted(sec_siniflar)),
+                exam_order=tuple(exams),
+            )
+            if not jobs:
+                st.warning("Filtrede öğrenci yok.")
+            else:
+                bar = st.progress(0.0, text="Raporlar hazırlanıyor...")
+
+                def _on_report(done, total, name):
+                    bar.progress(done / total, text=f"{done}/{total} • {name}")
+
+                if bulk_mode == "Tek birleşik PDF":
+                    with span("build_merged_student_pdf", rows=len(jobs)):
+                        data = build_merged_student_pdf(jobs, on_done=_on_report)
+                    st.session_state["bulk_report"] = (data, f"raporlar_{sec_kademe}.pdf", "application/pdf")
+                else:
+                    with span("build_reports_zip", rows=len(jobs)):
+                        data, errors = build_reports_zip(jobs, on_done=_on_report)
+                    for name, err in errors:
+                        st.warning(f"{name}: {err}")
+                    st.session_state["bulk_report"] = (data, f"raporlar_{sec_kademe}.zip", "application/zip")
+
+        if st.session_state.get("bulk_report"):
+            data, file_name, mime = st.session_state["bulk_report"]
+            st.download_button("⬇️ Toplu Raporu İndir", data=data, file_name=file_name, mime=mime)
+
+with t4:
+        st.caption(
+            "İlk ve son girilen deneme arasında kademe sırası en çok değişen öğrenciler (en az 2 deneme). "
+            "Puan/Deneme: tüm denemelere oturtulan doğrunun eğimi."
+        )
+        risers, fallers = risers_fallers(fetch_cohort_trends(sec_kademe, tuple(exams)), siniflar=sec_siniflar)
+        c_up, c_down = st.columns(2)
+        with c_up:
+            st.markdown("**⬆️ En çok yükselenler**")
+            st.dataframe(trend_table(risers), use_container_width=True, hide_index=True)
+        with c_down:
+            st.markdown("**⬇️ En çok düşenler**")
+            st.dataframe(trend_table(fallers), use_container_width=True, hide_index=True)
+
+with t5:
+        subj_exams = exams if sec_exam == ALL_LABEL else [sec_exam]
+        long = subject_nets_for(subj_exams, sec_siniflar)
+        if long.empty:
+            st.info("Seçimde ders neti bulunamadı.")
+        else:
+            view = st.radio("Görünüm", ["Sınıf × Ders", "Sınıf × Deneme (tek ders)"], horizontal=True)
+            if view == "Sınıf × Ders":
+                matrix, axis = subject_matrix(long, "ders"), 0
+                title = sec_exam if sec_exam != ALL_LABEL else "Tüm denemeler (ağırlıklı ortalama)"
+                st.caption("Renkler her ders kendi içinde: kırmızı en zayıf, yeşil en güçlü sınıf.")
+            else:
+                ders = st.selectbox("Ders", sorted(long["ders"].unique()))
+                matrix, axis = subject_matrix(long[long["ders"] == ders], "exam_name", exams), None
+                title = f"{ders} • denemelere göre"
+            st.dataframe(
+                matrix.style.background_gradient(cmap="RdYlGn", axis=axis).format("{:.2f}", na_rep="—"),
+                use_container_width=True,
+            )
+            c_pdf, c_xlsx = st.columns(2)
+            c_pdf.download_button(
+                "📄 Isı Haritası PDF",
+                data=partial(pdf_bytes, build_subject_heatmap_pdf, sec_kademe, title, matrix, axis),
+                file_name=f"ders_analizi_{sec_kademe}.pdf",
+                mime="application/pdf",
+            )
+            c_xlsx.download_button(
+                "📊 Excel",
+                data=partial(subject_nets_xlsx, long, tuple(exams)),
+                file_name=f"ders_analizi_{sec_kademe}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+
+# --------------------
+# ÖNBELLEK İSTATİSTİKLERİ (bu sunucu süreci için, birikimli)
+# --------------------
+with st.sidebar.expander("🗄️ Önbellek"):
+    st.dataframe(get_cache_registry().stats(), use_container_width=True, hide_index=True)
+    lru = pd.DataFrame([
+        {"Önbellek": "payload", "İsabet": get_payload_cache().hits, "Iska": get_payload_cache().misses},
+        {"Önbellek": "pdf", "İsabet": get_pdf_cache().hits, "Iska": get_pdf_cache().misses},
+    ])
+    st.dataframe(lru, use_container_width=True, hide_index=True)
+    _b = get_breaker()
+    if _b.failures:
+        st.caption(f"Sunucu: {_b.failures} art arda hata, sonraki deneme {_b.retry_in():.0f} sn • {_b.last_error}")
+
+# --------------------
+# PERFORMANS PANELİ (bu çalıştırmanın aşamaları; DEBUG_PERF ile açık gelir)
+# --------------------
+if st.sidebar.toggle("⏱️ Performans", value=DEBUG_PERF):
+    with st.sidebar:
+        st.caption(f"Çalıştırma: {(time.perf_counter() - _RUN_T0) * 1000:.0f} ms")
+        perf_df = pd.DataFrame(RUN_SPANS, columns=["span", "ms", "rows", "cache"])
+        st.dataframe(
+            perf_df.rename(columns={"span": "Aşama", "rows": "Satır", "cache": "Önbellek"}),
+            use_container_width=True, hide_index=True,
+        )
+        st.caption("PDF'ler indirme anında (ayrı thread'de) üretilir; süreleri JSON loga yazılır.")
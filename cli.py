@@ -0,0 +1,157 @@
+"""
+Komut satırı (gece işleri): klasördeki okul raporlarını kaydeder, İlk 40 ve öğrenci
+PDF'lerini diske yazar. Streamlit gerekmez; panelle aynı kayıt ve rapor kodunu
+(pipeline.py, reports.py) kullanır.
+
+Depolama ortam değişkenlerinden: STORAGE_BACKEND ("supabase" | "sqlite"),
+SUPABASE_URL / SUPABASE_ANON_KEY ya da LOCAL_DB_PATH. Panel, kaydedilen denemeleri
+önbellek süresi dolunca / delta senkronizasyonuyla görür.
+
+Kullanım (depo kökünden):
+    python cli.py ingest gelen/                      # .xlsx ve .zip dosyaları, paralel okuma
+    python cli.py reports cikti/ --kademe 8          # kayıtlı denemelerden PDF'ler (kademe yoksa hepsi)
+    python cli.py run gelen/ cikti/                  # ikisi birden (sadece yeni denemelerin kademeleri)
+
+Çıktı düzeni (kademe başına):
+    cikti/<k>_sinif/ilk40/<deneme>.pdf               # her deneme + tüm denemeler ortalaması
+    cikti/<k>_sinif/siralama.xlsx
+    cikti/<k>_sinif/ogrenci/<sınıf>/<ad>_<okul no>_rapor.pdf   # okul no yoksa <ad>_rapor.pdf
+
+Çıkış kodu: 0 başarılı, 1 okunamayan dosya / kayıt ya da rapor hatası var.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+from analytics import rank_all_exams
+from exports import ranking_xlsx
+from ingest import expand_uploads, parse_many
+from pipeline import SaveError, exam_order, exam_top40, list_kademeler, load_kademe, save_exams, student_jobs
+from reports import build_top40_pdf, safe_name, write_reports
+from storage import open_storage
+
+ALL_EXAMS_LABEL = "TÜM DENEMELER ORTALAMASI"
+
+logger = logging.getLogger("akademik_takip")
+
+
+def _open_db():
+    backend = os.environ.get("STORAGE_BACKEND", "supabase")
+    if backend == "supabase":
+        return open_storage("supabase", url=os.environ["SUPABASE_URL"], key=os.environ["SUPABASE_ANON_KEY"])
+    return open_storage(backend, path=os.environ.get("LOCAL_DB_PATH", "data/akademik.sqlite"))
+
+
+def ingest(db, folder: str, workers=None) -> tuple:
+    """Dönüş: (kaydedilen denemelerin kademeleri, hata var mı)."""
+    files = []
+    for name in sorted(os.listdir(folder)):
+        if name.startswith("~$") or not name.lower().endswith((".xlsx", ".zip")):
+            continue
+        with open(os.path.join(folder, name), "rb") as f:
+            files.append((name, f.read()))
+    jobs = expand_uploads(files)
+    if not jobs:
+        logger.info("okunacak dosya yok: %s", folder)
+        return set(), False
+
+    t0 = time.perf_counter()
+    results = parse_many(jobs, max_workers=workers)
+    # Aynı deneme adı birden fazla dosyada ise ilki kaydedilir (panelle aynı kural)
+    seen, ready, failed = set(), [], False
+    for name, df, exam_name, err in results:
+        if err is None and exam_name in seen:
+            err = "Aynı deneme adı başka bir dosyada da var"
+        if err is not None:
+            logger.error("%s: %s", name, err)
+            failed = True
+            continue
+        seen.add(exam_name)
+        ready.append((df, exam_name))
+    logger.info("%d dosya okundu (%.1f sn)", len(jobs), time.perf_counter() - t0)
+    if not ready:
+        return set(), failed
+
+    try:
+        save_exams(db, ready)
+    except SaveError as e:
+        logger.error("%s", e)
+        return set(), True
+    kademeler = {int(k) for df, _ in ready for k in df["Kademe"].dropna().unique()}
+    return kademeler, failed
+
+
+def reports(db, out_dir: str, kademeler, workers=None, chart_backend=None) -> bool:
+    """Kademe başına: her deneme + tüm denemeler için İlk 40 PDF'i, öğrenci başına rapor. Dönüş: hata var mı."""
+    failed = False
+    for k in kademeler:
+        t0 = time.perf_counter()
+        kdf = load_kademe(db, k)
+        if kdf.empty:
+            continue
+        order = exam_order(kdf)
+        base = os.path.join(out_dir, f"{k}_sinif")
+        os.makedirs(os.path.join(base, "ilk40"), exist_ok=True)
+
+        tables = [(e, exam_top40(kdf[kdf["exam_name"] == e])) for e in order]
+        tables.append((ALL_EXAMS_LABEL, rank_all_exams(kdf, order)))
+        for exam_name, show in tables:
+            with open(os.path.join(base, "ilk40", f"{safe_name(exam_name)}.pdf"), "wb") as f:
+                f.write(build_top40_pdf(k, exam_name, show).getvalue())
+        with open(os.path.join(base, "siralama.xlsx"), "wb") as f:
+            f.write(ranking_xlsx(rank_all_exams(kdf, order, top_n=None)))
+
+        jobs = student_jobs(kdf, k, order, chart_backend=chart_backend)
+        paths, errors = write_reports(jobs, os.path.join(base, "ogrenci"), max_workers=workers)
+        for name, err in errors:
+            logger.error("%d. sınıf %s: %s", k, name, err)
+        failed |= bool(errors)
+        logger.info(
+            "%d. sınıf: %d İlk 40, %d öğrenci raporu (%.1f sn)",
+            k, len(tables), len(paths), time.perf_counter() - t0,
+        )
+    return failed
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_in = sub.add_parser("ingest", help="klasördeki raporları oku ve kaydet")
+    p_in.add_argument("folder")
+
+    p_rep = sub.add_parser("reports", help="kayıtlı denemelerden PDF'leri yaz")
+    p_rep.add_argument("out_dir")
+    p_rep.add_argument("--kademe", action="append", type=int, help="tekrarlanabilir; yoksa tüm kademeler")
+
+    p_run = sub.add_parser("run", help="ingest + reports (yeni denemelerin kademeleri)")
+    p_run.add_argument("folder")
+    p_run.add_argument("out_dir")
+
+    for p in (p_in, p_rep, p_run):
+        p.add_argument("--workers", type=int, help="süreç sayısı (varsayılan: CPU sayısı)")
+    for p in (p_rep, p_run):
+        p.add_argument("--chart", choices=["vector", "png"], help="öğrenci PDF grafik çizimi")
+    args = ap.parse_args(argv)
+
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    db = _open_db()
+    failed = False
+    if args.cmd in ("ingest", "run"):
+        kademeler, failed = ingest(db, args.folder, args.workers)
+    if args.cmd == "reports":
+        kademeler = args.kademe or list_kademeler(db)
+    if args.cmd in ("reports", "run"):
+        failed |= reports(db, args.out_dir, sorted(kademeler), args.workers, args.chart)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,150 @@
+"""
+Excel çıktıları (Streamlit'ten bağımsız).
+
+- subject_nets_xlsx: ders analizi; ortalama ve deneme başına sınıf × ders sayfaları
+  (3 renk ölçekli koşullu biçim) + uzun biçimli veri sayfası
+- ranking_xlsx: tüm kademe sıralaması ve deneme pivotu ("1. Sınav" … Ortalama), sınıf
+  başına bir sayfa. write_only kitap: satırlar diske akıtılır, bellek satır sayısıyla büyümez.
+"""
+import re
+from io import BytesIO
+
+import pandas as pd
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import ColorScaleRule
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+from analytics import subject_matrix
+
+HEADER_FILL = PatternFill("solid", fgColor="0F2D52")
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+
+
+def sheet_title(name, used: set) -> str:
+    """Excel sayfa adı: en çok 31 karakter, []:*?/\\ yok, benzersiz."""
+    base = re.sub(r"[\[\]:*?/\\]+", "_", str(name)).strip() or "Sayfa"
+    title, i = base[:31], 1
+    while title in used:
+        i += 1
+        title = f"{base[:31 - len(str(i)) - 1]}~{i}"
+    used.add(title)
+    return title
+
+
+def _write_header(ws, columns):
+    ws.append(list(columns))
+    for cell in ws[1]:
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+
+
+def _write_matrix(ws, matrix: pd.DataFrame, per_column: bool = True):
+    _write_header(ws, ["Sınıf"] + [str(c) for c in matrix.columns])
+    for sinif, row in matrix.iterrows():
+        ws.append([str(sinif)] + [None if pd.isna(v) else round(float(v), 2) for v in row])
+    n_rows, n_cols = len(matrix) + 1, len(matrix.columns) + 1
+    if len(matrix) and len(matrix.columns):
+        rule = dict(start_type="min", start_color="F8696B", mid_type="percentile", mid_value=50,
+                    mid_color="FFEB84", end_type="max", end_color="63BE7B")
+        ranges = (
+            [f"{get_column_letter(c)}2:{get_column_letter(c)}{n_rows}" for c in range(2, n_cols + 1)]
+            if per_column else [f"B2:{get_column_letter(n_cols)}{n_rows}"]
+        )
+        for ref in ranges:
+            ws.conditional_formatting.add(ref, ColorScaleRule(**rule))
+    ws.column_dimensions["A"].width = 10
+    for c in range(2, n_cols + 1):
+        ws.column_dimensions[get_column_letter(c)].width = 16
+    ws.freeze_panes = "B2"
+
+
+def subject_nets_xlsx(long: pd.DataFrame, exam_order=()) -> bytes:
+    """
+    long: analytics.class_subject_nets tablolarının birleşimi. Sayfalar:
+    "Ortalama" (denemeler öğrenci sayısıyla ağırlıklı), her deneme için sınıf × ders,
+    "Veri" (uzun biçim).
+    """
+    wb = Workbook()
+    used = set()
+    ws = wb.active
+    ws.title = sheet_title("Ortalama", used)
+    _write_matrix(ws, subject_matrix(long, "ders"))
+
+    exams = [e for e in exam_order if e in set(long["exam_name"])]
+    exams += sorted(set(long["exam_name"]) - set(exams))
+    for exam in exams:
+        _write_matrix(wb.create_sheet(sheet_title(exam, used)), subject_matrix(long[long["exam_name"] == exam], "ders"))
+
+    data = wb.create_sheet(sheet_title("Veri", used))
+    _write_header(data, ["Deneme", "Sınıf", "Ders", "Ortalama Net", "Öğrenci"])
+    for r in long.itertuples(index=False):
+        data.append([r.exam_name, r.sinif, r.ders, round(float(r.net), 3), int(r.n)])
+
+    out = BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def _stream_header(ws, columns, widths):
+    cells = []
+    for c in columns:
+        cell = WriteOnlyCell(ws, value=c)
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cells.append(cell)
+    for i, w in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = w
+    ws.freeze_panes = "A2"
+    ws.append(cells)
+
+
+def _cell(v):
+    # numpy skalerleri / NA openpyxl'in yazabileceği tiplere
+    if v is None or v is pd.NA or (isinstance(v, float) and np.isnan(v)):
+        return None
+    return v.item() if hasattr(v, "item") else v
+
+
+def ranking_xlsx(ranking: pd.DataFrame) -> bytes:
+    """
+    ranking: analytics.rank_all_exams(..., top_n=None). Sayfalar: "Kademe" (tam liste),
+    her sınıf için sınıf içi sırayla bir sayfa, "Denemeler" ("1. Sınav" → deneme adı).
+    Kolonlar bir kez diziye alınır; sınıf sayfaları için çerçeve bölünmez, satırlar konumla okunur.
+    """
+    score_cols = [c for c in ranking.columns if c.endswith(". Sınav")] + ["Ortalama"]
+    info_cols = ["Okul No", "Ad Soyad", "Sınıf"]
+    arrays = [ranking[c].to_numpy(dtype=object) for c in info_cols + score_cols]
+    # Okul no metin olarak değil sayı olarak yazılır (Excel'de "sayı metin olarak" uyarısı)
+    arrays[0] = pd.to_numeric(ranking["Okul No"], errors="coerce").astype("Int64").to_numpy(dtype=object)
+    kademe_rank = ranking["Sıra"].to_numpy()
+    widths = [10, 12, 30, 8] + [11] * len(score_cols)
+
+    def row(pos):
+        return [_cell(a[pos]) for a in arrays]
+
+    wb = Workbook(write_only=True)
+    used = set()
+    ws = wb.create_sheet(sheet_title("Kademe", used))
+    _stream_header(ws, ["Sıra"] + info_cols + score_cols, widths)
+    for pos in range(len(ranking)):
+        ws.append([int(kademe_rank[pos])] + row(pos))
+
+    # Sınıf sayfaları: kademe sıralamasındaki sıra korunur, Sınıf Sırası sınıf içi sıradır
+    by_class = ranking.groupby(ranking["Sınıf"].astype("str"), sort=True).indices
+    for sinif, positions in by_class.items():
+        ws = wb.create_sheet(sheet_title(sinif or "-", used))
+        _stream_header(ws, ["Sınıf Sırası", "Kademe Sırası"] + info_cols + score_cols, [12, 13] + widths[1:])
+        for i, pos in enumerate(np.sort(positions), start=1):
+            ws.append([i, int(kademe_rank[pos])] + row(pos))
+
+    ws = wb.create_sheet(sheet_title("Denemeler", used))
+    _stream_header(ws, ["Kolon", "Deneme"], [12, 40])
+    for i, exam in enumerate(ranking.attrs.get("exams", []), start=1):
+        ws.append([f"{i}. Sınav", exam])
+
+    out = BytesIO()
+    wb.save(out)
+    return out.getvalue()
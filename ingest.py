@@ -0,0 +1,352 @@
+"""
+Okul raporu (Excel) okuma motoru.
+
+parse_school_report'un Streamlit'ten bağımsız çekirdeği. Sayfa openpyxl read-only
+modunda tek geçişte okunur; başlık satırı ("Öğr.No") akış sırasında bulunur,
+grup/üst/alt başlıklar tek adımda kolon adına çevrilir ve tüm sayısal ders
+kolonları tek seferde sayıya dönüştürülür.
+
+Çıktı, eski pd.read_excel tabanlı yolla birebir aynıdır
+(bkz. tools/parse_regression.py).
+"""
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+from analytics import student_key
+
+HEADER_LABEL = "Öğr.No"
+RANK_LABELS = ["Sınıf", "Kurum", "İlçe", "İl", "Genel"]
+SCORE_SUBS = ["D", "Y", "N"]
+SCORE_SUFFIXES = ("_D", "_Y", "_N")
+FOOTER_PATTERN = "Genel Ortalama|Kurum Ortalaması"
+
+# pandas'ın varsayılan na_values kümesi (read_excel ile aynı sonuç için)
+NA_STRINGS = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+])
+
+
+def make_unique_columns(col_list):
+    seen = {}
+    out = []
+    for c in col_list:
+        name = str(c).strip()
+        if name == "" or name.lower() in ["none", "nan"]:
+            name = "Kolon"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        out.append(name)
+    return out
+
+
+def extract_kademe(sinif: str):
+    if not sinif:
+        return None
+    m = re.match(r"^\s*(\d+)\s*[-/ ]", str(sinif))
+    if m:
+        return int(m.group(1))
+    m2 = re.match(r"^\s*(\d+)", str(sinif))
+    if m2:
+        return int(m2.group(1))
+    return None
+
+
+def _cell_value(cell):
+    # pandas openpyxl okuyucusuyla aynı dönüşüm
+    v = cell.value
+    if v is None:
+        return np.nan
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        i = int(v)
+        return i if i == v else float(v)
+    if isinstance(v, str) and v in NA_STRINGS:
+        return np.nan
+    return v
+
+
+def _first_value(row):
+    for v in row:
+        if not (isinstance(v, float) and np.isnan(v)):
+            return v
+    return None
+
+
+def _stream_rows(source):
+    """
+    Sayfayı satır satır okur. Dönüş: (satırlar, başlık adayı).
+    Başlık adayı: ilk dolu hücresi "Öğr.No" olan ilk satır; bulunduktan sonra
+    kalan satırlar kontrol edilmeden veri olarak alınır.
+    """
+    wb = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        rows = []
+        header_idx = None
+        for row in ws.rows:
+            values = [_cell_value(c) for c in row]
+            if header_idx is None and str(_first_value(values)).strip() == HEADER_LABEL:
+                header_idx = len(rows)
+            rows.append(values)
+    finally:
+        wb.close()
+
+    # Sondaki boş satırlar read_excel'de de yok
+    while rows and _first_value(rows[-1]) is None:
+        rows.pop()
+    return rows, header_idx
+
+
+def _to_grid(rows) -> pd.DataFrame:
+    if not rows:
+        return pd.DataFrame()
+    width = max(len(r) for r in rows)
+    grid = np.full((len(rows), width), np.nan, dtype=object)
+    for i, r in enumerate(rows):
+        grid[i, :len(r)] = r
+    raw = pd.DataFrame(grid).infer_objects()
+    return raw.dropna(axis=1, how="all")
+
+
+def _header_text(row: pd.Series) -> pd.Series:
+    return row.where(row.notna(), "").astype(str).str.strip()
+
+
+def build_columns(grp: pd.Series, top: pd.Series, sub: pd.Series) -> list:
+    """Grup / üst / alt başlık satırlarından kolon adları (tek adımda)."""
+    g = _header_text(grp.ffill()).to_numpy(dtype=object)
+    t = _header_text(top.ffill()).to_numpy(dtype=object)
+    s = _header_text(sub).to_numpy(dtype=object)
+    gl = np.char.lower(g.astype(str))
+    tl = np.char.lower(t.astype(str))
+    j = np.arange(len(s))
+
+    base = np.where(t != "", t, np.where(g != "", g, np.char.add("Kolon_", j.astype(str))))
+    fallback = np.char.add(base.astype(str), np.where(s != "", np.char.add("_", s.astype(str)), ""))
+    cols = np.select(
+        [
+            j == 0,
+            j == 1,
+            j == 2,
+            (gl == "lgs") & (tl == "puan"),
+            (tl == "dereceler") & np.isin(s, RANK_LABELS),
+            np.isin(s, SCORE_SUBS),
+        ],
+        [
+            "OgrNo",
+            "AdSoyad",
+            "Sinif",
+            "LGS_Puan",
+            np.char.add("Derece_", s.astype(str)),
+            np.char.add(np.char.add(t.astype(str), "_"), s.astype(str)),
+        ],
+        default=fallback,
+    )
+    return make_unique_columns(cols.tolist())
+
+
+def _to_numeric_block(df: pd.DataFrame, cols: list) -> pd.DataFrame:
+    """Kolonları tek bir toplu dönüşümle sayıya çevirir (pd.to_numeric ile aynı dtype)."""
+    if not cols or df.empty:
+        return df.assign(**{c: pd.to_numeric(df[c], errors="coerce") for c in cols})
+    block = df[cols].to_numpy(dtype=object)
+    flat = pd.to_numeric(pd.Series(block.ravel()), errors="coerce").to_numpy(dtype="float64")
+    mat = flat.reshape(block.shape)
+    # Eksiksiz ve tam sayı olan kolonlar int64 kalır (kolon bazlı to_numeric gibi)
+    is_int = ~np.isnan(mat).any(axis=0) & (mat == np.floor(mat)).all(axis=0)
+    out = {}
+    for k, c in enumerate(cols):
+        out[c] = mat[:, k].astype("int64") if is_int[k] else mat[:, k]
+    return df.assign(**out)
+
+
+def read_school_report(source):
+    """Excel okul raporunu okur. Dönüş: (DataFrame, deneme adı)."""
+    rows, header_idx = _stream_rows(source)
+    raw = _to_grid(rows)
+
+    exam_name = "Deneme"
+    try:
+        v = raw.iloc[1, 0]
+        if pd.notna(v):
+            exam_name = str(v).strip()
+    except Exception:
+        pass
+
+    # Akışta bulunan aday, boş kolonlar atıldıktan sonraki ilk kolonla doğrulanır
+    if raw.empty:
+        header_idx = None
+    else:
+        first_col = raw.iloc[:, 0].astype(str).str.strip()
+        if header_idx is None or first_col.iloc[header_idx] != HEADER_LABEL:
+            hits = np.flatnonzero(first_col.to_numpy() == HEADER_LABEL)
+            header_idx = int(hits[0]) if len(hits) else None
+    if header_idx is None:
+        raise ValueError("Başlık satırı bulunamadı: 'Öğr.No' yok.")
+
+    cols = build_columns(raw.iloc[header_idx - 2], raw.iloc[header_idx - 1], raw.iloc[header_idx])
+
+    df = raw.iloc[header_idx + 1:].copy()
+    df.columns = cols
+    df = df.dropna(how="all")
+
+    first = df["OgrNo"].astype(str)
+    df = df[~first.str.contains(FOOTER_PATTERN, na=False, regex=True)]
+
+    df.columns = make_unique_columns(df.columns)
+
+    num_cols = ["OgrNo"] + (["LGS_Puan"] if "LGS_Puan" in df.columns else [])
+    num_cols += [c for c in df.columns if c.endswith(SCORE_SUFFIXES) and c not in num_cols]
+    df = _to_numeric_block(df, num_cols)
+
+    df["Deneme"] = exam_name
+    df["Kademe"] = df["Sinif"].apply(extract_kademe)
+
+    return df.reset_index(drop=True), exam_name
+
+
+# --------------------
+# KAYIT SATIRLARI
+# --------------------
+def _row_hashes(df_exam: pd.DataFrame, exam_name: str) -> list:
+    """
+    Satır içerik özeti (değişmeyen satırlar tekrar gönderilmez). Sayısal kolonlar
+    float64'e çekilir; böylece 5 ile 5.0 aynı özeti verir.
+    """
+    h = df_exam[sorted(df_exam.columns)].copy()
+    num = h.select_dtypes("number").columns
+    h[num] = h[num].astype("float64")
+    sig = "|".join([exam_name] + list(h.columns))
+    sig_hash = int(pd.util.hash_pandas_object(pd.Series([sig]), index=False).iloc[0])
+    row_hash = pd.util.hash_pandas_object(h, index=False).to_numpy()
+    return [f"{sig_hash:016x}{int(x):016x}" for x in row_hash]
+
+
+def build_exam_rows(df_exam: pd.DataFrame, exam_name: str) -> list:
+    """lgs_results satırları (payload + content_hash + ogr_key), iterrows olmadan."""
+    n = len(df_exam)
+    if n == 0:
+        return []
+
+    def col(name):
+        return df_exam[name] if name in df_exam.columns else pd.Series([np.nan] * n, index=df_exam.index)
+
+    def nullable(series, cast):
+        obj = series.astype(object)
+        return [cast(v) if v is not None else None for v in obj.where(series.notna(), None)]
+
+    kademe = nullable(pd.to_numeric(col("Kademe"), errors="coerce"), int)
+    ogr_no = nullable(pd.to_numeric(col("OgrNo"), errors="coerce"), int)
+    lgs_puan = nullable(pd.to_numeric(col("LGS_Puan"), errors="coerce"), float)
+    if "AdSoyad" in df_exam.columns:
+        ad_soyad = df_exam["AdSoyad"].astype(str).str.strip().tolist()
+    else:
+        ad_soyad = [""] * n
+    sinif_s = col("Sinif")
+    sinif = sinif_s.astype(str).str.strip().where(sinif_s.notna(), None).tolist()
+    ogr_key = student_key(col("OgrNo"), pd.Series(ad_soyad, index=df_exam.index), sinif_s).tolist()
+
+    payloads = df_exam.astype(object).where(df_exam.notna(), None).to_dict("records")
+    hashes = _row_hashes(df_exam, exam_name)
+
+    return [
+        {
+            "exam_name": exam_name,
+            "exam_date": None,
+            "kademe": kademe[i],
+            "ogr_no": ogr_no[i],
+            "ad_soyad": ad_soyad[i],
+            "sinif": sinif[i],
+            "ogr_key": ogr_key[i],
+            "lgs_puan": lgs_puan[i],
+            "payload": payloads[i],
+            "content_hash": hashes[i],
+        }
+        for i in range(n)
+    ]
+
+
+# --------------------
+# TOPLU OKUMA
+# --------------------
+def expand_uploads(files):
+    """
+    files: (dosya adı, bytes) listesi. .zip içindeki .xlsx dosyaları açılır
+    (Excel'in ~$ geçici dosyaları ve __MACOSX atlanır).
+    """
+    out = []
+    for name, data in files:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(BytesIO(data)) as zf:
+                for info in sorted(zf.infolist(), key=lambda i: i.filename):
+                    base = os.path.basename(info.filename)
+                    if (
+                        info.is_dir()
+                        or not base.lower().endswith(".xlsx")
+                        or base.startswith("~$")
+                        or info.filename.startswith("__MACOSX/")
+                    ):
+                        continue
+                    out.append((f"{name}/{info.filename}", zf.read(info)))
+        else:
+            out.append((name, data))
+    return out
+
+
+def _parse_job(name, data):
+    # Süreç havuzunda çalışır; hata ana sürece metin olarak döner.
+    try:
+        df, exam_name = read_school_report(BytesIO(data))
+        return name, df, exam_name, None
+    except Exception as e:
+        return name, None, None, f"{type(e).__name__}: {e}"
+
+
+def parse_many(files, max_workers=None, on_done=None):
+    """
+    Dosyaları süreç havuzunda okur. Dönüş: giriş sırasıyla
+    (ad, df, deneme adı, hata) listesi. on_done(bitti, toplam, sonuç) ilerleme için
+    ana süreçte çağrılır.
+    """
+    files = list(files)
+    results = [None] * len(files)
+    if not files:
+        return results
+
+    workers = max_workers or min(len(files), os.cpu_count() or 1)
+    if workers <= 1 or len(files) == 1:
+        for i, (name, data) in enumerate(files):
+            results[i] = _parse_job(name, data)
+            if on_done:
+                on_done(i + 1, len(files), results[i])
+        return results
+
+    # spawn: Streamlit sunucusunun thread'leri fork ile kopyalanmasın
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {pool.submit(_parse_job, name, data): i for i, (name, data) in enumerate(files)}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            i = futures[fut]
+            try:
+                results[i] = fut.result()
+            except Exception as e:
+                results[i] = (files[i][0], None, None, f"{type(e).__name__}: {e}")
+            if on_done:
+                on_done(done, len(files), results[i])
+    return results
@@ -0,0 +1,62 @@
+"""
+Hafif zaman ölçümü (Streamlit'ten bağımsız).
+
+span() bir işin süresini, satır sayısını ve önbellek durumunu kaydeder. Kayıt:
+- begin_run ile açılmış çalıştırmanın listesine eklenir (uygulamadaki performans paneli),
+- "akademik_takip.perf" logger'ına tek satır JSON olarak yazılır; oturumlar arası
+  toplamak için log dosyası satır satır okunabilir.
+"""
+import contextvars
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+perf_logger = logging.getLogger("akademik_takip.perf")
+_current_run = contextvars.ContextVar("perf_run", default=None)
+
+
+def begin_run(**fields) -> list:
+    """Yeni bir çalıştırma (Streamlit rerun'ı) başlatır; bu bağlamdaki span'ler dönen listeye eklenir."""
+    spans = []
+    _current_run.set({"run": uuid.uuid4().hex[:8], "fields": fields, "spans": spans})
+    return spans
+
+
+def size_of(obj):
+    """Satır sayısı: DataFrame / liste / sözlük; (df, ...) demetinde ilk eleman."""
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    if hasattr(obj, "shape"):
+        return int(obj.shape[0])
+    if isinstance(obj, (list, dict, set)):
+        return len(obj)
+    return None
+
+
+def _emit(rec: dict):
+    run = _current_run.get()
+    if run is not None:
+        rec = {"run": run["run"], **run["fields"], **rec}
+        run["spans"].append(rec)
+    if perf_logger.isEnabledFor(logging.INFO):
+        line = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), **rec}
+        perf_logger.info(json.dumps(line, ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name: str, **fields):
+    """with span("ad") as rec: ... rec["rows"] = n; rec["cache"] = "hit" """
+    rec = {"span": name, **fields}
+    t0 = time.perf_counter()
+    try:
+        yield rec
+    except Exception as e:
+        rec["error"] = type(e).__name__
+        raise
+    finally:
+        rec["ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        _emit(rec)
+
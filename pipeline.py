@@ -0,0 +1,441 @@
+"""
+Kayıt ve toplu rapor akışı (Streamlit'ten bağımsız).
+
+Uygulama (app.py) ve komut satırı (cli.py) aynı fonksiyonları kullanır; client,
+storage.open_storage'ın döndürdüğü motordur (Supabase ya da SQLite).
+
+- CircuitBreaker: art arda bağlantı hatalarında üstel bekleme, eşik aşılınca sunucuya
+  hiç gidilmez (ön planda zaman aşımı beklenmez)
+- save_exams: (exam_name, ogr_no) anahtarıyla fark tabanlı kayıt; hata SaveError olur
+- load_kademe: kademenin tüm satırları, netler "net:<ders>" kolonlarına açılmış
+- exam_order / exam_top40 / student_jobs: İlk 40 ve öğrenci raporlarının girdileri
+"""
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from analytics import cohort_trends, summarize_exam
+from ingest import build_exam_rows
+from snapshot import NET_PREFIX, compact, flatten_nets, net_columns
+
+try:
+    import httpx
+except Exception:  # pragma: no cover
+    httpx = None
+
+logger = logging.getLogger("akademik_takip")
+
+TABLE = "lgs_results"
+TOMBSTONE_TABLE = "lgs_tombstones"
+SUMMARY_TABLE = "lgs_exam_summary"
+PAGE_SIZE = 1000  # PostgREST varsayılan max-rows
+RESULT_COLUMNS = "exam_name,kademe,ogr_no,ad_soyad,sinif,ogr_key,lgs_puan,created_at"
+
+UPSERT_WORKERS = 4  # eşzamanlı upsert isteği
+TARGET_REQUEST_BYTES = 512 * 1024  # parça boyutu bu hedefe göre ayarlanır
+MIN_CHUNK, MAX_CHUNK = 25, 1000
+UPSERT_RETRIES = 3
+RETRY_BACKOFF = 0.5  # sn, her denemede iki katı
+DELETE_BATCH_SIZE = 200  # tek silme isteğindeki ogr_no sayısı (URL uzunluğu)
+
+
+class SaveError(Exception):
+    """Kaydın hangi adımda kaldığı (stage) ve asıl hata (cause)."""
+
+    def __init__(self, stage: str, cause: Exception):
+        super().__init__(f"{stage}: {type(cause).__name__}: {cause}")
+        self.stage = stage
+        self.cause = cause
+
+
+# --------------------
+# HATA SINIFLANDIRMA
+# --------------------
+# Geçici sayılan HTTP durumları: zaman aşımı, istek çok büyük (parça bölünür), hız
+# sınırı, 5xx / Cloudflare ağ geçidi hataları, 540 = Supabase projesi duraklatılmış.
+TRANSIENT_STATUS = frozenset({408, 413, 425, 429, 500, 502, 503, 504, 520, 521, 522, 523, 524, 540})
+# Postgres: sorgu zaman aşımı, sunucu kapanıyor / henüz bağlantı kabul etmiyor, bağlantı sınırı
+TRANSIENT_PG_CODES = frozenset({"57014", "57P01", "57P03", "53300"})
+
+
+def _error_chain(e: Exception):
+    # Sarılmış hatalar (raise ... from e) da sınıflandırılır
+    seen = set()
+    while e is not None and id(e) not in seen:
+        seen.add(id(e))
+        yield e
+        e = e.__cause__ or e.__context__
+
+
+def http_status(e: Exception):
+    """Hatanın HTTP durum kodu (httpx yanıtı ya da postgrest APIError.code), yoksa None."""
+    response = getattr(e, "response", None)
+    if getattr(response, "status_code", None) is not None:
+        return int(response.status_code)
+    # postgrest JSON olmayan yanıtta (ağ geçidi, 540) durum kodunu code'a yazar;
+    # Postgres hata kodları 5 karakterlidir
+    code = str(getattr(e, "code", None) or "")
+    return int(code) if len(code) == 3 and code.isdigit() else None
+
+
+def is_connect_error(e: Exception) -> bool:
+    """Sunucuya hiç ulaşılamadı: bağlantı reddedildi / kurulamadı."""
+    for err in _error_chain(e):
+        if isinstance(err, ConnectionError):  # ConnectionRefusedError dahil
+            return True
+        if httpx is not None and isinstance(err, httpx.ConnectError):
+            return True
+    return False
+
+
+def is_transient_error(e: Exception) -> bool:
+    """Tekrar denemeye değer hatalar (türe ve durum koduna göre): ağ, zaman aşımı, 413, 5xx, 540."""
+    if is_connect_error(e):
+        return True
+    for err in _error_chain(e):
+        if isinstance(err, TimeoutError):
+            return True
+        if httpx is not None and isinstance(err, httpx.TransportError):
+            return True
+        if str(getattr(err, "code", None) or "") in TRANSIENT_PG_CODES:
+            return True
+        if http_status(err) in TRANSIENT_STATUS:
+            return True
+    return False
+
+
+def is_size_error(e: Exception) -> bool:
+    """İstek çok büyük (413) ya da sorgu zaman aşımı: daha küçük parçayla düzelebilir."""
+    for err in _error_chain(e):
+        if http_status(err) == 413 or str(getattr(err, "code", None) or "") == "57014":
+            return True
+    return False
+
+
+class BackendUnavailable(Exception):
+    """Devre açık: sunucuya gidilmedi. retry_in: sonraki denemeye kalan saniye."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"sunucu devre dışı, {retry_in:.0f} sn sonra yeniden denenecek")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Sunucu çağrıları için devre kesici (thread-safe).
+    - Sadece geçici hatalar (is_transient_error: bağlantı, zaman aşımı, 5xx) sayılır;
+      yetki / şema hataları devreyi açmaz.
+    - Her hatadan sonra bekleme üstel artar: base, 2*base, ... en çok max_delay (±%20).
+    - threshold art arda hatadan sonra devre açılır: bekleme bitene kadar allow() False.
+      Süre dolunca tek deneme serbesttir (yarı açık); başarı devreyi kapatır, hata
+      bekleme süresini ikiye katlar.
+    - epoch her toparlanmada artar: kesinti sırasında önbelleğe giren boş sonuçlar atılır.
+    """
+
+    def __init__(self, threshold: int = 3, base: float = 5.0, max_delay: float = 300.0):
+        self.threshold = threshold
+        self.base = base
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.next_try = 0.0
+        self.last_error = None
+        self.epoch = 0
+
+    def backoff(self) -> float:
+        """Son hatadan sonra beklenecek süre (hata yoksa 0)."""
+        if self.failures == 0:
+            return 0.0
+        return min(self.max_delay, self.base * 2 ** (self.failures - 1))
+
+    def retry_in(self) -> float:
+        return max(0.0, self.next_try - time.monotonic())
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.threshold and self.retry_in() > 0
+
+    def allow(self) -> bool:
+        return not self.is_open
+
+    def check(self):
+        if self.is_open:
+            raise BackendUnavailable(self.retry_in())
+
+    def success(self):
+        with self.lock:
+            if self.failures:
+                self.epoch += 1
+                logger.info("sunucu yeniden erişilebilir (%d hatadan sonra)", self.failures)
+            self.failures = 0
+            self.next_try = 0.0
+            self.last_error = None
+
+    def failure(self, e: Exception):
+        if isinstance(e, BackendUnavailable) or not is_transient_error(e):
+            return
+        with self.lock:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.next_try = time.monotonic() + self.backoff() * random.uniform(0.8, 1.2)
+            if self.failures == self.threshold:
+                logger.warning("sunucu devresi açıldı: %s", self.last_error)
+
+
+# --------------------
+# OKUMA
+# --------------------
+def select_all(make_query, page_size: int = PAGE_SIZE) -> list:
+    """Sayfalı okuma: PostgREST tek istekte en fazla max-rows satır döndürür."""
+    out = []
+    start = 0
+    while True:
+        res = make_query().range(start, start + page_size - 1).execute()
+        data = res.data or []
+        out.extend(data)
+        if len(data) < page_size:
+            return out
+        start += page_size
+
+
+# --------------------
+# KAYIT
+# --------------------
+def chunk_size(rows: list) -> int:
+    sample = rows[:20]
+    if not sample:
+        return MAX_CHUNK
+    avg = sum(len(json.dumps(r, default=str)) for r in sample) / len(sample)
+    return int(min(MAX_CHUNK, max(MIN_CHUNK, TARGET_REQUEST_BYTES // max(avg, 1))))
+
+
+def upsert_chunk(client, rows: list, attempt: int = 0, breaker: CircuitBreaker = None):
+    """
+    Boyut hatasında (413, sorgu zaman aşımı) parça ikiye bölünür; diğer geçici hatalarda
+    artan beklemeyle tekrar denenir. Sunucuya ulaşılamıyorsa ya da devre açıksa istek
+    çoğaltılmaz: hemen vazgeçilir (breaker verildiyse hata ona işlenir, BackendUnavailable).
+    """
+    if breaker is not None:
+        breaker.check()
+    try:
+        client.table(TABLE).upsert(rows, on_conflict="exam_name,ogr_no").execute()
+    except Exception as e:
+        if is_connect_error(e):
+            if breaker is None:
+                raise
+            breaker.failure(e)
+            raise BackendUnavailable(breaker.retry_in()) from e
+        if not is_transient_error(e):
+            raise
+        if is_size_error(e) and len(rows) > MIN_CHUNK:
+            mid = len(rows) // 2
+            upsert_chunk(client, rows[:mid], breaker=breaker)
+            upsert_chunk(client, rows[mid:], breaker=breaker)
+            return
+        if attempt >= UPSERT_RETRIES:
+            raise
+        time.sleep(RETRY_BACKOFF * (2 ** attempt))
+        upsert_chunk(client, rows, attempt + 1, breaker)
+
+
+def stored_hashes(client, exam_name: str):
+    """
+    Dönüş: ({ogr_no: content_hash}, okul no'su olmayan satırların content_hash listesi,
+    kayıtlı satırların kademeleri).
+    """
+    rows = select_all(
+        lambda: client.table(TABLE).select("ogr_no,content_hash,kademe")
+        .eq("exam_name", exam_name).order("ogr_no")
+    )
+    hashes = {r["ogr_no"]: r.get("content_hash") for r in rows if r.get("ogr_no") is not None}
+    kademeler = {int(r["kademe"]) for r in rows if r.get("kademe") is not None}
+    return hashes, [r.get("content_hash") for r in rows if r.get("ogr_no") is None], kademeler
+
+
+def replace_keyless(client, exam_name: str, gone: list, rows: list):
+    """
+    Okul no'su olmayan satırlar anahtarsızdır: içerik özeti gone'da olanlar silinir,
+    rows eklenir. Silinenler için tombstone yazılmaz (ogr_no boş tombstone denemenin
+    tamamı demektir); yerel kopyalar sayım kontrolüyle tam yüklemeye düşer.
+    """
+    def keyless():
+        return client.table(TABLE).delete().eq("exam_name", exam_name).is_("ogr_no", "null")
+
+    hashes = [h for h in gone if h is not None]
+    for i in range(0, len(hashes), DELETE_BATCH_SIZE):
+        keyless().in_("content_hash", hashes[i:i + DELETE_BATCH_SIZE]).execute()
+    if None in gone:
+        keyless().is_("content_hash", "null").execute()
+    if rows:
+        client.table(TABLE).insert(rows).execute()
+
+
+def save_exams(client, exams, breaker: CircuitBreaker = None) -> dict:
+    """
+    exams: (df_exam, exam_name) listesi. (exam_name, ogr_no) anahtarıyla upsert:
+    sadece içerik özeti değişen satırlar gönderilir, dosyada artık olmayan öğrenciler
+    en son silinir. Böylece yarıda kalan bir kayıt denemeyi eksik bırakmaz.
+    breaker: devre açıksa / sunucuya ulaşılamazsa kayıt hemen durur (BackendUnavailable).
+    Dönüş: {"exams", "rows" (gönderilen), "deleted", "kademeler" (denemelerin kayıttan
+    önceki kademeleri; önbellek geçersizleştirme için)}; hata adımıyla SaveError.
+    """
+    changed, no_key, stale, old_kademeler = {}, {}, {}, set()
+    try:
+        if breaker is not None:
+            breaker.check()
+        for df_exam, exam_name in exams:
+            rows = build_exam_rows(df_exam, exam_name)
+            stored, stored_no_key, kademeler = stored_hashes(client, exam_name)
+            old_kademeler |= kademeler
+            # Aynı okul no dosyada iki kez varsa sonuncusu geçerli
+            keyed = {r["ogr_no"]: r for r in rows if r["ogr_no"] is not None}
+            changed.setdefault(exam_name, []).extend(
+                r for no, r in keyed.items() if stored.get(no) != r["content_hash"]
+            )
+            # Okul no'su olmayanlar anahtarsız: sadece sayısı değişen özetler silinip eklenir
+            new_no_key = [r for r in rows if r["ogr_no"] is None]
+            have, want = Counter(stored_no_key), Counter(r["content_hash"] for r in new_no_key)
+            diff = {h for h in have.keys() | want.keys() if have[h] != want[h]}
+            if diff:
+                no_key[exam_name] = ([h for h in diff if have[h]], [r for r in new_no_key if r["content_hash"] in diff])
+            stale[exam_name] = [no for no in stored if no not in keyed]
+    except Exception as e:
+        raise SaveError("Mevcut kayıtlar okunamadı", e) from e
+
+    size = chunk_size([r for rows in changed.values() for r in rows])
+    try:
+        # Denemeler sırayla (parçaları eşzamanlı) yazılır: ilk kayıt zamanı (created_at)
+        # dosya sırasını izler, çok denemeli kayıtta da exam_order belirlidir.
+        with ThreadPoolExecutor(max_workers=UPSERT_WORKERS) as pool:
+            for exam_name, rows in changed.items():
+                chunks = [rows[i:i + size] for i in range(0, len(rows), size)]
+                list(pool.map(lambda part: upsert_chunk(client, part, breaker=breaker), chunks))
+                if exam_name in no_key:
+                    replace_keyless(client, exam_name, *no_key[exam_name])
+    except Exception as e:
+        raise SaveError("Kayıt ekleme işlemi başarısız", e) from e
+
+    deleted = 0
+    try:
+        for exam_name, nos in stale.items():
+            for i in range(0, len(nos), DELETE_BATCH_SIZE):
+                part = nos[i:i + DELETE_BATCH_SIZE]
+                # Delta senkronizasyonu için: bu satırlar silindi. Tombstone yazılamazsa
+                # silme de yapılmaz (yerel kopyalarda hayalet satır kalmasın); satırlar
+                # bir sonraki kayıtta yine eski görünür ve yeniden denenir.
+                try:
+                    client.table(TOMBSTONE_TABLE).insert(
+                        [{"exam_name": exam_name, "ogr_no": no} for no in part]
+                    ).execute()
+                except Exception as e:
+                    logger.warning("tombstone yazılamadı, %s: %d satır silinmedi: %s", exam_name, len(part), e)
+                    continue
+                client.table(TABLE).delete().eq("exam_name", exam_name).in_("ogr_no", part).execute()
+                deleted += len(part)
+    except Exception as e:
+        raise SaveError("Eski kayıtlar silinemedi", e) from e
+
+    # Panel KPI / İlk 40 özeti (deneme × kademe × sınıf)
+    try:
+        for df_exam, exam_name in exams:
+            summary = summarize_exam(df_exam, exam_name)
+            if summary:
+                client.table(SUMMARY_TABLE).upsert(summary, on_conflict="exam_name,kademe,sinif").execute()
+            q = client.table(SUMMARY_TABLE).delete().eq("exam_name", exam_name)
+            if summary:
+                q = q.not_.in_("sinif", [r["sinif"] for r in summary])
+            q.execute()
+    except Exception as e:
+        raise SaveError("Deneme özeti yazılamadı", e) from e
+
+    sent = sum(len(rows) for rows in changed.values()) + sum(len(rows) for _, rows in no_key.values())
+    stats = {"exams": len(exams), "rows": sent, "deleted": deleted, "kademeler": sorted(old_kademeler)}
+    logger.info("kayıt: %d deneme, %d satır gönderildi, %d satır silindi", stats["exams"], stats["rows"], stats["deleted"])
+    return stats
+
+
+# --------------------
+# TOPLU RAPOR GİRDİLERİ
+# --------------------
+def load_kademe(client, kademe: int) -> pd.DataFrame:
+    """Kademenin tüm satırları; payload "net:<ders>" kolonlarına açılır (dar tipler)."""
+    cols = RESULT_COLUMNS + ",payload"
+    rows = select_all(lambda: client.table(TABLE).select(cols).eq("kademe", kademe).order("created_at").order("ogr_no"))
+    return compact(flatten_nets(pd.DataFrame(rows, columns=cols.split(","))))
+
+
+def list_kademeler(client) -> list:
+    """
+    lgs_results'taki farklı kademeler (özet tablosu eski kayıtlarda eksik olabilir).
+    Kademe indeksinde atlayarak okunur: kademe başına tek satırlık bir istek.
+    """
+    out = []
+    while True:
+        q = client.table(TABLE).select("kademe").not_.is_("kademe", "null")
+        if out:
+            q = q.gt("kademe", out[-1])
+        rows = q.order("kademe").limit(1).execute().data or []
+        if not rows:
+            return out
+        out.append(int(rows[0]["kademe"]))
+
+
+def exam_order(df: pd.DataFrame) -> list:
+    """Denemeler ilk kayıt zamanına göre (panelle aynı sıra)."""
+    if df.empty:
+        return []
+    return df.groupby("exam_name", observed=True)["created_at"].min().sort_values().index.astype("str").tolist()
+
+
+def top40_table(top40: pd.DataFrame) -> pd.DataFrame:
+    """İlk 40 satırlarından paneldeki / build_top40_pdf'teki tablo."""
+    show = top40[["ogr_no", "ad_soyad", "sinif", "lgs_puan"]].reset_index(drop=True)
+    show.insert(0, "Sıra", range(1, len(show) + 1))
+    show = show.rename(columns={
+        "ogr_no": "Okul No",
+        "ad_soyad": "Ad Soyad",
+        "sinif": "Sınıf",
+        "lgs_puan": "Puan",
+    })
+    show["Puan"] = pd.to_numeric(show["Puan"], errors="coerce").astype("float64").round(2)
+    return show
+
+
+def exam_top40(df_exam: pd.DataFrame) -> pd.DataFrame:
+    # Tam sıralama yerine sadece ilk 40 satır seçilir (NaN puanlar dışarıda)
+    return top40_table(df_exam.nlargest(40, "lgs_puan"))
+
+
+def trend_for(trends: pd.DataFrame, ogr_key) -> dict:
+    """Tek öğrencinin eğilim satırı (PDF önbellek anahtarına girebilsin diye düz sözlük) ya da None."""
+    if ogr_key not in trends.index:
+        return None
+    return {k: v.item() if hasattr(v, "item") else v for k, v in trends.loc[ogr_key].items()}
+
+
+def student_jobs(df: pd.DataFrame, kademe: int, order, chart_backend: str = None) -> list:
+    """
+    load_kademe çıktısından öğrenci başına rapor işi (reports.build_reports_zip /
+    write_reports girdisi): geçmiş, son denemenin netleri ve kohort eğilimi.
+    """
+    if df.empty:
+        return []
+    trends = cohort_trends(df, list(order))
+    nets_cols = sorted(net_columns(df))
+    jobs = []
+    hist = df.sort_values("created_at", kind="stable")
+    for key, g in hist.groupby("ogr_key", sort=False):
+        last = g.iloc[-1]
+        nets = {c[len(NET_PREFIX):]: float(last[c]) for c in nets_cols if pd.notna(last[c])}
+        jobs.append({
+            "name": last["ad_soyad"], "kademe": kademe, "sinif": str(last["sinif"]), "ogr_key": key,
+            "df": g.drop(columns=nets_cols), "nets": nets, "trend": trend_for(trends, key),
+            "chart_backend": chart_backend,
+        })
+    return sorted(jobs, key=lambda j: (j["sinif"], j["name"]))
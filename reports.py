@@ -0,0 +1,690 @@
+"""
+PDF raporları (Streamlit'ten bağımsız).
+
+- build_student_pdf: öğrenci akademik performans raporu (grafikler vektör ya da PNG)
+- build_top40_pdf: tek sayfa İlk 40 listesi
+- build_subject_heatmap_pdf: sınıf × ders net ortalamaları (ısı haritası)
+- build_reports_zip / build_merged_student_pdf: bir sınıf / kademenin tüm öğrenci
+  raporları; zip için süreç havuzunda paralel üretilir
+"""
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from io import BytesIO
+
+import pandas as pd
+from matplotlib.figure import Figure
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.shapes import Drawing, Group, String
+from reportlab.graphics.widgets.markers import makeMarker
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Image as RLImage
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from analytics import PCT_PREFIX, payload_to_nets
+
+LOGO_PATH = "assets/images/logo.jpg"  # varsa kullanılır
+FONT_PATH = "assets/fonts/DejaVuSans.ttf"  # Türkçe için
+
+
+# --------------------
+# PDF HELPERS
+# --------------------
+# Font kaydı, stil sayfası ve logo süreç başına bir kez yüklenir (lru_cache);
+# toplu üretimde her işçi süreci bunları _init_worker'da hazırlar.
+@lru_cache(maxsize=None)
+def ensure_pdf_font():
+    try:
+        pdfmetrics.registerFont(TTFont("TRFont", FONT_PATH))
+        return "TRFont"
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=None)
+def get_pdf_styles():
+    """Türkçe fontlu ortak stil sayfası. Paylaşılır: çağıranlar değiştirmemeli."""
+    font_name = ensure_pdf_font()
+    styles = getSampleStyleSheet()
+    if font_name:
+        for k in styles.byName:
+            styles[k].fontName = font_name
+    return styles
+
+
+@lru_cache(maxsize=None)
+def get_logo_bytes():
+    try:
+        with open(LOGO_PATH, "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def logo_image(width, height):
+    data = get_logo_bytes()
+    return RLImage(BytesIO(data), width=width, height=height) if data else None
+
+
+def fig_to_rl_image(fig, width=520, height=220):
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=160, bbox_inches="tight")
+    buf.seek(0)
+    return RLImage(buf, width=width, height=height)
+
+
+def _rotate_xticks(ax, rotation):
+    for label in ax.get_xticklabels():
+        label.set_rotation(rotation)
+        label.set_ha("right")
+
+
+# --------------------
+# GRAFİKLER
+# --------------------
+# "vector": ReportLab çizimi (PDF'e vektör olarak gömülür; hızlı ve küçük)
+# "png": matplotlib ile 160 dpi PNG (eski yol)
+CHART_BACKENDS = ("vector", "png")
+CHART_BACKEND = "vector"
+CHART_COLOR = "#1f77b4"
+
+
+def _png_chart(kind, labels, values, title, xlabel, ylabel, width, height, rotation):
+    # pyplot yerine Figure: PDF indirme thread'inde de güvenli
+    fig = Figure(figsize=(7.2, 2.8))
+    ax = fig.subplots()
+    if kind == "line":
+        ax.plot(list(labels), list(values), marker="o")
+    else:
+        ax.bar(list(labels), list(values))
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    _rotate_xticks(ax, rotation)
+    fig.tight_layout()
+    return fig_to_rl_image(fig, width=width, height=height)
+
+
+def _vector_chart(kind, labels, values, title, xlabel, ylabel, width, height, rotation):
+    font = ensure_pdf_font() or "Helvetica"
+    values = [float(v) for v in values]
+    color = colors.HexColor(CHART_COLOR)
+
+    if kind == "line":
+        chart = HorizontalLineChart()
+        chart.joinedLines = 1
+        chart.lines[0].strokeColor = color
+        chart.lines[0].strokeWidth = 1.5
+        chart.lines[0].symbol = makeMarker("FilledCircle", size=4, fillColor=color, strokeColor=color)
+    else:
+        chart = VerticalBarChart()
+        chart.bars[0].fillColor = color
+        chart.bars[0].strokeColor = None
+        chart.valueAxis.valueMin = min(0.0, min(values))
+        chart.categoryAxis.joinAxisMode = "bottom"  # negatif netlerde etiketler çubuğa binmesin
+    chart.data = [tuple(values)]
+    chart.x, chart.y = 48, 52
+    chart.width, chart.height = width - 60, height - 76
+
+    ca = chart.categoryAxis
+    ca.categoryNames = [str(v) for v in labels]
+    ca.labels.angle = rotation
+    ca.labels.boxAnchor = "ne"
+    ca.labels.dy = -2
+    ca.labels.fontName = font
+    ca.labels.fontSize = 8
+    chart.valueAxis.labels.fontName = font
+    chart.valueAxis.labels.fontSize = 8
+    chart.valueAxis.visibleGrid = 1
+    chart.valueAxis.gridStrokeColor = colors.HexColor("#e3e8ee")
+
+    d = Drawing(width, height)
+    d.add(chart)
+    d.add(String(width / 2, height - 12, title, textAnchor="middle", fontName=font, fontSize=10))
+    d.add(String(chart.x + chart.width / 2, 3, xlabel, textAnchor="middle", fontName=font, fontSize=8))
+    # dikey eksen başlığı (90° döndürülmüş)
+    d.add(Group(String(0, 0, ylabel, textAnchor="middle", fontName=font, fontSize=8),
+                transform=(0, 1, -1, 0, 12, chart.y + chart.height / 2)))
+    return d
+
+
+def _chart(kind, labels, values, title, xlabel, ylabel, width, height, rotation, backend):
+    backend = backend or CHART_BACKEND
+    if backend not in CHART_BACKENDS:
+        raise ValueError(f"Bilinmeyen grafik motoru: {backend!r}")
+    draw = _vector_chart if backend == "vector" else _png_chart
+    return draw(kind, labels, values, title, xlabel, ylabel, width, height, rotation)
+
+
+def line_chart(labels, values, title, xlabel, ylabel, width=520, height=210, backend=None):
+    return _chart("line", labels, values, title, xlabel, ylabel, width, height, 25, backend)
+
+
+def bar_chart(labels, values, title, xlabel, ylabel, width=520, height=210, backend=None):
+    return _chart("bar", labels, values, title, xlabel, ylabel, width, height, 35, backend)
+
+
+def _change_comment(diff: float) -> str:
+    if diff >= 20:
+        return "Belirgin yükseliş var. Düzenli çalışmanın karşılığı alınmış görünüyor."
+    if diff >= 5:
+        return "Olumlu gelişim var. İstikrarı korumak önemli."
+    if diff <= -20:
+        return "Belirgin düşüş var. Çalışma düzeni ve sınav kaygısı birlikte değerlendirilmeli."
+    if diff <= -5:
+        return "Son denemelerde küçük bir gerileme var. Eksik kazanımlar ve tekrar planı gözden geçirilebilir."
+    return "Puanlar stabil. İlerleme için hedef derslere odaklı plan faydalı olur."
+
+
+def trend_comment(trend: dict) -> str:
+    """analytics.cohort_trends satırından yorum: değişim + kademe içi konum."""
+    if not trend or pd.isna(trend.get("last")):
+        return "Bu öğrenci için yeterli puan verisi bulunamadı."
+    text = _change_comment(trend["change"])
+    if trend.get("n_exams", 0) >= 2:
+        rc = int(trend["rank_change"])
+        move = f"{rc} basamak yükseldi" if rc > 0 else f"{-rc} basamak geriledi" if rc < 0 else "değişmedi"
+        text += (
+            f" Kademe sırası {int(trend['rank_first'])} → {int(trend['rank_last'])} ({move});"
+            f" son denemedeki kademe yüzdeliği %{trend['pct_last']:.0f}."
+        )
+    return text
+
+
+def trend_summary(trend: dict) -> str:
+    """PDF'teki tek satırlık eğilim özeti; yüzdelik girilen her deneme için (deneme sırasıyla)."""
+    if not trend or trend.get("n_exams", 0) < 2:
+        return ""
+    pcts = [v for k, v in trend.items() if k.startswith(PCT_PREFIX) and not pd.isna(v)]
+    if len(pcts) < 2:
+        pcts = [trend["pct_first"], trend["pct_last"]]
+    return (
+        f"Eğilim: deneme başına {trend['slope']:+.1f} puan • Oynaklık: ±{trend['volatility']:.1f} • "
+        "Yüzdelik: " + " → ".join(f"%{v:.0f}" for v in pcts)
+    )
+
+
+def auto_comment(student_df: pd.DataFrame, trend: dict = None) -> str:
+    """trend (cohort_trends satırı) verilirse ondan; yoksa ilk / son puan farkından."""
+    if trend is not None:
+        return trend_comment(trend)
+    if student_df.empty or student_df["lgs_puan"].dropna().empty:
+        return "Bu öğrenci için yeterli puan verisi bulunamadı."
+    s = student_df.sort_values("created_at")
+    last = s["lgs_puan"].dropna().iloc[-1]
+    first = s["lgs_puan"].dropna().iloc[0]
+    return _change_comment(last - first)
+
+
+def _last_nets(student_df: pd.DataFrame, last_payload: dict = None) -> dict:
+    try:
+        if last_payload is None:
+            last_payload = student_df.sort_values("created_at").iloc[-1].get("payload", {})
+        return payload_to_nets(last_payload)
+    except Exception:
+        return {}
+
+
+def student_story(
+    student_name: str, kademe: int, student_df: pd.DataFrame, nets: dict, chart_backend: str = None, trend: dict = None,
+) -> list:
+    """
+    Tek öğrencinin rapor akışı (flowable listesi); tekli ve birleşik PDF ortak kullanır.
+    trend: analytics.cohort_trends satırı (kademe içi sıra / yüzdelik yorumları için).
+    """
+    font_name = ensure_pdf_font()
+    styles = get_pdf_styles()
+
+    elems = []
+    # logo + başlık
+    logo = logo_image(55, 55)
+    if logo is not None:
+        header = Table(
+            [[logo,
+              Paragraph("<b>Cemil Meriç Ortaokulu</b><br/>Öğrenci Akademik Performans Raporu", styles["Title"])]],
+            colWidths=[65, 430]
+        )
+        header.setStyle(TableStyle([("VALIGN", (0,0), (-1,-1), "MIDDLE")]))
+        elems.append(header)
+    else:
+        elems.append(Paragraph("Öğrenci Akademik Performans Raporu", styles["Title"]))
+
+    elems.append(Spacer(1, 8))
+    elems.append(Paragraph(f"<b>Öğrenci:</b> {student_name}", styles["Normal"]))
+    elems.append(Paragraph(f"<b>Kademe:</b> {kademe}", styles["Normal"]))
+    elems.append(Spacer(1, 24))  # leave room for signature
+
+    elems.append(Paragraph("Kısa Değerlendirme", styles["Heading2"]))
+    elems.append(Paragraph(auto_comment(student_df, trend), styles["Normal"]))
+    if trend_summary(trend):
+        elems.append(Paragraph(trend_summary(trend), styles["Normal"]))
+    elems.append(Spacer(1, 24))  # leave room for signature
+
+    tdf = student_df[["exam_name", "sinif", "lgs_puan", "created_at"]].copy().sort_values("created_at")
+    tdf["created_at"] = pd.to_datetime(tdf["created_at"], errors="coerce").dt.strftime("%d.%m.%Y %H:%M")
+    tdf["created_at"] = tdf["created_at"].fillna("-")
+    tdf["lgs_puan"] = tdf["lgs_puan"].apply(lambda x: "-" if pd.isna(x) else f"{x:.2f}")
+
+    table_data = [["Deneme", "Sınıf", "Puan", "Tarih"]] + tdf.values.tolist()
+    body_font = 9
+    tbl = Table(table_data, hAlign="LEFT")
+    tbl.setStyle(TableStyle([
+        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#0F2D52")),
+        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
+        ("GRID", (0,0), (-1,-1), 0.25, colors.HexColor("#9aa7b2")),
+        ("FONTNAME", (0,0), (-1,-1), font_name or "Helvetica"),
+        ("FONTSIZE", (0,0), (-1,0), 10),
+        ("FONTSIZE", (0,1), (-1,-1), body_font),
+        ("TOPPADDING", (0,0), (-1,-1), 2),
+        ("BOTTOMPADDING", (0,0), (-1,-1), 2),
+    ]))
+    elems.append(tbl)
+    elems.append(Spacer(1, 24))  # leave room for signature
+
+    # puan trend grafiği
+    score_series = student_df.sort_values("created_at")[["exam_name", "lgs_puan"]].dropna()
+    if not score_series.empty:
+        elems.append(line_chart(
+            score_series["exam_name"], score_series["lgs_puan"],
+            "Denemelere Göre Puan Gelişimi", "Deneme", "Puan", backend=chart_backend,
+        ))
+        elems.append(Spacer(1, 24))  # leave room for signature
+
+    # son deneme net grafiği
+    if nets:
+        net_df = pd.DataFrame({"Ders": list(nets.keys()), "Net": list(nets.values())}).sort_values("Net", ascending=False)
+        elems.append(bar_chart(
+            net_df["Ders"], net_df["Net"],
+            "Son Deneme Ders Bazlı Netler", "Ders", "Net", backend=chart_backend,
+        ))
+    return elems
+
+
+def _student_doc(buffer):
+    return SimpleDocTemplate(buffer, pagesize=A4, rightMargin=6, leftMargin=6, topMargin=6, bottomMargin=6)
+
+
+def build_student_pdf(
+    student_name: str,
+    kademe: int,
+    student_df: pd.DataFrame,
+    last_payload: dict = None,
+    last_nets: dict = None,
+    chart_backend: str = None,
+    trend: dict = None,
+) -> BytesIO:
+    """
+    last_nets: son denemenin ders netleri (toplu üretimde önceden hesaplanmış).
+    Verilmezse last_payload'dan, o da yoksa student_df'teki payload kolonundan hesaplanır.
+    chart_backend: "vector" / "png" (varsayılan CHART_BACKEND).
+    """
+    nets = last_nets if last_nets is not None else _last_nets(student_df, last_payload)
+    buffer = BytesIO()
+    _student_doc(buffer).build(student_story(student_name, kademe, student_df, nets, chart_backend, trend))
+    buffer.seek(0)
+    return buffer
+
+
+def build_top40_pdf(kademe: int, exam_name: str, top40_df: pd.DataFrame) -> BytesIO:
+    """
+    TEK SAYFA PDF (A4 yatay):
+    - Logo + başlık
+    - Sıkı kolon genişlikleri / küçük font
+    - Zebra satır
+    Not: Emoji/madalya kullanılmaz (yazıcı/PDF font uyumluluğu için).
+    """
+    font_name = ensure_pdf_font()
+    styles = get_pdf_styles()
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=6, leftMargin=6, topMargin=6, bottomMargin=6
+    )
+
+    elems = []
+    # Header (logo + başlık ortada, tek sayfayı koruyacak şekilde kompakt)
+    title_html = (
+        "<para align='center'>"
+        "<b>DENEME SINAVLARI</b><br/>"
+        "<b>İLK 40 SONUÇ LİSTESİ</b><br/>"
+        f"<font size='8'>{kademe}. SINIF • {exam_name}</font>"
+        "</para>"
+    )
+    title = Paragraph(title_html, styles["Normal"])
+
+    # Logo büyük ama tek sayfayı bozmayacak ölçü
+    logo = logo_image(68, 68)
+    if logo is not None:
+
+        # 2 kolon: [logo][başlık] — tablo sayfada ortalanır
+        h = Table([[logo, title]], colWidths=[75, 360], hAlign="CENTER")
+        h.setStyle(TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("LEFTPADDING", (0, 0), (-1, -1), 0),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+            ("TOPPADDING", (0, 0), (-1, -1), 0),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+        ]))
+        elems.append(h)
+    else:
+        elems.append(title)
+
+    elems.append(Spacer(1, 2))
+
+    tdf = top40_df.copy()
+
+    # Puan formatı
+    if "Puan" in tdf.columns:
+        tdf["Puan"] = tdf["Puan"].apply(lambda x: "" if pd.isna(x) else f"{float(x):.2f}")
+
+    # Ad Soyad temizliği (ekranda emoji varsa PDF'de at)
+    if "Ad Soyad" in tdf.columns:
+        tdf["Ad Soyad"] = tdf["Ad Soyad"].astype(str)
+        for bad in ["🥇", "🥈", "🥉", "🏅", "★"]:
+            tdf["Ad Soyad"] = tdf["Ad Soyad"].str.replace(bad, "", regex=False)
+        tdf["Ad Soyad"] = tdf["Ad Soyad"].str.strip()
+
+    table_data = [list(tdf.columns)] + tdf.values.tolist()
+
+    # Kolon genişlikleri (tek sayfa - sıkı)
+    # Dinamik kolon genişlikleri (tek sayfa A4 yatay)
+    content_width = A4[0] - (doc.leftMargin + doc.rightMargin)
+
+    fixed_map = {
+        "Sıra": 22,
+        "Okul No": 48,
+        "Ad Soyad": 160,   # daha dar
+        "Sınıf": 40,
+                "Ortalama": 50,
+        "Puan": 55,
+    }
+
+    # Sınav puan kolonlarını yakala (örn: "1. Sınav", "2. Sınav" ...)
+    exam_cols = [c for c in tdf.columns if re.match(r"^\d+\.\s*Sınav", str(c))]
+
+    fixed_map["Denemeler"] = 180  # (varsa)
+
+    fixed_sum = 0
+    col_widths = []
+    for col in tdf.columns:
+        if col in fixed_map:
+            w = fixed_map[col]
+        elif col in exam_cols:
+            w = None  # sonra dağıtacağız
+        else:
+            w = 55
+        col_widths.append(w)
+        if w is not None:
+            fixed_sum += w
+
+    # Sınav kolonlarına kalan alanı paylaştır
+    n_exam = sum(1 for w in col_widths if w is None)
+    remaining = max(0, content_width - fixed_sum)
+
+    if n_exam > 0:
+        # Sınav sütunları dar olsun: 20–32 aralığında tut
+        per_raw = remaining / n_exam if n_exam else 0
+        per = min(32, max(20, per_raw))
+        col_widths = [per if w is None else w for w in col_widths]
+
+    # Sütun çoksa fontu küçült
+    body_font = 6.6
+    if n_exam >= 8:
+        body_font = 6.0
+    if n_exam >= 10:
+        body_font = 5.6
+
+    # Satır yükseklikleri sabit (tek sayfa için)
+    row_heights = [15] + [13] * (len(table_data) - 1)
+
+    tbl = Table(table_data, colWidths=col_widths, rowHeights=row_heights, hAlign="CENTER")
+
+    style_cmds = [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0F2D52")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, -1), font_name or "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, 0), 7.5),       # başlık
+        ("FONTSIZE", (0, 1), (-1, -1), body_font),    # içerik
+        ("LEADING", (0, 0), (-1, 0), 9.5),
+        ("LEADING", (0, 1), (-1, -1), body_font + 1.2),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#9aa7b2")),
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("ALIGN", (0, 1), (1, -1), "CENTER"),
+        ("ALIGN", (-1, 1), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 1),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
+        ("LEFTPADDING", (0, 0), (-1, -1), 2),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 2),
+    ]
+
+    # Zebra satır
+    for r in range(1, len(table_data)):
+        bg = colors.HexColor("#F3F6FB") if r % 2 == 0 else colors.white
+        style_cmds.append(("BACKGROUND", (0, r), (-1, r), bg))
+
+    tbl.setStyle(TableStyle(style_cmds))
+    elems.append(tbl)
+
+    # --- Signature under table (right-aligned, with a little right margin) ---
+    sig1 = ParagraphStyle(
+        "sig1",
+        parent=styles["Normal"],
+        alignment=TA_RIGHT,
+        fontName=font_name or "Helvetica",
+        fontSize=9,
+        leading=9,
+        spaceBefore=0,
+        spaceAfter=0,
+        rightIndent=40,  # right edge gap (moves text left)
+    )
+    sig2 = ParagraphStyle(
+        "sig2",
+        parent=styles["Normal"],
+        alignment=TA_RIGHT,
+        fontName=font_name or "Helvetica",
+        fontSize=8.5,
+        leading=8.5,
+        spaceBefore=0,
+        spaceAfter=0,
+        rightIndent=40,  # right edge gap (moves text left),
+    )
+
+    elems.append(Spacer(1, 24))  # leave room for signature
+    elems.append(Paragraph("<b>Mehmet ARICIOĞLU</b>", sig1))
+    elems.append(Paragraph("Psikolojik Danışman / Rehber Öğretmen", sig2))
+
+    doc.build(elems)
+
+    buffer.seek(0)
+    return buffer
+
+
+# --------------------
+# DERS ANALİZİ (ısı haritası)
+# --------------------
+HEAT_LOW, HEAT_MID, HEAT_HIGH = (0xF8, 0x69, 0x6B), (0xFF, 0xEB, 0x84), (0x63, 0xBE, 0x7B)  # Excel'in 3 renk ölçeği
+
+
+def heat_color(v: float, lo: float, hi: float) -> str:
+    """lo..hi aralığında kırmızı → sarı → yeşil (hex, '#' olmadan); değer yoksa beyaz."""
+    if pd.isna(v):
+        return "FFFFFF"
+    t = 0.5 if hi <= lo else min(1.0, max(0.0, (v - lo) / (hi - lo)))
+    a, b, t = (HEAT_LOW, HEAT_MID, t * 2) if t < 0.5 else (HEAT_MID, HEAT_HIGH, (t - 0.5) * 2)
+    return "".join(f"{round(x + (y - x) * t):02X}" for x, y in zip(a, b))
+
+
+def heat_colors(matrix: pd.DataFrame, axis=0) -> list:
+    """Hücre renkleri (satır listeleri). axis=0: her kolon kendi aralığında, None: tüm tablo."""
+    vals = matrix.astype("float64")
+    lo = vals.min() if axis == 0 else pd.Series(vals.min().min(), index=vals.columns)
+    hi = vals.max() if axis == 0 else pd.Series(vals.max().max(), index=vals.columns)
+    return [[heat_color(v, lo[c], hi[c]) for c, v in row.items()] for _, row in vals.iterrows()]
+
+
+def build_subject_heatmap_pdf(kademe: int, title: str, matrix: pd.DataFrame, axis=0) -> BytesIO:
+    """
+    Sınıf × ders (ya da sınıf × deneme) ortalama net tablosu, hücreler ısı haritası
+    renginde (A4 yatay, tek sayfa). matrix: analytics.subject_matrix çıktısı.
+    """
+    font_name = ensure_pdf_font() or "Helvetica"
+    styles = get_pdf_styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), rightMargin=18, leftMargin=18, topMargin=18, bottomMargin=18)
+
+    elems = [Paragraph(f"<b>Ders Analizi • {kademe}. Sınıf</b><br/><font size='9'>{title}</font>", styles["Title"])]
+    head = ParagraphStyle("heat_head", parent=styles["Normal"], fontName=font_name, fontSize=7, leading=8,
+                          textColor=colors.white, alignment=1)
+    table_data = [[Paragraph("Sınıf", head)] + [Paragraph(str(c), head) for c in matrix.columns]]
+    for sinif, row in matrix.iterrows():
+        table_data.append([str(sinif)] + ["" if pd.isna(v) else f"{v:.2f}" for v in row])
+
+    width = landscape(A4)[0] - doc.leftMargin - doc.rightMargin
+    first = 50
+    per = min(90, (width - first) / max(1, len(matrix.columns)))
+    tbl = Table(table_data, colWidths=[first] + [per] * len(matrix.columns), repeatRows=1, hAlign="CENTER")
+    cmds = [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0F2D52")),
+        ("FONTNAME", (0, 0), (-1, -1), font_name),
+        ("FONTSIZE", (0, 1), (-1, -1), 8),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#9aa7b2")),
+        ("ALIGN", (0, 1), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    ]
+    for r, row in enumerate(heat_colors(matrix, axis), start=1):
+        for c, hexcolor in enumerate(row, start=1):
+            cmds.append(("BACKGROUND", (c, r), (c, r), colors.HexColor(f"#{hexcolor}")))
+    tbl.setStyle(TableStyle(cmds))
+    elems += [Spacer(1, 8), tbl, Spacer(1, 6)]
+    scale = "her ders kendi içinde" if axis == 0 else "tüm tablo birlikte"
+    elems.append(Paragraph(f"<font size='7'>Renk ölçeği {scale}: kırmızı düşük, yeşil yüksek ortalama net.</font>", styles["Normal"]))
+    doc.build(elems)
+    buffer.seek(0)
+    return buffer
+
+
+# --------------------
+# TOPLU ÖĞRENCİ RAPORLARI
+# --------------------
+def safe_name(text) -> str:
+    name = re.sub(r'[\\/:*?"<>|]+', "_", str(text)).strip()
+    return name or "rapor"
+
+
+def report_file_name(job: dict) -> str:
+    """
+    Zip içindeki yol: sınıf klasörü / öğrenci adı_okul no. Okul no'suz öğrencinin
+    anahtarı zaten ad + sınıftır (analytics.student_key), adı sınıfında tektir.
+    """
+    key = str(job.get("ogr_key") or "")
+    suffix = f"_{key}" if key.isdigit() else ""
+    return f"{safe_name(job.get('sinif') or '-')}/{safe_name(job['name'])}{suffix}_rapor.pdf"
+
+
+def _init_worker():
+    # Font, stiller ve logo işçi başına bir kez
+    ensure_pdf_font()
+    get_pdf_styles()
+    get_logo_bytes()
+
+
+def _render_job(job: dict):
+    buf = build_student_pdf(
+        job["name"], job["kademe"], job["df"],
+        last_nets=job.get("nets") or {}, chart_backend=job.get("chart_backend"), trend=job.get("trend"),
+    )
+    return report_file_name(job), buf.getvalue()
+
+
+def _render_all(jobs: list, write, max_workers=None, on_done=None) -> list:
+    """
+    Her öğrenci için bir PDF süreç havuzunda üretilir; biten her dosya ana süreçte
+    write(yol, baytlar) ile yazılır. Dönüş: [(öğrenci, hata)].
+    """
+    errors = []
+
+    def _write(done, job, fn):
+        try:
+            write(*fn())
+        except Exception as e:
+            errors.append((job["name"], f"{type(e).__name__}: {e}"))
+        if on_done:
+            on_done(done, len(jobs), job["name"])
+
+    workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        for i, job in enumerate(jobs, start=1):
+            _write(i, job, lambda job=job: _render_job(job))
+    else:
+        # spawn: Streamlit sunucusunun thread'leri fork ile kopyalanmasın
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+            futures = {pool.submit(_render_job, job): job for job in jobs}
+            for done, fut in enumerate(as_completed(futures), start=1):
+                _write(done, futures[fut], fut.result)
+    return errors
+
+
+def build_reports_zip(jobs, max_workers=None, on_done=None) -> tuple:
+    """
+    jobs: {"name", "kademe", "sinif", "ogr_key", "df", "nets", "trend"} sözlükleri (nets: son
+    deneme ders netleri, trend: cohort_trends satırı; ikisi de çağıran tarafından bir
+    kez hesaplanır). Her öğrenci için bir PDF süreç havuzunda üretilir ve bittikçe
+    zip'e yazılır. Dönüş: (zip baytları, [(öğrenci, hata)]). on_done(bitti, toplam, öğrenci)
+    ana süreçte çağrılır.
+    """
+    out = BytesIO()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        errors = _render_all(list(jobs), zf.writestr, max_workers, on_done)
+    return out.getvalue(), errors
+
+
+def write_reports(jobs, out_dir: str, max_workers=None, on_done=None) -> tuple:
+    """
+    build_reports_zip gibi; PDF'ler zip yerine out_dir altına (sınıf klasörü /
+    öğrenci adı, report_file_name) yazılır. Dönüş: ([yazılan dosyalar], [(öğrenci, hata)]).
+    """
+    paths = []
+
+    def _write(name, data):
+        path = os.path.join(out_dir, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+
+    errors = _render_all(list(jobs), _write, max_workers, on_done)
+    return paths, errors
+
+
+def build_merged_student_pdf(jobs, on_done=None) -> bytes:
+    """
+    Tüm öğrenciler tek PDF'te (her öğrenci yeni sayfadan). ReportLab tek belgeyi
+    tek süreçte kurar; bu yüzden bu mod sıralı çalışır.
+    """
+    jobs = list(jobs)
+    elems = []
+    for i, job in enumerate(jobs, start=1):
+        if elems:
+            elems.append(PageBreak())
+        elems.extend(student_story(
+            job["name"], job["kademe"], job["df"], job.get("nets") or {}, job.get("chart_backend"), job.get("trend")
+        ))
+        if on_done:
+            on_done(i, len(jobs), job["name"])
+    buffer = BytesIO()
+    _student_doc(buffer).build(elems)
+    return buffer.getvalue()
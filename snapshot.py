@@ -0,0 +1,120 @@
+"""
+Sonuç tablosunun diskteki sütunlu kopyası (Arrow IPC / Feather v2, sıkıştırmasız).
+
+- exam_name / sinif kategorik (sözlük kodlu), kademe int8, ogr_no Int32 (boş olabilir),
+  lgs_puan float32; created_at bir kez datetime'a çevrilir (updated_at senkronizasyon
+  işareti olarak metin kalır).
+- ogr_key (kalıcı öğrenci anahtarı) kayıtta yazılır; anahtarsız eski satırlarda
+  okurken aynı kuralla doldurulur.
+- payload saklanmaz (panel netleri deneme başına ayrıca indirir). Toplu raporlarda
+  (pipeline.load_kademe) netler "net:<ders>" float32 kolonlarına açılır (deneme o
+  dersi içermiyorsa NaN); compact bu kolonları da daraltır.
+- Dosya memory-map ile açılır; sayısal kolonlar kopyalanmadan okunur.
+- Senkronizasyon işaretleri (watermark, kaynak) şema metadatasında tutulur.
+
+Yazma atomiktir (geçici dosya + os.replace): yarım kalan yazım eski kopyayı bozmaz.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from analytics import nets_matrix, student_key, text_or_empty
+
+SNAPSHOT_VERSION = "5"
+NET_PREFIX = "net:"
+CATEGORY_COLUMNS = ("exam_name", "sinif")
+NUMERIC_DTYPES = {"ogr_no": "Int32", "lgs_puan": "float32"}
+DATETIME_COLUMNS = ("created_at",)
+
+
+def net_columns(df: pd.DataFrame) -> list:
+    return [c for c in df.columns if str(c).startswith(NET_PREFIX)]
+
+
+def flatten_nets(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    payload kolonunu "net:<ders>" kolonlarına açar ve payload'ı düşer. Netler deneme
+    bazında hesaplanır: bir denemede olmayan ders o denemenin satırlarında NaN kalır.
+    """
+    if "payload" not in df.columns:
+        return df
+    base = df.drop(columns=["payload"])
+    if df.empty:
+        return base
+    parts = []
+    for _, g in df.groupby("exam_name", sort=False, dropna=False):
+        parts.append(nets_matrix(g["payload"].map(lambda p: p if isinstance(p, dict) else {}), index=g.index))
+    nets = pd.concat(parts).reindex(base.index)
+    nets.columns = [f"{NET_PREFIX}{c}" for c in nets.columns]
+    return pd.concat([base, nets.astype("float32")], axis=1)
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sonuç satırlarını dar tiplere çevirir. Sunucu yanıtına da, birleştirme sonrası
+    (kategoriler object'e dönebilir) yerel kopyaya da uygulanır; zaten dar olan kolon
+    yeniden kopyalanmaz.
+    """
+    out = df.copy(deep=False)
+    for c in CATEGORY_COLUMNS:
+        if c in out.columns:
+            # Filtrelenmiş dilimde kullanılmayan kategoriler atılır
+            out[c] = out[c].astype("category").cat.remove_unused_categories()
+    if "kademe" in out.columns:
+        k = pd.to_numeric(out["kademe"], errors="coerce")
+        out["kademe"] = k.astype("int8" if k.notna().all() else "Int8")
+    for c, dtype in NUMERIC_DTYPES.items():
+        if c in out.columns and out[c].dtype != dtype:
+            out[c] = pd.to_numeric(out[c], errors="coerce").astype(dtype)
+    for c in DATETIME_COLUMNS:
+        if c in out.columns and not pd.api.types.is_datetime64_any_dtype(out[c]):
+            out[c] = pd.to_datetime(out[c], utc=True, errors="coerce", format="ISO8601")
+    if {"ogr_no", "ad_soyad", "sinif"} <= set(out.columns):
+        # Boşluk dönüşümden önce maskelenir: pandas 2.x'te astype(str) None'ı "None" yapar
+        key = out["ogr_key"] if "ogr_key" in out.columns else pd.Series(None, index=out.index, dtype=object)
+        miss = key.isna()
+        key = text_or_empty(key)
+        if miss.any():
+            m = out[miss]
+            key = key.where(~miss, student_key(m["ogr_no"], m["ad_soyad"], m["sinif"]))
+        out["ogr_key"] = key
+    for c in net_columns(out):
+        out[c] = out[c].astype("float32")
+    return out
+
+
+def write_snapshot(path: str, df: pd.DataFrame, meta: dict) -> None:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(compact(df), preserve_index=False)
+    info = dict(meta, version=SNAPSHOT_VERSION)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"lgs_snapshot": json.dumps(info, default=str).encode(),
+    })
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: str):
+    """Dönüş: (df, meta) ya da dosya yok / okunamıyor / sürüm farklıysa None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        # Kapatılmaz: sıfır kopya okunan kolonlar eşlemeye referans verir
+        table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+        info = json.loads((table.schema.metadata or {}).get(b"lgs_snapshot", b"{}"))
+        if info.get("version") != SNAPSHOT_VERSION:
+            return None
+        df = table.to_pandas(split_blocks=True)
+    except (OSError, pa.ArrowInvalid, ValueError):
+        return None
+    for c in net_columns(df):
+        df[c] = df[c].astype(np.float32, copy=False)
+    return df, info
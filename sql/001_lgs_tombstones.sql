@@ -0,0 +1,28 @@
+-- Delta senkronizasyonu (app.py, ResultsSnapshot) için tombstone tablosu.
+-- save_exam_to_supabase bir denemeyi silmeden önce buraya satır ekler;
+-- istemci deleted_at'tan eski satırları yerel kopyasından düşer.
+
+create table if not exists public.lgs_tombstones (
+    id          bigserial primary key,
+    exam_name   text        not null,
+    deleted_at  timestamptz not null default now()
+);
+
+create index if not exists lgs_tombstones_deleted_at_idx
+    on public.lgs_tombstones (deleted_at);
+
+-- created_at sıralı sorgular (deneme sırası, öğrenci geçmişi). Delta sorgusu 003'ten
+-- beri updated_at > watermark - gecikme kullanır (lgs_results_updated_at_idx).
+create index if not exists lgs_results_created_at_idx
+    on public.lgs_results (created_at);
+
+-- lgs_results ile aynı erişim (anon key)
+alter table public.lgs_tombstones enable row level security;
+
+drop policy if exists "anon read tombstones" on public.lgs_tombstones;
+create policy "anon read tombstones" on public.lgs_tombstones
+    for select to anon using (true);
+
+drop policy if exists "anon insert tombstones" on public.lgs_tombstones;
+create policy "anon insert tombstones" on public.lgs_tombstones
+    for insert to anon with check (true);
@@ -0,0 +1,18 @@
+-- Analiz Paneli açılır listeleri için küçük özet görünüm (fetch_exam_index).
+-- Her (kademe, deneme, sınıf) için tek satır: öğrenci sayısı ve ilk kayıt zamanı.
+
+create or replace view public.lgs_exam_index as
+select
+    kademe,
+    exam_name,
+    sinif,
+    count(*)        as n,
+    min(created_at) as created_at
+from public.lgs_results
+group by kademe, exam_name, sinif;
+
+grant select on public.lgs_exam_index to anon;
+
+-- fetch_results: kademe / deneme / sınıf filtreleri
+create index if not exists lgs_results_kademe_exam_sinif_idx
+    on public.lgs_results (kademe, exam_name, sinif);
@@ -0,0 +1,45 @@
+-- save_exam_to_supabase: (exam_name, ogr_no) anahtarıyla upsert ve fark tabanlı kayıt.
+-- Delta senkronizasyonu artık created_at yerine updated_at'i izler.
+
+-- 1) İçerik özeti (değişmeyen satırlar gönderilmez)
+alter table public.lgs_results add column if not exists content_hash text;
+
+-- 2) updated_at: eklemede now(), her güncellemede tetikleyiciyle now()
+alter table public.lgs_results add column if not exists updated_at timestamptz;
+update public.lgs_results set updated_at = created_at where updated_at is null;
+alter table public.lgs_results alter column updated_at set default now();
+alter table public.lgs_results alter column updated_at set not null;
+
+create or replace function public.lgs_results_touch_updated_at()
+returns trigger language plpgsql as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists lgs_results_touch_updated_at on public.lgs_results;
+create trigger lgs_results_touch_updated_at
+    before update on public.lgs_results
+    for each row execute function public.lgs_results_touch_updated_at();
+
+create index if not exists lgs_results_updated_at_idx
+    on public.lgs_results (updated_at);
+
+-- 3) Upsert anahtarı. Eski sil-ekle akışından kalmış olası kopyalar önce temizlenir.
+delete from public.lgs_results a
+using public.lgs_results b
+where a.exam_name = b.exam_name
+  and a.ogr_no = b.ogr_no
+  and a.ctid < b.ctid;
+
+create unique index if not exists lgs_results_exam_ogr_no_key
+    on public.lgs_results (exam_name, ogr_no);
+
+-- 4) Tek satır tombstone'ları (ogr_no boş = denemenin tamamı)
+alter table public.lgs_tombstones add column if not exists ogr_no bigint;
+
+-- Upsert için anon'un update yetkisi (lgs_results politikalarına ek)
+drop policy if exists "anon update results" on public.lgs_results;
+create policy "anon update results" on public.lgs_results
+    for update to anon using (true) with check (true);
@@ -0,0 +1,26 @@
+-- Deneme × kademe × sınıf özeti; save_exam_to_supabase her kayıtta yeniden yazar.
+-- sinif = '*' satırı kademenin tüm sınıflarını kapsar (yüzdelikler için).
+-- Analiz Paneli tek deneme seçiliyken KPI'ları ve İlk 40'ı buradan okur.
+
+create table if not exists public.lgs_exam_summary (
+    exam_name   text        not null,
+    kademe      int         not null,
+    sinif       text        not null,
+    n           int         not null,   -- öğrenci (ad_soyad tekil)
+    n_puan      int         not null,   -- puanı olan satır
+    mean        double precision,
+    max         double precision,
+    p25         double precision,
+    p50         double precision,
+    p75         double precision,
+    p90         double precision,
+    top         jsonb       not null default '[]'::jsonb,  -- puana göre sıralı ilk 40
+    updated_at  timestamptz not null default now(),
+    primary key (exam_name, kademe, sinif)
+);
+
+alter table public.lgs_exam_summary enable row level security;
+
+drop policy if exists "anon all summary" on public.lgs_exam_summary;
+create policy "anon all summary" on public.lgs_exam_summary
+    for all to anon using (true) with check (true);
@@ -0,0 +1,4 @@
+-- Öğrenci bazlı sorgular (payload, tombstone, öğrenci geçmişi): ogr_no ile arama.
+-- Yerel SQLite motoru (storage.py) aynı indeksleri kendi şemasında oluşturur.
+create index if not exists lgs_results_ogr_no_idx
+    on public.lgs_results (ogr_no);
@@ -0,0 +1,16 @@
+-- Kalıcı öğrenci anahtarı (analytics.student_key): okul no; yoksa "AD SOYAD | sınıf"
+-- (Türkçe büyük harf: i -> İ, ı -> I; tek boşluk). Kayıtta uygulama yazar.
+alter table public.lgs_results add column if not exists ogr_key text;
+
+-- Eski satırlar: uygulamadaki kuralın aynısı
+update public.lgs_results
+set ogr_key = case
+    when ogr_no is not null then ogr_no::text
+    else upper(regexp_replace(btrim(translate(coalesce(ad_soyad, ''), 'iı', 'İI')), '\s+', ' ', 'g'))
+         || ' | ' || btrim(coalesce(sinif, ''))
+end
+where ogr_key is null;
+
+-- Öğrenci geçmişi: kademe + anahtar ile doğrudan arama
+create index if not exists lgs_results_kademe_ogr_key_idx
+    on public.lgs_results (kademe, ogr_key);
@@ -0,0 +1,355 @@
+"""
+Depolama motorları.
+
+Uygulama veriye supabase-py'nin sorgu kurucusu üzerinden erişir
+(table().select().eq()...execute()). open_storage bu arayüzü sağlayan bir motor döndürür:
+
+- "supabase": uzak PostgREST (varsayılan)
+- "sqlite": yerel, gömülü SQLite dosyası. Servis duraklatıldığında ya da internet
+  yokken çevrimdışı çalışmak ve testler için kullanılır. Şema sql/ altındaki
+  tablolarla aynıdır; (kademe, exam_name, sinif), (ogr_no) ve (kademe, ogr_key) indekslidir.
+
+SQLiteStore, uygulamanın kullandığı alt kümeyi destekler:
+select(count="exact", head=True), eq/neq/gt/gte/lt/lte/in_/is_("null"), not_,
+order, range, limit, insert, upsert(on_conflict=...), delete.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+BACKENDS = ("supabase", "sqlite")
+DEFAULT_SQLITE_PATH = "data/akademik.sqlite"
+
+SQLITE_SCHEMA = """
+create table if not exists lgs_results (
+    id integer primary key autoincrement,
+    exam_name text not null,
+    exam_date text,
+    kademe integer,
+    ogr_no integer,
+    ad_soyad text,
+    sinif text,
+    ogr_key text,
+    lgs_puan real,
+    payload text,
+    content_hash text,
+    created_at text not null,
+    updated_at text not null
+);
+create unique index if not exists lgs_results_exam_ogr_uidx on lgs_results (exam_name, ogr_no);
+create index if not exists lgs_results_kademe_exam_sinif_idx on lgs_results (kademe, exam_name, sinif);
+create index if not exists lgs_results_ogr_no_idx on lgs_results (ogr_no);
+create index if not exists lgs_results_kademe_ogr_key_idx on lgs_results (kademe, ogr_key);
+create index if not exists lgs_results_updated_at_idx on lgs_results (updated_at);
+
+create table if not exists lgs_tombstones (
+    id integer primary key autoincrement,
+    exam_name text not null,
+    ogr_no integer,
+    deleted_at text not null
+);
+create index if not exists lgs_tombstones_deleted_at_idx on lgs_tombstones (deleted_at);
+
+create table if not exists lgs_exam_summary (
+    exam_name text not null,
+    kademe integer not null,
+    sinif text not null,
+    n integer,
+    n_puan integer,
+    mean real,
+    max real,
+    p25 real,
+    p50 real,
+    p75 real,
+    p90 real,
+    top text,
+    updated_at text not null,
+    primary key (exam_name, kademe, sinif)
+);
+
+create view if not exists lgs_exam_index as
+    select kademe, exam_name, sinif, count(*) as n, min(created_at) as created_at
+    from lgs_results
+    group by kademe, exam_name, sinif;
+"""
+
+JSON_COLUMNS = frozenset(["payload", "top"])
+# Şemaya sonradan eklenen kolonlar: eski dosyalarda "alter table" ile açılır
+ADDED_COLUMNS = {"lgs_results": [("ogr_key", "text")]}
+TIMESTAMP_COLUMNS = ("created_at", "updated_at", "deleted_at")
+
+
+def open_storage(backend: str = "supabase", url: str = None, key: str = None, path: str = None):
+    """backend: "supabase" (url, key) ya da "sqlite" (path)."""
+    if backend == "supabase":
+        from supabase import create_client
+
+        return create_client(url, key)
+    if backend == "sqlite":
+        return SQLiteStore(path or DEFAULT_SQLITE_PATH)
+    raise ValueError(f"Bilinmeyen depolama motoru: {backend!r} (seçenekler: {', '.join(BACKENDS)})")
+
+
+def _q(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class _Result:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class SQLiteStore:
+    """
+    Tek bağlantı + kilit: ":memory:" veritabanı da thread'ler arasında paylaşılır.
+    Zaman damgaları (created_at / updated_at / deleted_at) Python'da, mikro saniyeli ve
+    kesin artan üretilir. Damga yazmayla aynı kilit içinde alınır: eşzamanlı upsert'lerde
+    updated_at sırası commit sırasıyla aynıdır, updated_at > watermark delta
+    senkronizasyonu kayıp vermez.
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.conn.execute("pragma journal_mode=wal")
+        self._columns = {}
+        self._last_ts = None
+        self._migrate()
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def table(self, name: str) -> "_Query":
+        return _Query(self, name)
+
+    from_ = table
+
+    def _migrate(self):
+        for table, cols in ADDED_COLUMNS.items():
+            have = [r["name"] for r in self.conn.execute(f"pragma table_info({_q(table)})").fetchall()]
+            for col, typ in cols:
+                if have and col not in have:
+                    self.conn.execute(f"alter table {_q(table)} add column {_q(col)} {typ}")
+        self._backfill_ogr_key()
+
+    def _backfill_ogr_key(self):
+        # sql/006 ile aynı: anahtarsız eski satırlara analytics.student_key yazılır; updated_at
+        # (Postgres'teki tetikleyici gibi) ilerler, yerel kopyalar delta ile anahtarı alır
+        have = [r["name"] for r in self.conn.execute("pragma table_info(lgs_results)").fetchall()]
+        if "ogr_key" not in have:
+            return
+        rows = self.conn.execute(
+            "select id, ogr_no, ad_soyad, sinif from lgs_results where ogr_key is null"
+        ).fetchall()
+        if not rows:
+            return
+        import pandas as pd
+
+        from analytics import student_key
+
+        df = pd.DataFrame([dict(r) for r in rows], columns=["id", "ogr_no", "ad_soyad", "sinif"])
+        keys = student_key(df["ogr_no"], df["ad_soyad"], df["sinif"])
+        now = self.now()
+        self.conn.execute("begin")
+        try:
+            self.conn.executemany(
+                "update lgs_results set ogr_key = ?, updated_at = ? where id = ?",
+                [(k, now, i) for k, i in zip(keys.tolist(), df["id"].tolist())],
+            )
+            self.conn.execute("commit")
+        except Exception:
+            self.conn.execute("rollback")
+            raise
+
+    def columns(self, name: str) -> list:
+        if name not in self._columns:
+            rows = self.conn.execute(f"pragma table_info({_q(name)})").fetchall()
+            self._columns[name] = [r["name"] for r in rows]
+        return self._columns[name]
+
+    def now(self) -> str:
+        # Çağıran yazmayı da aynı kilit altında yapmalı (bkz. _Query._write)
+        with self.lock:
+            ts = datetime.now(timezone.utc)
+            if self._last_ts is not None and ts <= self._last_ts:
+                ts = self._last_ts + timedelta(microseconds=1)
+            self._last_ts = ts
+        return ts.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+    def run(self, sql: str, params=(), many: bool = False) -> list:
+        with self.lock:
+            if many:
+                self.conn.execute("begin")
+                try:
+                    self.conn.executemany(sql, params)
+                    self.conn.execute("commit")
+                except Exception:
+                    self.conn.execute("rollback")
+                    raise
+                return []
+            return self.conn.execute(sql, params).fetchall()
+
+
+class _Query:
+    def __init__(self, store: SQLiteStore, name: str):
+        self.store = store
+        self.name = name
+        self.op = "select"
+        self.cols = "*"
+        self.count = None
+        self.head = False
+        self.filters = []
+        self.orders = []
+        self.offset = None
+        self.limit_n = None
+        self.rows = None
+        self.on_conflict = None
+        self._negate = False
+
+    # --- okuma ---
+    def select(self, columns: str = "*", count: str = None, head: bool = False):
+        self.cols = columns
+        self.count = count
+        self.head = head
+        return self
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def _filter(self, sql: str, params: list):
+        if self._negate:
+            sql = f"not ({sql})"
+            self._negate = False
+        self.filters.append((sql, params))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(f"{_q(column)} = ?", [value])
+
+    def neq(self, column, value):
+        return self._filter(f"{_q(column)} <> ?", [value])
+
+    def gt(self, column, value):
+        return self._filter(f"{_q(column)} > ?", [value])
+
+    def gte(self, column, value):
+        return self._filter(f"{_q(column)} >= ?", [value])
+
+    def lt(self, column, value):
+        return self._filter(f"{_q(column)} < ?", [value])
+
+    def lte(self, column, value):
+        return self._filter(f"{_q(column)} <= ?", [value])
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(f"{_q(column)} in ({','.join('?' * len(values))})", values)
+
+    def is_(self, column, value):
+        if value not in (None, "null"):
+            raise ValueError("SQLiteStore.is_ sadece null destekler")
+        return self._filter(f"{_q(column)} is null", [])
+
+    def order(self, column, desc: bool = False):
+        # PostgREST varsayılanı: artan sırada null'lar sonda, azalanda başta
+        self.orders.append(f"{_q(column)} {'desc nulls first' if desc else 'asc nulls last'}")
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset, self.limit_n = start, end - start + 1
+        return self
+
+    def limit(self, n: int):
+        self.limit_n = n
+        return self
+
+    # --- yazma ---
+    def insert(self, rows):
+        self.op, self.rows = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict: str = None, **_):
+        self.op, self.rows = "upsert", rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def _where(self):
+        if not self.filters:
+            return "", []
+        params = [p for _, ps in self.filters for p in ps]
+        return " where " + " and ".join(f"({s})" for s, _ in self.filters), params
+
+    @staticmethod
+    def _decode(row) -> dict:
+        out = dict(row)
+        for c in JSON_COLUMNS.intersection(out):
+            if isinstance(out[c], str):
+                out[c] = json.loads(out[c])
+        return out
+
+    def _write(self):
+        if not self.rows:
+            return _Result([])
+        table_cols = self.store.columns(self.name)
+        cols = list(dict.fromkeys(c for r in self.rows for c in r))
+        stamps = [c for c in TIMESTAMP_COLUMNS if c in table_cols and c not in cols]
+        all_cols = cols + stamps
+
+        def value(r, c):
+            v = r.get(c)
+            return json.dumps(v, ensure_ascii=False) if c in JSON_COLUMNS and v is not None else v
+
+        values = [[value(r, c) for c in cols] for r in self.rows]
+        sql = (
+            f"insert into {_q(self.name)} ({','.join(_q(c) for c in all_cols)}) "
+            f"values ({','.join('?' * len(all_cols))})"
+        )
+        if self.op == "upsert" and self.on_conflict:
+            keys = [k.strip() for k in self.on_conflict.split(",")]
+            # created_at eklemede bir kez yazılır; updated_at her güncellemede yenilenir
+            update = [c for c in all_cols if c not in keys and c != "created_at"]
+            sql += f" on conflict ({','.join(_q(k) for k in keys)}) do update set " + ",".join(
+                f"{_q(c)} = excluded.{_q(c)}" for c in update
+            )
+        # Damga kilidin içinde: eşzamanlı yazmalarda updated_at sırası = commit sırası
+        with self.store.lock:
+            now = self.store.now()
+            self.store.run(sql, [v + [now] * len(stamps) for v in values], many=True)
+        return _Result([])
+
+    def execute(self) -> _Result:
+        if self.op in ("insert", "upsert"):
+            return self._write()
+
+        where, params = self._where()
+        if self.op == "delete":
+            rows = self.store.run(f"delete from {_q(self.name)}{where} returning *", params)
+            return _Result([self._decode(r) for r in rows])
+
+        count = None
+        if self.count:
+            count = self.store.run(f"select count(*) from {_q(self.name)}{where}", params)[0][0]
+        if self.head:
+            return _Result([], count)
+
+        cols = "*" if self.cols.strip() == "*" else ",".join(_q(c.strip()) for c in self.cols.split(","))
+        sql = f"select {cols} from {_q(self.name)}{where}"
+        if self.orders:
+            sql += " order by " + ", ".join(self.orders)
+        if self.limit_n is not None:
+            sql += f" limit {int(self.limit_n)}"
+            if self.offset:
+                sql += f" offset {int(self.offset)}"
+        return _Result([self._decode(r) for r in self.store.run(sql, params)], count)
@@ -0,0 +1,160 @@
+"""
+Uçtan uca performans ölçümü: ingest → kayıt → analiz → rapor.
+
+tools/synth.py ile bellekte sentetik okul raporları üretilir; kayıt ve okuma
+Supabase yerine bellek içi SQLiteStore (storage.py) üzerinden yapılır, yani ağ
+gerekmez ve sonuçlar makineden makineye karşılaştırılabilir.
+
+Aşamalar:
+    parse           ingest.read_school_report (dosya başına)
+    build_rows      ingest.build_exam_rows (deneme başına)
+    summarize       analytics.summarize_exam (deneme başına)
+    store_upsert    SQLiteStore upsert (deneme başına)
+    store_load      pipeline.load_kademe: sayfalı okuma + netlerin açılması (kademe başına)
+    top40           pipeline.exam_top40, panelle aynı nlargest yolu (deneme başına)
+    all_exams       analytics.rank_all_exams (kademe başına)
+    student_jobs    pipeline.student_jobs: geçmiş, netler, kohort eğilimi (kademe başına)
+    payload_to_nets analytics.payload_to_nets (satır başına)
+    nets_matrix     analytics.nets_matrix (deneme başına)
+    student_pdf     reports.build_student_pdf, vektör ve PNG grafik (rapor başına)
+    top40_pdf       reports.build_top40_pdf (deneme başına)
+
+Kullanım (depo kökünden):
+    python tools/benchmark.py
+    python tools/benchmark.py --students 300 --exams 12 --kademeler 5,6,7,8 --json sonuc.json
+    python tools/benchmark.py --baseline sonuc.json   # %20'den yavaşlayan aşama varsa çıkış kodu 1
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from io import BytesIO
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TOOLS_DIR))
+sys.path.insert(0, TOOLS_DIR)
+
+from analytics import nets_matrix, payload_to_nets, rank_all_exams, summarize_exam  # noqa: E402
+from ingest import build_exam_rows, read_school_report  # noqa: E402
+from pipeline import exam_order, exam_top40, load_kademe, student_jobs  # noqa: E402
+from reports import build_student_pdf, build_top40_pdf  # noqa: E402
+from storage import SQLiteStore  # noqa: E402
+from synth import LGS_SUBJECTS, make_cohort, write_school_report  # noqa: E402
+
+
+class Timer:
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage: str, seconds: float, n: int = 1):
+        total, count = self.stages.get(stage, (0.0, 0))
+        self.stages[stage] = (total + seconds, count + n)
+
+    def run(self, stage: str, fn, *args, n: int = 1, **kwargs):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        self.add(stage, time.perf_counter() - t0, n)
+        return out
+
+    def rows(self) -> list:
+        return [
+            {"stage": s, "n": n, "total_ms": 1000 * t, "per_op_ms": 1000 * t / max(n, 1)}
+            for s, (t, n) in self.stages.items()
+        ]
+
+
+def make_files(students: int, classes: int, exams: int, kademeler, seed: int) -> list:
+    files = []
+    for k in kademeler:
+        cohort = make_cohort(k, students, classes, seed)
+        for e in range(exams):
+            buf = BytesIO()
+            write_school_report(buf, cohort, f"{k}. Sınıf LGS Deneme {e + 1}", e, LGS_SUBJECTS, seed=seed)
+            files.append(buf.getvalue())
+    return files
+
+
+def run(args) -> Timer:
+    timer = Timer()
+    kademeler = [int(k) for k in args.kademeler.split(",") if k.strip()]
+    files = make_files(args.students, args.classes, args.exams, kademeler, args.seed)
+    store = SQLiteStore(":memory:")
+
+    exams, payloads = [], {}
+    for data in files:
+        df, exam_name = timer.run("parse", read_school_report, BytesIO(data))
+        rows = timer.run("build_rows", build_exam_rows, df, exam_name, n=1)
+        timer.run("summarize", summarize_exam, df, exam_name)
+        timer.run("store_upsert", lambda: store.table("lgs_results").upsert(rows, on_conflict="exam_name,ogr_no").execute())
+        payloads[exam_name] = [r["payload"] for r in rows]
+        exams.append(exam_name)
+
+    for exam_name, pls in payloads.items():
+        timer.run("payload_to_nets", lambda: [payload_to_nets(p) for p in pls], n=len(pls))
+        timer.run("nets_matrix", nets_matrix, pls)
+
+    for k in kademeler:
+        kdf = timer.run("store_load", load_kademe, store, k)
+        order = exam_order(kdf)
+        for exam_name in order:
+            show = timer.run("top40", exam_top40, kdf[kdf["exam_name"] == exam_name])
+            timer.run("top40_pdf", build_top40_pdf, k, exam_name, show)
+        timer.run("all_exams", rank_all_exams, kdf, order)
+
+        # CLI / toplu rapor yolu: işler pipeline.student_jobs'tan, PDF reports._render_job gibi
+        jobs = timer.run("student_jobs", student_jobs, kdf, k, order)
+        for job in jobs[: args.reports]:
+            for backend in ("vector", "png")[: 2 if args.png else 1]:
+                timer.run(
+                    f"student_pdf[{backend}]", build_student_pdf, job["name"], job["kademe"], job["df"],
+                    last_nets=job["nets"], chart_backend=backend, trend=job["trend"],
+                )
+    return timer
+
+
+def compare(rows: list, baseline_path: str, threshold: float) -> bool:
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {r["stage"]: r for r in json.load(f)["stages"]}
+    ok = True
+    print(f"\n{'aşama':22} {'önce ms/op':>11} {'şimdi ms/op':>12} {'oran':>6}")
+    for r in rows:
+        b = base.get(r["stage"])
+        if not b:
+            continue
+        ratio = r["per_op_ms"] / b["per_op_ms"] if b["per_op_ms"] else float("inf")
+        flag = "  YAVAŞ" if ratio > threshold else ""
+        ok &= ratio <= threshold
+        print(f"{r['stage']:22} {b['per_op_ms']:11.3f} {r['per_op_ms']:12.3f} {ratio:6.2f}{flag}")
+    return ok
+
+
+def main(argv):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--students", type=int, default=120, help="kademe başına öğrenci")
+    ap.add_argument("--classes", type=int, default=4)
+    ap.add_argument("--exams", type=int, default=6, help="kademe başına deneme")
+    ap.add_argument("--kademeler", default="7,8")
+    ap.add_argument("--reports", type=int, default=10, help="kademe başına öğrenci PDF'i")
+    ap.add_argument("--no-png", dest="png", action="store_false", help="PNG grafikli PDF'i ölçme")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="sonuçları bu dosyaya yaz")
+    ap.add_argument("--baseline", help="önceki --json çıktısı ile karşılaştır")
+    ap.add_argument("--threshold", type=float, default=1.2, help="yavaşlama eşiği (oran)")
+    args = ap.parse_args(argv)
+
+    rows = run(args).rows()
+    print(f"{'aşama':22} {'n':>6} {'toplam ms':>10} {'ms/op':>9}")
+    for r in rows:
+        print(f"{r['stage']:22} {r['n']:6d} {r['total_ms']:10.1f} {r['per_op_ms']:9.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "stages": rows}, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        return 0 if compare(rows, args.baseline, args.threshold) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,125 @@
+"""
+ingest.read_school_report için regresyon kontrolü.
+
+Eski pd.read_excel tabanlı parse_school_report (aşağıda legacy_parse olarak
+birebir korunuyor) ile yeni motorun çıktısını karşılaştırır; DataFrame'ler
+(kolonlar, dtype'lar, değerler) ve deneme adı aynı olmalıdır.
+
+Kullanım (depo kökünden):
+    python tools/parse_regression.py                 # tools/fixtures/*.xlsx
+    python tools/parse_regression.py rapor1.xlsx ... # ek dosyalar
+"""
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import extract_kademe, make_unique_columns, read_school_report  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_parse(uploaded_file):
+    raw = pd.read_excel(uploaded_file, header=None)
+    raw = raw.dropna(axis=1, how="all")
+
+    exam_name = "Deneme"
+    try:
+        v = raw.iloc[1, 0]
+        if pd.notna(v):
+            exam_name = str(v).strip()
+    except Exception:
+        pass
+
+    header_idx = None
+    for i in range(len(raw)):
+        if str(raw.iloc[i, 0]).strip() == "Öğr.No":
+            header_idx = i
+            break
+    if header_idx is None:
+        raise ValueError("Başlık satırı bulunamadı: 'Öğr.No' yok.")
+
+    grp = raw.iloc[header_idx - 2].copy().ffill()
+    top = raw.iloc[header_idx - 1].copy().ffill()
+    sub = raw.iloc[header_idx].copy()
+
+    cols = []
+    for j in range(len(sub)):
+        g = str(grp.iloc[j]).strip() if pd.notna(grp.iloc[j]) else ""
+        t = str(top.iloc[j]).strip() if pd.notna(top.iloc[j]) else ""
+        s = str(sub.iloc[j]).strip() if pd.notna(sub.iloc[j]) else ""
+
+        if j == 0:
+            cols.append("OgrNo")
+        elif j == 1:
+            cols.append("AdSoyad")
+        elif j == 2:
+            cols.append("Sinif")
+        else:
+            if g.lower() == "lgs" and t.lower() == "puan":
+                cols.append("LGS_Puan")
+            elif t.lower() == "dereceler" and s in ["Sınıf", "Kurum", "İlçe", "İl", "Genel"]:
+                cols.append(f"Derece_{s}")
+            elif s in ["D", "Y", "N"]:
+                cols.append(f"{t}_{s}")
+            else:
+                base = t if t else g if g else f"Kolon_{j}"
+                suffix = f"_{s}" if s else ""
+                cols.append(f"{base}{suffix}")
+
+    cols = make_unique_columns(cols)
+
+    df = raw.iloc[header_idx + 1:].copy()
+    df.columns = cols
+    df = df.dropna(how="all")
+
+    first = df["OgrNo"].astype(str)
+    df = df[~first.str.contains("Genel Ortalama|Kurum Ortalaması", na=False, regex=True)].copy()
+
+    df.columns = make_unique_columns(df.columns)
+
+    df["OgrNo"] = pd.to_numeric(df["OgrNo"], errors="coerce")
+    if "LGS_Puan" in df.columns:
+        df["LGS_Puan"] = pd.to_numeric(df["LGS_Puan"], errors="coerce")
+
+    df["Deneme"] = exam_name
+    df["Kademe"] = df["Sinif"].apply(extract_kademe)
+
+    for c in df.columns:
+        if c.endswith("_D") or c.endswith("_Y") or c.endswith("_N"):
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+
+    return df.reset_index(drop=True), exam_name
+
+
+def check(path: str) -> bool:
+    t0 = time.perf_counter()
+    expected, expected_name = legacy_parse(path)
+    t1 = time.perf_counter()
+    got, got_name = read_school_report(path)
+    t2 = time.perf_counter()
+
+    ok = True
+    try:
+        assert got_name == expected_name, f"deneme adı: {got_name!r} != {expected_name!r}"
+        pd.testing.assert_frame_equal(got, expected, check_dtype=True)
+    except AssertionError as e:
+        ok = False
+        print(f"FARKLI  {path}\n{e}")
+    if ok:
+        print(f"AYNI    {path}  ({len(got)} satır, eski {1000 * (t1 - t0):.1f} ms, yeni {1000 * (t2 - t1):.1f} ms)")
+    return ok
+
+
+def main(argv):
+    paths = argv or sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.xlsx")))
+    results = [check(p) for p in paths]
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,72 @@
+"""
+Öğrenci PDF'i grafik motoru karşılaştırması: ReportLab vektör ↔ matplotlib PNG.
+
+Sentetik öğrenciler (N deneme, 6 ders) için build_student_pdf her iki motorla
+üretilir; rapor başına süre ve PDF boyutu yazdırılır. İlk çağrı (font kaydı,
+matplotlib ısınması) ölçüme katılmaz.
+
+Kullanım (depo kökünden):
+    python tools/pdf_benchmark.py                  # 50 rapor, 8 deneme
+    python tools/pdf_benchmark.py --reports 200 --exams 12
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reports import CHART_BACKENDS, build_student_pdf  # noqa: E402
+
+SUBJECTS = ["Türkçe", "Matematik", "Fen Bilimleri", "İnkılap Tarihi", "Din Kültürü", "İngilizce"]
+
+
+def make_student(rng, n_exams: int):
+    df = pd.DataFrame({
+        "exam_name": [f"{i + 1}. Deneme" for i in range(n_exams)],
+        "sinif": "8-A",
+        "lgs_puan": rng.normal(350, 40, n_exams).round(2),
+        "created_at": pd.date_range("2026-09-01", periods=n_exams, freq="7D"),
+    })
+    nets = {s: float(v) for s, v in zip(SUBJECTS, rng.uniform(-2, 20, len(SUBJECTS)).round(2))}
+    return df, nets
+
+
+def run(backend: str, students) -> tuple:
+    build_student_pdf("Isınma", 8, students[0][0], last_nets=students[0][1], chart_backend=backend)
+    times, sizes = [], []
+    for i, (df, nets) in enumerate(students):
+        t0 = time.perf_counter()
+        data = build_student_pdf(f"Öğrenci {i}", 8, df, last_nets=nets, chart_backend=backend).getvalue()
+        times.append(time.perf_counter() - t0)
+        sizes.append(len(data))
+    return times, sizes
+
+
+def main(argv):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reports", type=int, default=50)
+    ap.add_argument("--exams", type=int, default=8)
+    args = ap.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    students = [make_student(rng, args.exams) for _ in range(args.reports)]
+
+    print(f"{args.reports} rapor, {args.exams} deneme")
+    print(f"{'motor':8} {'ort ms':>8} {'p95 ms':>8} {'ort KB':>8} {'toplam MB':>10}")
+    for backend in CHART_BACKENDS:
+        times, sizes = run(backend, students)
+        p95 = sorted(times)[int(0.95 * (len(times) - 1))]
+        print(
+            f"{backend:8} {1000 * statistics.mean(times):8.1f} {1000 * p95:8.1f} "
+            f"{statistics.mean(sizes) / 1024:8.1f} {sum(sizes) / 2**20:10.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,182 @@
+"""
+Sentetik okul raporu (.xlsx) üreteci.
+
+ingest.read_school_report'un beklediği düzende dosyalar yazar:
+    1. satır  okul başlığı
+    2. satır  deneme adı (A sütunu) + tarih
+    3. satır  boş
+    grup / üst / alt başlık satırları ("Öğr.No", ders D/Y/N blokları, LGS Puan, Dereceler)
+    öğrenci satırları, en altta "Kurum Ortalaması" / "Genel Ortalama"
+
+Aynı kademe için üretilen denemelerde öğrenciler (okul no, ad, sınıf) sabittir;
+puanlar öğrenci başına bir seviye + eğilim + gürültü ile değişir.
+
+Kullanım (depo kökünden):
+    python tools/synth.py cikti/ --students 120 --classes 4 --exams 8 --kademeler 7,8
+"""
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+from openpyxl import Workbook
+
+# (ders, grup, soru sayısı, puan ağırlığı)
+LGS_SUBJECTS = [
+    ("Türkçe", "Sözel", 20, 4),
+    ("T.C. İnkılap Tarihi ve Atatürkçülük", "Sözel", 10, 1),
+    ("Din Kültürü ve Ahlak Bilgisi", "Sözel", 10, 1),
+    ("İngilizce", "Sözel", 10, 1),
+    ("Matematik", "Sayısal", 20, 4),
+    ("Fen Bilimleri", "Sayısal", 20, 4),
+]
+RANK_LABELS = ["Sınıf", "Kurum", "İlçe", "İl", "Genel"]
+
+FIRST_NAMES = [
+    "Ayşe", "Mehmet", "Zeynep", "Mustafa", "Elif", "Ahmet", "Büşra", "İsmail", "Şule", "Gökhan",
+    "Çağla", "Emre", "Özge", "Hüseyin", "Merve", "Yusuf", "Gül", "Ömer", "Irmak", "Uğur",
+]
+LAST_NAMES = [
+    "Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Öztürk", "Aydın", "Özdemir", "Arslan",
+    "Doğan", "Kılıç", "Aslan", "Çetin", "Koç", "Kurt", "Özkan", "Şimşek", "Polat", "Erdoğan",
+]
+
+
+@dataclass
+class Cohort:
+    kademe: int
+    ogr_no: np.ndarray
+    names: list
+    classes: list
+    level: np.ndarray  # 0..1 başarı düzeyi
+    trend: np.ndarray  # deneme başına düzey değişimi
+
+
+def make_cohort(kademe: int, students: int = 120, classes: int = 4, seed: int = 0) -> Cohort:
+    rng = np.random.default_rng(seed + kademe)
+    letters = "ABCDEFGHIJKLMNOPRSTUVYZ"
+    names = [
+        f"{FIRST_NAMES[rng.integers(len(FIRST_NAMES))]} {LAST_NAMES[rng.integers(len(LAST_NAMES))]} {i + 1}"
+        for i in range(students)
+    ]
+    return Cohort(
+        kademe=kademe,
+        ogr_no=kademe * 10000 + np.arange(1, students + 1),
+        names=names,
+        classes=[f"{kademe}-{letters[i % classes]}" for i in range(students)],
+        level=rng.beta(4, 3, students),
+        trend=rng.normal(0, 0.01, students),
+    )
+
+
+def exam_scores(cohort: Cohort, exam_no: int, subjects=LGS_SUBJECTS, absent_rate: float = 0.02, seed: int = 0):
+    """Dönüş: (D, Y matrisleri [öğrenci × ders], puan, katılmadı maskesi)."""
+    rng = np.random.default_rng(seed * 1000 + cohort.kademe * 100 + exam_no)
+    n = len(cohort.names)
+    q = np.array([s[2] for s in subjects])
+    p = np.clip(cohort.level + cohort.trend * exam_no + rng.normal(0, 0.06, n), 0.02, 0.98)
+    p_sub = np.clip(p[:, None] + rng.normal(0, 0.08, (n, len(subjects))), 0.0, 1.0)
+    d = rng.binomial(q, p_sub)
+    y = rng.binomial(q - d, 0.6)
+    net = d - y / 3
+    w = np.array([s[3] for s in subjects])
+    puan = 100 + 400 * (np.clip(net, 0, None) * w).sum(axis=1) / (q * w).sum()
+    absent = rng.random(n) < absent_rate
+    return d, y, puan.round(3), absent
+
+
+def write_school_report(
+    path,
+    cohort: Cohort,
+    exam_name: str,
+    exam_no: int = 0,
+    subjects=LGS_SUBJECTS,
+    school: str = "ÖRNEK ORTAOKULU - KURUM RAPORU",
+    seed: int = 0,
+):
+    """path: dosya yolu ya da yazılabilir ikili akış (BytesIO)."""
+    d, y, puan, absent = exam_scores(cohort, exam_no, subjects, seed=seed)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append([school])
+    ws.append([exam_name, None, None, None, f"Tarih: {exam_no + 1:02d}.10.2025"])
+    ws.append([])
+
+    grp, top, sub = [None] * 3, [None] * 3, ["Öğr.No", "Adı Soyadı", "Sınıfı"]
+    for name, group, _, _ in subjects:
+        grp += [group, None, None]
+        top += [name, None, None]
+        sub += ["D", "Y", "N"]
+    grp += ["LGS"] + [None] * len(RANK_LABELS)
+    top += ["Puan", "Dereceler"] + [None] * (len(RANK_LABELS) - 1)
+    sub += [None] + RANK_LABELS
+    ws.append(grp)
+    ws.append(top)
+    ws.append(sub)
+
+    order = np.argsort(-np.where(absent, -np.inf, puan), kind="stable")
+    kurum_rank = np.empty(len(order), dtype=int)
+    kurum_rank[order] = np.arange(1, len(order) + 1)
+    classes = np.array(cohort.classes)
+    sinif_rank = np.zeros(len(order), dtype=int)
+    for c in np.unique(classes):
+        idx = order[classes[order] == c]
+        sinif_rank[idx] = np.arange(1, len(idx) + 1)
+
+    for i in range(len(cohort.names)):
+        row = [int(cohort.ogr_no[i]), cohort.names[i], cohort.classes[i]]
+        if absent[i]:
+            row += [None] * (3 * len(subjects) + 1 + len(RANK_LABELS))
+        else:
+            for j in range(len(subjects)):
+                row += [int(d[i, j]), int(y[i, j]), round(float(d[i, j] - y[i, j] / 3), 3)]
+            k = int(kurum_rank[i])
+            row += [float(puan[i]), int(sinif_rank[i]), k, k * 7, k * 60, k * 900]
+        ws.append(row)
+
+    present = ~absent
+    means = []
+    for j in range(len(subjects)):
+        means += [round(float(d[present, j].mean()), 2), round(float(y[present, j].mean()), 2),
+                  round(float((d[present, j] - y[present, j] / 3).mean()), 2)]
+    ws.append(["Kurum Ortalaması", None, None] + means + [round(float(puan[present].mean()), 3)])
+    ws.append(["Genel Ortalama", None, None] + means + [round(float(puan[present].mean()) - 10, 3)])
+    wb.save(path)
+
+
+def generate(out_dir: str, students: int, classes: int, exams: int, kademeler, subjects=LGS_SUBJECTS, seed: int = 0):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for k in kademeler:
+        cohort = make_cohort(k, students, classes, seed)
+        for e in range(exams):
+            path = os.path.join(out_dir, f"{k}_sinif_deneme_{e + 1:02d}.xlsx")
+            write_school_report(path, cohort, f"{k}. Sınıf LGS Deneme {e + 1}", e, subjects, seed=seed)
+            paths.append(path)
+    return paths
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("out_dir")
+    ap.add_argument("--students", type=int, default=120, help="kademe başına öğrenci")
+    ap.add_argument("--classes", type=int, default=4, help="kademe başına şube")
+    ap.add_argument("--exams", type=int, default=8, help="kademe başına deneme")
+    ap.add_argument("--kademeler", default="8", help="virgülle: 5,6,7,8")
+    ap.add_argument("--subjects", type=int, default=len(LGS_SUBJECTS), help=f"ilk N ders (en çok {len(LGS_SUBJECTS)})")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    kademeler = [int(k) for k in args.kademeler.split(",") if k.strip()]
+    paths = generate(
+        args.out_dir, args.students, args.classes, args.exams, kademeler,
+        LGS_SUBJECTS[:max(1, args.subjects)], args.seed,
+    )
+    print(f"{len(paths)} dosya yazıldı: {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))